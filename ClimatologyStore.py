@@ -0,0 +1,138 @@
+import os
+import calendar
+import itertools
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ClimatologyStore(object):
+    """
+    Sums, M2 (for standard deviations) and day counts of the daily fields that went into a climatology netCDF file
+    (field_type climo, monthly_climo or seasonal_climo), saved next to it along with the manifest of included daily
+    files. See FieldAccumulator.
+
+    When daily files are added to or replaced within the climatology's window, update(...) brings the sums up to date
+    by only reading the new days (or, for replaced days, recomputing their months) instead of every day of every year,
+    and is_fresh(...) tells whether the netCDF file still matches the daily files.
+    """
+    climo_field_types = ['climo', 'monthly_climo', 'seasonal_climo']
+
+    def __init__(self, nc_filepath, avg_method='partial_data_ok'):
+        from FieldAccumulator import FieldAccumulator
+
+        self.nc_filepath = nc_filepath
+        self.store_filepath = os.path.splitext(nc_filepath)[0] + '_store.npz'
+        self.avg_method = avg_method
+
+        self.accumulator = None
+        if os.path.isfile(self.store_filepath):
+            self.accumulator = FieldAccumulator.load(self.store_filepath)
+            if self.accumulator.avg_method != avg_method:
+                logger.info('{:s} has {:s} sums, not {:s}. Starting over.'
+                            .format(self.store_filepath, self.accumulator.avg_method, avg_method))
+                self.accumulator = None
+            else:
+                # Older versions didn't keep a manifest or M2.
+                m2_var_names = set(self.accumulator.field_sum.keys()) & self.accumulator.m2_var_names
+                if self.accumulator.manifest is None or not m2_var_names <= set(self.accumulator.field_m2.keys()):
+                    logger.info('{:s} was saved by an older version. Starting over.'.format(self.store_filepath))
+                    self.accumulator = None
+
+        if self.accumulator is None:
+            self.accumulator = FieldAccumulator(avg_method=avg_method)
+
+    def is_fresh(self, dates):
+        """ Whether the netCDF file was written from exactly the daily files that exist now for the given dates. """
+        if not os.path.isfile(self.nc_filepath) or not os.path.isfile(self.store_filepath):
+            return False
+
+        # The netCDF file is written after the store is saved, so an older netCDF file wasn't written from it.
+        if os.path.getmtime(self.nc_filepath) < os.path.getmtime(self.store_filepath):
+            return False
+
+        if not set(self.accumulator.manifest.keys()) <= set(dates):
+            return False
+
+        new_dates, changed_dates = self.accumulator.stale_dates(dates)
+        return not new_dates and not changed_dates
+
+    def update(self, dates, var_names, n_jobs=1):
+        """
+        Bring the sums up to date with the daily files for the given dates and save them.
+
+        New days are read on their own. Whole months with replaced or removed days (avg_method='partial_data_ok' only)
+        have their old monthly partial subtracted and the recomputed one added. Anything else, e.g. a store covering
+        other days or other fields, is rebuilt from scratch using n_jobs worker processes, see
+        FieldAccumulator.from_period(...).
+        """
+        from FieldAccumulator import FieldAccumulator
+
+        dates = sorted(set(dates))
+
+        missing_fields = self.accumulator.n_days > 0 and not set(var_names) <= set(self.accumulator.field_sum.keys())
+        if missing_fields or not set(self.accumulator.manifest.keys()) <= set(dates):
+            logger.info('{:s} does not match the climatology. Rebuilding it.'.format(self.store_filepath))
+
+            # Keep the fields it already has along with the new ones.
+            var_names = sorted(set(var_names) | set(self.accumulator.field_sum.keys()))
+            self.accumulator = FieldAccumulator(avg_method=self.avg_method)
+
+        if self.accumulator.n_days == 0:
+            updated = None
+        else:
+            updated = self._update_months(dates, var_names)
+
+        if updated is None:
+            logger.info('Building {:s} from scratch.'.format(self.store_filepath))
+            self.accumulator = FieldAccumulator.from_period(dates, var_names, self.avg_method, n_jobs=n_jobs)
+            updated = True
+
+        if updated or not os.path.isfile(self.store_filepath):
+            self.accumulator.save(self.store_filepath)
+
+    def _update_months(self, dates, var_names):
+        """ :return: Whether the sums changed, or None if they have to be rebuilt. """
+        from utils import get_monthly_partial_filepath
+        from FieldAccumulator import FieldAccumulator
+
+        updated = False
+
+        for (year, month), month_dates in itertools.groupby(dates, key=lambda d: (d.year, d.month)):
+            month_dates = list(month_dates)
+
+            new_dates, changed_dates = self.accumulator.stale_dates(month_dates)
+            if not new_dates and not changed_dates:
+                continue
+
+            updated = True
+
+            if self.avg_method != 'partial_data_ok' or len(month_dates) != calendar.monthrange(year, month)[1]:
+                if changed_dates:
+                    return None
+                logger.info('Adding {:d} new days from {:d}-{:02d}.'.format(len(new_dates), year, month))
+                self.accumulator.merge(FieldAccumulator.from_dates(new_dates, var_names, self.avg_method))
+                continue
+
+            # Whole months swap their old sums for the up to date monthly partial (which only reads the new days
+            # itself), keeping the two in sync. This needs the saved partial to be made up of exactly the same daily
+            # files as the month in the store.
+            month_manifest = {date: mtime for date, mtime in self.accumulator.manifest.items() if date in month_dates}
+            if month_manifest:
+                partial_filepath = get_monthly_partial_filepath(year, month)
+                old_partial = FieldAccumulator.load(partial_filepath) if os.path.isfile(partial_filepath) else None
+
+                if old_partial is None or old_partial.manifest != month_manifest \
+                        or not set(var_names) <= set(old_partial.field_sum.keys()):
+                    if changed_dates:
+                        return None
+                    logger.info('Adding {:d} new days from {:d}-{:02d}.'.format(len(new_dates), year, month))
+                    self.accumulator.merge(FieldAccumulator.from_dates(new_dates, var_names, self.avg_method))
+                    continue
+
+                self.accumulator.subtract(old_partial)
+
+            logger.info('Adding monthly partial for {:d}-{:02d}.'.format(year, month))
+            self.accumulator.merge(FieldAccumulator.monthly_partial(year, month, var_names))
+
+        return updated
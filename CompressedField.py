@@ -0,0 +1,78 @@
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class CompressedField(object):
+    """
+    A field that only exists on some cells of the lat-lon grid (e.g. the sea ice zone) stored as the flat indices of
+    those cells and one value per cell. Memory then scales with the number of cells instead of the whole grid.
+
+    The indices are the same as CF "compression by gathering" uses (row-major, lon varying fastest), so a compressed
+    field can be written to and read back from netCDF as is, see write_netCDF_variable and read_netCDF_field.
+    """
+    def __init__(self, indices, values, shape):
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.values = np.asarray(values)
+        self.shape = tuple(shape)
+
+        if self.indices.shape != self.values.shape:
+            logger.error('Got {:d} indices but {:d} values!'.format(self.indices.size, self.values.size))
+            raise ValueError('Got {:d} indices but {:d} values!'.format(self.indices.size, self.values.size))
+
+    @classmethod
+    def gather(cls, field, indices):
+        """ Compress a full field by keeping only the given cells. """
+        indices = np.asarray(indices, dtype=np.int64)
+        return cls(indices, np.ravel(field)[indices], np.shape(field))
+
+    @classmethod
+    def from_field(cls, field):
+        """ Compress a full field by keeping only the cells where it isn't NaN. """
+        return cls.gather(field, np.flatnonzero(~np.isnan(field)))
+
+    def scatter(self, field):
+        """ Write the values into their cells of an existing full field, leaving every other cell as it is. """
+        field.flat[self.indices] = self.values
+
+    def to_field(self, fill_value=np.nan):
+        field = np.full(self.shape, fill_value, dtype=np.result_type(self.values, fill_value))
+        self.scatter(field)
+        return field
+
+
+def write_netCDF_variable(dataset, var_name, compressed_field, compressed_dim):
+    """
+    Write a compressed field to a netCDF variable along the compressed dimension compressed_dim, which has to be a CF
+    "compression by gathering" list variable already holding compressed_field.indices. See create_compressed_dimension.
+    """
+    field_var = dataset.createVariable(var_name, float, (compressed_dim,), zlib=True)
+    field_var[:] = compressed_field.values
+    return field_var
+
+
+def create_compressed_dimension(dataset, dim_name, indices, compress='lat lon'):
+    """ Create a CF list variable (and its dimension) for compression by gathering over the given dimensions. """
+    dataset.createDimension(dim_name, len(indices))
+    list_var = dataset.createVariable(dim_name, np.int32, (dim_name,))
+    list_var.compress = compress
+    list_var[:] = indices
+    return list_var
+
+
+def read_netCDF_field(dataset, var_name, decompress=True):
+    """
+    Read a field from a netCDF dataset. Variables stored using compression by gathering are scattered back onto the full
+    grid (with NaN everywhere else) unless decompress=False, in which case a CompressedField is returned.
+    """
+    field_var = dataset.variables[var_name]
+
+    if len(field_var.dimensions) == 1 and field_var.dimensions[0] in dataset.variables \
+            and hasattr(dataset.variables[field_var.dimensions[0]], 'compress'):
+        list_var = dataset.variables[field_var.dimensions[0]]
+        shape = tuple(len(dataset.dimensions[dim]) for dim in list_var.compress.split())
+        compressed_field = CompressedField(np.array(list_var[:]), np.array(field_var[:]), shape)
+        return compressed_field.to_field() if decompress else compressed_field
+
+    return np.array(field_var)
@@ -0,0 +1,510 @@
+import os
+
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class FieldAccumulator(object):
+    """
+    Running sums of daily fields from which their mean over a period (a month, a season, a climatology, ...) is computed
+    without keeping the daily fields around. Fields are added one day at a time as a dictionary of full (lat, lon)
+    arrays or CompressedField objects, as returned by CompressedField.read_netCDF_field(..., decompress=False).
+
+    avg_method is the same as for SurfaceStressDataWriter.compute_mean_fields(...):
+        partial_data_ok: the mean at each grid point is over the days that have data there.
+        full_data_only: the mean is NaN wherever any of the days is missing data.
+
+    Alongside the sums, the sum of squared deviations from the mean (M2) is kept for standard deviations of the fields
+    in m2_var_names (those written out, SurfaceStressDataWriter.std_var_names), updated with Welford's algorithm as days
+    are added and Chan et al.'s pairwise formula when accumulators are merged, which unlike a sum of squares doesn't
+    lose precision when the variance is small compared to the mean.
+
+    The manifest records which daily files went into the sums (and their modification times) so that sums saved to disk
+    can be checked against the daily files and brought up to date, see stale_dates(...) and monthly_partial(...).
+    """
+    avg_methods = ['partial_data_ok', 'full_data_only']
+
+    def __init__(self, avg_method='partial_data_ok'):
+        from SurfaceStressDataWriter import SurfaceStressDataWriter
+
+        if avg_method not in self.avg_methods:
+            logger.error('Invalid avg_method: {}. Choose from {}.'.format(avg_method, self.avg_methods))
+            raise ValueError('Invalid avg_method: {}. Choose from {}.'.format(avg_method, self.avg_methods))
+
+        self.avg_method = avg_method
+
+        # Sum of the daily fields, sum of their squared deviations from the mean and number of days with data at each
+        # grid point for each field. Allocated on the first day as the fields are only known then.
+        self.field_sum = {}
+        self.field_m2 = {}
+        self.field_days = {}
+
+        self.m2_var_names = set(SurfaceStressDataWriter.std_var_names)
+
+        self.n_days = 0  # Number of days added.
+
+        # Dates of the daily files added so far, and their modification times.
+        self.manifest = {}
+
+    @classmethod
+    def from_dates(cls, dates, var_names, avg_method='partial_data_ok'):
+        """ Accumulate the daily netCDF files for the given dates, skipping the ones that don't exist. """
+        import netCDF4
+        from utils import get_netCDF_filepath, log_netCDF_dataset_metadata
+        from SurfaceStressDataWriter import SurfaceStressDataWriter
+
+        accumulator = cls(avg_method=avg_method)
+
+        for date in dates:
+            tau_filepath = get_netCDF_filepath(field_type='daily', date=date)
+
+            logger.info('Averaging {:%b %d, %Y} ({:s})...'.format(date, tau_filepath))
+
+            try:
+                tau_dataset = netCDF4.Dataset(tau_filepath)
+                log_netCDF_dataset_metadata(tau_dataset)
+            except OSError as e:
+                logger.error('{}'.format(e))
+                logger.warning('{:s} not found. Proceeding without it...'.format(tau_filepath))
+                continue
+
+            accumulator.add(SurfaceStressDataWriter.read_daily_fields(tau_dataset, var_names), date=date,
+                            mtime=os.path.getmtime(tau_filepath))
+            tau_dataset.close()
+
+        return accumulator
+
+    @classmethod
+    def from_period(cls, dates, var_names, avg_method='partial_data_ok', n_jobs=1):
+        """
+        Accumulate the daily files over any period. Whole months are added from their monthly partial sums
+        (avg_method='partial_data_ok' only) and any other days are read one by one.
+
+        With n_jobs > 1 the months are split into n_jobs contiguous chunks that are accumulated by a pool of worker
+        processes. The chunks are merged in chunk order as they come back, so only the running total and the chunks
+        that finished early are held in memory, and the same dates and n_jobs always give the same sums to the bit.
+        They are the same as with n_jobs=1 up to the order in which the floating point sums were added up.
+        """
+        import calendar
+        import itertools
+
+        months = [list(month_dates) for _, month_dates in
+                  itertools.groupby(sorted(set(dates)), key=lambda d: (d.year, d.month))]
+
+        if n_jobs > 1 and len(months) > 1:
+            from joblib import Parallel, delayed
+
+            n_chunks = min(n_jobs, len(months))
+            chunks = [list(itertools.chain(*months[i * len(months) // n_chunks:(i + 1) * len(months) // n_chunks]))
+                      for i in range(n_chunks)]
+
+            logger.info('Accumulating {:d} months in {:d} chunks...'.format(len(months), n_chunks))
+            chunk_accumulators = Parallel(n_jobs=n_chunks, return_as='generator')(
+                delayed(cls.from_period)(chunk, list(var_names), avg_method) for chunk in chunks)
+
+            accumulator = next(chunk_accumulators)
+            for chunk_accumulator in chunk_accumulators:
+                accumulator.merge(chunk_accumulator)
+
+            return accumulator
+
+        accumulator = cls(avg_method=avg_method)
+
+        for month_dates in months:
+            year, month = month_dates[0].year, month_dates[0].month
+
+            if avg_method == 'partial_data_ok' and len(month_dates) == calendar.monthrange(year, month)[1]:
+                accumulator.merge(cls.monthly_partial(year, month, var_names))
+            else:
+                accumulator.merge(cls.from_dates(month_dates, var_names, avg_method))
+
+        return accumulator
+
+    @classmethod
+    def monthly_partial(cls, year, month, var_names):
+        """
+        Sums and day counts (avg_method='partial_data_ok') of the given fields over a whole month. They are saved the
+        first time they're computed so that seasonal, annual and climatological means can be built by adding up
+        monthly partials instead of reading every daily file again.
+
+        A saved partial is brought up to date first: days saved by add_to_monthly_partial(...) are folded in, daily
+        files that have appeared since are added to it, and if any daily file it includes has been replaced or removed
+        the month is recomputed.
+        """
+        import calendar
+        import datetime
+        from utils import date_range, get_monthly_partial_filepath
+
+        partial_filepath = get_monthly_partial_filepath(year, month)
+        cls._fold_daily_partials(partial_filepath)
+
+        n_days = calendar.monthrange(year, month)[1]
+        dates = date_range(datetime.date(year, month, 1), datetime.date(year, month, n_days))
+
+        if os.path.isfile(partial_filepath):
+            # Only the requested fields are loaded if the partial is up to date.
+            accumulator = cls.load(partial_filepath, var_names=var_names)
+
+            # Partials saved before manifests were kept can't be checked against the daily files.
+            if accumulator.manifest is None or not set(var_names) <= set(accumulator.field_sum.keys()) \
+                    or not set(var_names) & accumulator.m2_var_names <= set(accumulator.field_m2.keys()):
+                logger.info('{:s} is missing some fields or its manifest. Recomputing it.'.format(partial_filepath))
+
+                # Keep the fields it already has so other callers don't have to recompute it again.
+                if accumulator.manifest is not None:
+                    var_names = sorted(set(var_names) | set(cls.saved_var_names(partial_filepath)))
+            else:
+                new_dates, changed_dates = accumulator.stale_dates(dates)
+
+                if changed_dates:
+                    logger.info('{:d} daily files in {:s} changed. Recomputing it.'
+                                .format(len(changed_dates), partial_filepath))
+                    var_names = sorted(set(var_names) | set(cls.saved_var_names(partial_filepath)))
+                elif new_dates:
+                    logger.info('Adding {:d} new daily files to {:s}.'.format(len(new_dates), partial_filepath))
+                    accumulator = cls.load(partial_filepath)
+                    accumulator.merge(cls.from_dates(new_dates, list(accumulator.field_sum.keys()),
+                                                     avg_method='partial_data_ok'))
+                    accumulator.save(partial_filepath)
+                    return accumulator
+                else:
+                    return accumulator
+
+        accumulator = cls.from_dates(dates, var_names, avg_method='partial_data_ok')
+        accumulator.save(partial_filepath)
+
+        return accumulator
+
+    @classmethod
+    def add_to_monthly_partial(cls, date, daily_fields, mtime):
+        """
+        Save the fields of one day for the partial sums of its month as soon as they're computed (see
+        calculate_surface_stress.process_day), so the daily file doesn't have to be read again for monthly means.
+
+        Days are processed in parallel so each one is saved to its own file next to the partial, which doesn't need a
+        lock, and they're all folded into the partial at once the next time monthly_partial(...) is called.
+
+        :param mtime: Modification time of the daily netCDF file the fields were written to.
+        """
+        from utils import get_monthly_partial_filepath
+
+        partial_filepath = get_monthly_partial_filepath(date.year, date.month)
+        daily_partial_filepath = os.path.join(cls._daily_partial_dir(partial_filepath), '{:%Y%m%d}.npz'.format(date))
+
+        accumulator = cls(avg_method='partial_data_ok')
+        accumulator.add(daily_fields, date=date, mtime=mtime)
+        accumulator.save(daily_partial_filepath)
+
+    @staticmethod
+    def _daily_partial_dir(partial_filepath):
+        """ Directory holding the days saved by add_to_monthly_partial(...) that aren't in the partial yet. """
+        return os.path.splitext(partial_filepath)[0] + '_days'
+
+    @classmethod
+    def _fold_daily_partials(cls, partial_filepath):
+        """ Merge the days saved by add_to_monthly_partial(...) into the partial and delete their files. """
+        import fcntl
+        import glob
+
+        daily_partial_dir = cls._daily_partial_dir(partial_filepath)
+        if not os.path.isdir(daily_partial_dir):
+            return
+
+        # Several processes may want the same month at once.
+        with open(partial_filepath + '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            daily_partial_filepaths = sorted(glob.glob(os.path.join(daily_partial_dir, '*.npz')))
+            daily_partial_filepaths = [filepath for filepath in daily_partial_filepaths
+                                       if not filepath.endswith('.tmp.npz')]
+            if not daily_partial_filepaths:
+                return
+
+            logger.info('Folding {:d} days into {:s}.'.format(len(daily_partial_filepaths), partial_filepath))
+
+            day_accumulators = [cls.load(filepath) for filepath in daily_partial_filepaths]
+
+            accumulator = day_accumulators[0]
+            for day_accumulator in day_accumulators[1:]:
+                accumulator.merge(day_accumulator)
+
+            # A day that's already in the partial (processed again) can't be taken back out, so drop the partial and
+            # keep only the pending days. The manifest then tells monthly_partial(...) to read the other days back in.
+            if os.path.isfile(partial_filepath):
+                saved_accumulator = cls.load(partial_filepath)
+
+                if saved_accumulator.manifest is None \
+                        or set(accumulator.manifest) & set(saved_accumulator.manifest) \
+                        or any(set(day_accumulator.field_sum) != set(saved_accumulator.field_sum)
+                               for day_accumulator in day_accumulators):
+                    logger.info('Starting {:s} over from the {:d} pending days.'
+                                .format(partial_filepath, len(day_accumulators)))
+                else:
+                    saved_accumulator.merge(accumulator)
+                    accumulator = saved_accumulator
+
+            accumulator.save(partial_filepath)
+
+            for daily_partial_filepath in daily_partial_filepaths:
+                os.remove(daily_partial_filepath)
+
+    def stale_dates(self, dates):
+        """
+        Compare the manifest against the daily files for the given dates.
+
+        :return: (new_dates, changed_dates) where new_dates have a daily file that isn't in the sums yet and
+                 changed_dates are in the sums but their daily file has since been replaced or removed.
+        """
+        from utils import get_netCDF_filepath
+
+        new_dates = []
+        changed_dates = []
+
+        for date in dates:
+            tau_filepath = get_netCDF_filepath(field_type='daily', date=date)
+            mtime = os.path.getmtime(tau_filepath) if os.path.isfile(tau_filepath) else None
+
+            if date not in self.manifest:
+                if mtime is not None:
+                    new_dates.append(date)
+            elif mtime != self.manifest[date]:
+                changed_dates.append(date)
+
+        return new_dates, changed_dates
+
+    def merge(self, other):
+        """ Add the sums and day counts of another accumulator (e.g. a monthly partial) to this one. """
+        if other.avg_method != self.avg_method:
+            logger.error('Cannot merge {:s} sums into {:s} sums.'.format(other.avg_method, self.avg_method))
+            raise ValueError('Cannot merge {:s} sums into {:s} sums.'.format(other.avg_method, self.avg_method))
+
+        overlap = set(self.manifest.keys()) & set(other.manifest.keys())
+        if overlap:
+            logger.error('{:d} days (e.g. {}) would be counted twice.'.format(len(overlap), min(overlap)))
+            raise ValueError('{:d} days (e.g. {}) would be counted twice.'.format(len(overlap), min(overlap)))
+
+        for var_name in other.field_sum.keys():
+            if var_name not in self.field_sum:
+                self.field_sum[var_name] = np.array(other.field_sum[var_name])
+                self.field_days[var_name] = np.array(other.field_days[var_name])
+                if var_name in other.field_m2:
+                    self.field_m2[var_name] = np.array(other.field_m2[var_name])
+            else:
+                # M2 can only be merged if both sides have it.
+                if var_name in self.field_m2 and var_name in other.field_m2:
+                    n_a, n_b = self._days(var_name), other._days(var_name)
+                    self.field_m2[var_name] += other.field_m2[var_name] \
+                        + self._m2_correction(self.field_sum[var_name], n_a, other.field_sum[var_name], n_b)
+                else:
+                    self.field_m2.pop(var_name, None)
+
+                self.field_sum[var_name] += other.field_sum[var_name]
+                self.field_days[var_name] += other.field_days[var_name]
+
+        self.n_days = self.n_days + other.n_days
+        self.manifest.update(other.manifest)
+
+    def subtract(self, other):
+        """
+        Remove the days of another accumulator (that were merged into this one before) from the sums. Only possible
+        with avg_method='partial_data_ok' as the NaNs in full_data_only sums can't be taken back out.
+        """
+        if self.avg_method != 'partial_data_ok' or other.avg_method != 'partial_data_ok':
+            logger.error('Can only subtract partial_data_ok sums.')
+            raise ValueError('Can only subtract partial_data_ok sums.')
+
+        missing = set(other.manifest.keys()) - set(self.manifest.keys())
+        if missing:
+            logger.error('{:d} days (e.g. {}) are not in the sums.'.format(len(missing), min(missing)))
+            raise ValueError('{:d} days (e.g. {}) are not in the sums.'.format(len(missing), min(missing)))
+
+        for var_name in other.field_sum.keys():
+            self.field_sum[var_name] -= other.field_sum[var_name]
+            self.field_days[var_name] -= other.field_days[var_name]
+
+            # Drop the rounding error left where there are no days anymore so the mean is NaN there again.
+            no_days = self.field_days[var_name] == 0
+            self.field_sum[var_name][no_days] = 0
+
+            if var_name not in self.field_m2 or var_name not in other.field_m2:
+                self.field_m2.pop(var_name, None)
+                continue
+
+            # Undo Chan et al.'s formula with the sums left over.
+            self.field_m2[var_name] -= other.field_m2[var_name] \
+                + self._m2_correction(self.field_sum[var_name], self.field_days[var_name], other.field_sum[var_name],
+                                      other.field_days[var_name])
+            np.maximum(self.field_m2[var_name], 0, out=self.field_m2[var_name])
+            self.field_m2[var_name][no_days] = 0
+
+        self.n_days = self.n_days - other.n_days
+        for date in other.manifest.keys():
+            del self.manifest[date]
+
+    def _days(self, var_name):
+        """ Number of days in the mean at each grid point. """
+        if self.avg_method == 'partial_data_ok':
+            return self.field_days[var_name]
+        return self.n_days
+
+    @staticmethod
+    def _m2_correction(sum_a, n_a, sum_b, n_b):
+        """ Term added to M2_a + M2_b when merging two sets of days, (mean_b - mean_a)**2 * n_a * n_b / (n_a + n_b). """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = np.divide(sum_b, n_b) - np.divide(sum_a, n_a)
+            correction = delta**2 * np.multiply(n_a, n_b) / np.add(n_a, n_b)
+
+        # Nothing to correct where either set has no days, which only leaves NaNs for full_data_only fields.
+        return np.where((np.asarray(n_a) > 0) & (np.asarray(n_b) > 0), correction, 0)
+
+    def save(self, filepath):
+        partial_dir = os.path.dirname(filepath)
+        if not os.path.exists(partial_dir):
+            logger.info('Creating directory: {:s}'.format(partial_dir))
+            os.makedirs(partial_dir, exist_ok=True)
+
+        arrays = {}
+        for var_name in self.field_sum.keys():
+            arrays['sum_' + var_name] = self.field_sum[var_name]
+            arrays['days_' + var_name] = self.field_days[var_name]
+            if var_name in self.field_m2:
+                arrays['m2_' + var_name] = self.field_m2[var_name]
+
+        manifest_dates = sorted(self.manifest.keys())
+        arrays['manifest_dates'] = np.array([date.toordinal() for date in manifest_dates], dtype=np.int64)
+        arrays['manifest_mtimes'] = np.array([self.manifest[date] for date in manifest_dates], dtype=float)
+
+        logger.info('Saving partial sums ({:d} days): {:s}'.format(self.n_days, filepath))
+
+        # Written to a temporary file first so that nobody ever loads a half-written file.
+        tmp_filepath = os.path.splitext(filepath)[0] + '.tmp.npz'
+        np.savez_compressed(tmp_filepath, avg_method=self.avg_method, n_days=self.n_days, **arrays)
+        os.replace(tmp_filepath, filepath)
+
+    @classmethod
+    def load(cls, filepath, var_names=None):
+        """ Load partial sums saved with save(...), only for the fields in var_names if given. """
+        import datetime
+
+        logger.info('Loading partial sums: {:s}'.format(filepath))
+
+        with np.load(filepath) as partial:
+            accumulator = cls(avg_method=str(partial['avg_method']))
+            accumulator.n_days = int(partial['n_days'])
+
+            for key in partial.files:
+                if key.startswith('days_'):
+                    var_name = key[len('days_'):]
+                    if var_names is not None and var_name not in var_names:
+                        continue
+
+                    accumulator.field_sum[var_name] = partial['sum_' + var_name]
+                    accumulator.field_days[var_name] = partial['days_' + var_name]
+                    if 'm2_' + var_name in partial.files:
+                        accumulator.field_m2[var_name] = partial['m2_' + var_name]
+
+            # Older partials don't have a manifest, which is left as None so they get recomputed.
+            if 'manifest_dates' not in partial.files:
+                accumulator.manifest = None
+            else:
+                for ordinal, mtime in zip(partial['manifest_dates'], partial['manifest_mtimes']):
+                    accumulator.manifest[datetime.date.fromordinal(int(ordinal))] = float(mtime)
+
+        return accumulator
+
+    @staticmethod
+    def saved_var_names(filepath):
+        """ Fields in partial sums saved with save(...), without loading them. """
+        with np.load(filepath) as partial:
+            return [key[len('days_'):] for key in partial.files if key.startswith('days_')]
+
+    def add(self, daily_fields, date=None, mtime=None):
+        """
+        :param daily_fields: Dictionary of the fields for one day.
+        :param date: Date of the daily file, recorded in the manifest along with its modification time mtime.
+        """
+        from CompressedField import CompressedField
+
+        if date is not None and date in self.manifest:
+            logger.error('{} is already in the sums.'.format(date))
+            raise ValueError('{} is already in the sums.'.format(date))
+
+        for var_name, field in daily_fields.items():
+            if var_name not in self.field_sum:
+                self.field_sum[var_name] = np.zeros(field.shape)
+                self.field_days[var_name] = np.zeros(field.shape, dtype=np.int32)
+                if var_name in self.m2_var_names:
+                    self.field_m2[var_name] = np.zeros(field.shape)
+
+            field_sum = self.field_sum[var_name]
+            field_m2 = self.field_m2.get(var_name)
+            field_days = self.field_days[var_name]
+
+            # Only the compressed cells can contribute so there's no need to go over the whole grid.
+            if isinstance(field, CompressedField) and self.avg_method == 'partial_data_ok':
+                valid = ~np.isnan(field.values)
+                indices = field.indices[valid]
+                values = field.values[valid]
+
+                old_mean = np.divide(field_sum.flat[indices], np.maximum(field_days.flat[indices], 1))
+                field_sum.flat[indices] += values
+                field_days.flat[indices] += 1
+                new_mean = field_sum.flat[indices] / field_days.flat[indices]
+
+                if field_m2 is not None:
+                    field_m2.flat[indices] += (values - old_mean) * (values - new_mean)
+                continue
+
+            if isinstance(field, CompressedField):
+                field = field.to_field()
+
+            # Welford's update, M2 += (x - old mean) * (x - new mean), where the old mean doesn't matter on the first
+            # day as the new mean is x.
+            valid = ~np.isnan(field)
+            if self.avg_method == 'partial_data_ok':
+                old_mean = field_sum / np.maximum(field_days, 1)
+                field_sum += np.nan_to_num(field)
+                field_days += valid
+                new_mean = field_sum / np.maximum(field_days, 1)
+                if field_m2 is not None:
+                    field_m2 += np.where(valid, (field - old_mean) * (field - new_mean), 0)
+            else:
+                old_mean = field_sum / max(self.n_days, 1)
+                field_sum += field
+                field_days += valid
+                if field_m2 is not None:
+                    field_m2 += (field - old_mean) * (field - field_sum / (self.n_days + 1))
+
+        self.n_days = self.n_days + 1
+        if date is not None:
+            self.manifest[date] = mtime
+
+    def mean_fields(self):
+        """
+        :return: Dictionary with the mean of each field. Grid points without any data are NaN.
+        """
+        mean_fields = {}
+
+        for var_name in self.field_sum.keys():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if self.avg_method == 'partial_data_ok':
+                    mean_fields[var_name] = np.divide(self.field_sum[var_name], self.field_days[var_name])
+                else:
+                    mean_fields[var_name] = self.field_sum[var_name] / self.n_days
+
+        return mean_fields
+
+    def std_fields(self):
+        """
+        :return: Dictionary with the standard deviation of each field over the days (with ddof=0, like np.nanstd).
+                 Grid points without any data are NaN.
+        """
+        std_fields = {}
+
+        for var_name in self.field_m2.keys():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                std_fields[var_name] = np.sqrt(np.divide(self.field_m2[var_name], self._days(var_name)))
+
+        return std_fields
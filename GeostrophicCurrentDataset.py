@@ -12,6 +12,10 @@ class GeostrophicCurrentDataset(object):
     dataset_filepath = path.join(data_dir_path, 'CS2_combined_Southern_Ocean_2011-2016.nc')
     interp_dir = path.join(output_dir_path, 'CS2_combined_Southern_Ocean_2011-2016')
 
+    # Geostrophic current fields already computed by this process, keyed by month_idx, so that every day of the month
+    # can reuse the same (u_geo, v_geo) arrays.
+    u_geo_field_cache = {}
+
     def __init__(self, date):
         self.CS2_dataset = None  # CryoSat-2 dataset
         self.month_idx = None
@@ -115,6 +119,85 @@ class GeostrophicCurrentDataset(object):
 
         return dot_latlon
 
+    def dynamic_ocean_topography_field(self, lats, lons):
+        """ Vectorized version of dynamic_ocean_topography(lat, lon) for arrays of latitudes and longitudes. """
+        from constants import R
+        from utils import nearest_index
+
+        lats, lons = np.deg2rad(lats), np.deg2rad(lons)
+
+        # EASE-Grid constants (see dynamic_ocean_topography)
+        C = 50e3
+        s0 = 214-99.534884
+        r0 = 89.560976
+
+        col = +2*R/C * np.sin(lons) * np.cos(np.pi/4 - lats/2) + r0
+        row = -2*R/C * np.cos(lons) * np.cos(np.pi/4 - lats/2) + s0
+
+        idx_row = nearest_index(self.row_interp, row)
+        idx_col = nearest_index(self.col_interp, col)
+
+        return self.dot_interp[idx_row, idx_col]
+
+    def geostrophic_current_velocity_field(self):
+        """
+        Compute the geostrophic current velocity (u_geo, v_geo) over the entire lat-lon grid in one go. This is the
+        same calculation as geostrophic_current_velocity(lat, lon) but the DOT lookups and centered differences are
+        done on whole arrays. The fields only depend on the month so they're pickled next to the DOT interpolation.
+        """
+        import pickle
+        from constants import g, lat_step, n_lat, lon_step, n_lon
+        from Grid import get_grid
+
+        if self.month_idx in self.u_geo_field_cache:
+            return self.u_geo_field_cache[self.month_idx]
+
+        u_geo_filename = 'CS2_combined_Southern_Ocean' + '_u_geo_' + str(self.month_idx) + '_' + str(n_lat) + 'lats_' \
+                         + str(n_lon) + 'lons.pickle'
+        u_geo_filepath = path.join(self.interp_dir, u_geo_filename)
+
+        if path.isfile(u_geo_filepath):
+            logger.info('Geostrophic current field already computed and saved. Unpickling: {:s}'.format(u_geo_filepath))
+            with open(u_geo_filepath, 'rb') as f:
+                u_geo_dict = pickle.load(f)
+            u_geo_field, v_geo_field = u_geo_dict['u_geo'], u_geo_dict['v_geo']
+            self.u_geo_field_cache[self.month_idx] = (u_geo_field, v_geo_field)
+            return u_geo_field, v_geo_field
+
+        logger.info('Computing geostrophic current field for month_idx={:d}...'.format(self.month_idx))
+
+        grid = get_grid()
+        lat_grid, lon_grid = grid.lat_grid, grid.lon_grid
+
+        # Dividing by 100 to convert [cm] -> [m].
+        dot_ip1_j = self.dynamic_ocean_topography_field(lat_grid + lat_step, lon_grid) / 100
+        dot_im1_j = self.dynamic_ocean_topography_field(lat_grid - lat_step, lon_grid) / 100
+        dot_i_jp1 = self.dynamic_ocean_topography_field(lat_grid, lon_grid + lon_step) / 100
+        dot_i_jm1 = self.dynamic_ocean_topography_field(lat_grid, lon_grid - lon_step) / 100
+
+        # The metric terms only depend on latitude so they come from the shared grid, one value per row.
+        f = grid.f[:, np.newaxis]
+        dx = grid.cell_dx[:, np.newaxis]
+        dy = grid.cell_dy[:, np.newaxis]
+
+        dHdx = (dot_ip1_j - dot_im1_j) / (2*dx)
+        dHdy = (dot_i_jp1 - dot_i_jm1) / (2*dy)
+
+        u_geo_field = -(g/f) * dHdx
+        v_geo_field = (g/f) * dHdy
+
+        # Both components are missing if any of the four DOT values is missing.
+        missing = np.isnan(dot_ip1_j) | np.isnan(dot_im1_j) | np.isnan(dot_i_jp1) | np.isnan(dot_i_jm1)
+        u_geo_field[missing] = np.nan
+        v_geo_field[missing] = np.nan
+
+        with open(u_geo_filepath, 'wb') as f:
+            logger.info('Pickling geostrophic current field: {:s}'.format(u_geo_filepath))
+            pickle.dump({'u_geo': u_geo_field, 'v_geo': v_geo_field}, f, pickle.HIGHEST_PROTOCOL)
+
+        self.u_geo_field_cache[self.month_idx] = (u_geo_field, v_geo_field)
+        return u_geo_field, v_geo_field
+
     def geostrophic_current_velocity(self, lat, lon):
         from constants import g, Omega, lat_step, lon_step
         from utils import distance, polar_stereographic_velocity_vector_to_latlon
@@ -35,7 +35,14 @@ class GeostrophicVelocityDataset(object):
         # self.interpolate_u_geo_field()
 
     def date_to_u_geo_dataset_filepath(self, date):
-        # FIXME: Must pattern match the ending!!! https://docs.python.org/3.6/library/fnmatch.html ? glob?
+        from InputDataCatalog import get_input_data_catalog
+
+        # The filenames end in the processing date so look the file up in the input data catalog which pattern matches
+        # the ending. Fall back to the processing date of most of the files if the catalog doesn't have it.
+        dataset_filepath = get_input_data_catalog().get_filepath('geostrophic_velocity', date)
+        if dataset_filepath is not None:
+            return dataset_filepath
+
         filename = 'dt_global_allsat_msla_h_' + str(date.year) + str(date.month).zfill(2) \
                    + str(date.day).zfill(2) + '_20170110.nc'
         return path.join(self.u_geo_data_dir, str(date.year), filename)
@@ -0,0 +1,70 @@
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Grid(object):
+    """
+    Metric terms of the lat-lon interpolation grid defined in constants. They only depend on latitude (and the grid
+    spacing) so they are computed once per process, see get_grid(), instead of inside every latitude loop. All arrays
+    are read-only as they are shared.
+
+    1D arrays have one value per row (n_lat,) and the *_2d arrays are (n_lat, n_lon) broadcast views of them.
+    """
+    def __init__(self):
+        from constants import Omega, R
+        from constants import lat_min, lat_max, lat_step, n_lat, lon_min, lon_max, lon_step, n_lon
+        from utils import distance
+
+        logger.info('Computing grid metric terms for n_lat = {:d}, n_lon = {:d}...'.format(n_lat, n_lon))
+
+        self.lats = np.linspace(lat_min, lat_max, n_lat)
+        self.lons = np.linspace(lon_min, lon_max, n_lon)
+        self.shape = (n_lat, n_lon)
+        self.lat_grid, self.lon_grid = np.meshgrid(self.lats, self.lons, indexing='ij')
+
+        self.f = 2 * Omega * np.sin(np.deg2rad(self.lats))  # Coriolis parameter [s^-1]
+
+        # Distances used by the centered differences, dx[i] = distance(lats[i-1], lon, lats[i+1], lon) and
+        # dy[i] = distance(lats[i], lons[0], lats[i], lons[2]) exactly as the derivative loops have always computed them
+        # (so dx spans two cells in latitude and is used for zonal differences, see the TODO in
+        # SurfaceStressDataWriter.compute_daily_ekman_pumping_field). The first and last rows use the latitudes just
+        # outside the grid.
+        lats_padded = np.linspace(lat_min - lat_step, lat_max + lat_step, n_lat + 2)
+        self.dx = np.array([distance(lats_padded[i], self.lons[0], lats_padded[i+2], self.lons[0])
+                            for i in range(n_lat)])
+        self.dy = np.array([distance(lat, self.lons[0], lat, self.lons[2]) for lat in self.lats])
+
+        # Zonal and meridional widths of a single grid cell centered on each row [m].
+        self.cell_dx = np.array([distance(lat, -0.5*lon_step, lat, 0.5*lon_step) for lat in self.lats])
+        self.cell_dy = np.array([distance(lat - 0.5*lat_step, 0, lat + 0.5*lat_step, 0) for lat in self.lats])
+
+        # Exact area of each cell on the sphere [m^2]. Note that the first and last columns are the same longitude
+        # (-180 and +180) so one of them should be left out when summing over the whole grid.
+        sin_lat_edges = np.sin(np.deg2rad(self.lats + 0.5*lat_step)) - np.sin(np.deg2rad(self.lats - 0.5*lat_step))
+        self.cell_area_1d = R**2 * np.deg2rad(lon_step) * sin_lat_edges
+        self.cell_area = np.repeat(self.cell_area_1d[:, np.newaxis], n_lon, axis=1)
+
+        self.circumpolar_length = 2 * np.pi * R * np.cos(np.deg2rad(self.lats))  # Circumpolar distance [m].
+
+        self.f_2d = np.broadcast_to(self.f[:, np.newaxis], self.shape)
+        self.dx_2d = np.broadcast_to(self.dx[:, np.newaxis], self.shape)
+        self.dy_2d = np.broadcast_to(self.dy[:, np.newaxis], self.shape)
+        self.circumpolar_length_2d = np.broadcast_to(self.circumpolar_length[:, np.newaxis], self.shape)
+
+        for array in [self.lats, self.lons, self.lat_grid, self.lon_grid, self.f, self.dx, self.dy, self.cell_dx,
+                      self.cell_dy, self.cell_area_1d, self.cell_area, self.circumpolar_length]:
+            array.setflags(write=False)
+
+
+# Grid used by this process, see get_grid().
+_grid = None
+
+
+def get_grid():
+    """ Build the grid metric terms once per process. """
+    global _grid
+    if _grid is None:
+        _grid = Grid()
+    return _grid
@@ -0,0 +1,260 @@
+import os
+import re
+import datetime
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def _daily_date(match):
+    return datetime.datetime.strptime(match.group('date'), '%Y%m%d').date()
+
+
+def _day_of_year_date(match):
+    return datetime.date(int(match.group('year')), 1, 1) + datetime.timedelta(int(match.group('doy')) - 1)
+
+
+def _year(match):
+    return int(match.group('year'))
+
+
+def _expected_sea_ice_concentration_file(match, date):
+    """ Prefer the satellite and release SeaIceConcentrationDataset would use for the date. """
+    from SeaIceConcentrationDataset import SeaIceConcentrationDataset
+    return (match.group('sensor'), match.group('release')) == SeaIceConcentrationDataset.sensor_and_release(date)
+
+
+class InputDataCatalog(object):
+    """
+    Catalog of the input product files found on disk, mapping (product, date) -> (filepath, size, mtime). It is built
+    with one scan of data_dir_path and pickled so that the dataset readers and the scheduler can look files up instead
+    of guessing filenames and only finding out a file is missing when a worker fails to open it.
+
+    The modification time of every directory scanned is saved along with the catalog. When it's loaded, products with
+    a directory that changed since (e.g. new files arrived) are scanned again.
+    """
+    from constants import data_dir_path, output_dir_path
+
+    catalog_filepath = os.path.join(output_dir_path, 'input_data_catalog.pickle')
+
+    # Saved catalogs with a different version are scanned again, e.g. after changing how files are picked.
+    catalog_version = 2
+
+    # For each product: the directory to scan (relative to data_dir_path), a regex for the filenames, the time period
+    # each file covers ('daily', 'yearly', or 'monthly'), and a function that turns the regex match into the period key.
+    # If more than one file matches the same key (e.g. different satellites, releases or processing dates), the one the
+    # product's 'preferred' function (of the match and key) is True for is used, then the one that sorts last by
+    # filename.
+    products = {
+        'sea_ice_concentration': {
+            'dir': os.path.join('NOAA_NSIDC_G02202_V3_SEA_ICE_CONCENTRATION', 'south', 'daily'),
+            'regex': r'^seaice_conc_daily_sh_(?P<sensor>f\d\d)_(?P<date>\d{8})_v03(?P<release>r\d\d)\.nc$',
+            'period': 'daily',
+            'key': _daily_date,
+            'preferred': _expected_sea_ice_concentration_file
+        },
+        'sea_ice_motion': {
+            'dir': os.path.join('nsidc0116_icemotion_vectors_v3', 'data', 'south', 'grid'),
+            'regex': r'^icemotion\.grid\.daily\.(?P<year>\d{4})(?P<doy>\d{3})\.s\.v3\.bin$',
+            'period': 'daily',
+            'key': _day_of_year_date
+        },
+        'u_wind': {
+            'dir': os.path.join('ncep.reanalysis.dailyavgs', 'surface_gauss'),
+            'regex': r'^uwnd\.10m\.gauss\.(?P<year>\d{4})\.nc$',
+            'period': 'yearly',
+            'key': _year
+        },
+        'v_wind': {
+            'dir': os.path.join('ncep.reanalysis.dailyavgs', 'surface_gauss'),
+            'regex': r'^vwnd\.10m\.gauss\.(?P<year>\d{4})\.nc$',
+            'period': 'yearly',
+            'key': _year
+        },
+        'dynamic_ocean_topography': {
+            'dir': '',
+            'regex': r'^CS2_combined_Southern_Ocean_(?P<year_start>\d{4})-(?P<year_end>\d{4})\.nc$',
+            'period': 'monthly',
+            'key': None  # One file covers many months, see scan_product().
+        },
+        'geostrophic_velocity': {
+            'dir': os.path.join('SEALEVEL_GLO_PHY_L4_REP_OBSERVATIONS_008_047',
+                                'dataset-duacs-rep-global-merged-allsat-phy-l4-v3'),
+            'regex': r'^dt_global_allsat_msla_h_(?P<date>\d{8})_\d{8}\.nc$',
+            'period': 'daily',
+            'key': _daily_date
+        }
+    }
+
+    # Products needed by calculate_surface_stress.process_day(date) with u_geo_source='CS2'.
+    daily_surface_stress_products = ['sea_ice_concentration', 'sea_ice_motion', 'u_wind', 'v_wind',
+                                     'dynamic_ocean_topography']
+
+    def __init__(self, rebuild=False):
+        self.catalog = None
+        self.dir_mtimes = None
+
+        if not rebuild and os.path.isfile(self.catalog_filepath):
+            self.load_catalog()
+            self.update_catalog()
+        else:
+            self.build_catalog()
+            self.save_catalog()
+
+    @staticmethod
+    def dir_mtime(dirpath):
+        return os.path.getmtime(dirpath) if os.path.isdir(dirpath) else None
+
+    def stale_products(self):
+        """ Products that were never scanned or with a directory that changed since they were. """
+        return [product for product in self.products
+                if product not in self.catalog or product not in self.dir_mtimes
+                or any(self.dir_mtime(dirpath) != mtime for dirpath, mtime in self.dir_mtimes[product].items())]
+
+    def update_catalog(self):
+        stale_products = self.stale_products()
+        if not stale_products:
+            return
+
+        for product in stale_products:
+            logger.info('Input files changed for {:s}. Scanning it again...'.format(product))
+            self.catalog[product] = self.scan_product(product)
+
+        self.save_catalog()
+
+    def scan_product(self, product):
+        from constants import data_dir_path
+
+        product_info = self.products[product]
+        product_dir = os.path.join(data_dir_path, product_info['dir'])
+        filename_regex = re.compile(product_info['regex'])
+
+        entries = {}
+        entry_ranks = {}
+        self.dir_mtimes[product] = {product_dir: self.dir_mtime(product_dir)}
+
+        if not os.path.isdir(product_dir):
+            logger.warning('Input product directory not found for {:s}: {:s}'.format(product, product_dir))
+            return entries
+
+        for dirpath, dirnames, filenames in os.walk(product_dir):
+            self.dir_mtimes[product][dirpath] = self.dir_mtime(dirpath)
+
+            # The CS2 file sits at the top of data_dir_path so don't descend into every other product's directory.
+            if product_info['dir'] == '':
+                dirnames[:] = []
+
+            for filename in sorted(filenames):
+                match = filename_regex.match(filename)
+                if match is None:
+                    continue
+
+                filepath = os.path.join(dirpath, filename)
+                file_stat = os.stat(filepath)
+                entry = {
+                    'filepath': filepath,
+                    'size': file_stat.st_size,
+                    'mtime': file_stat.st_mtime
+                }
+
+                if product_info['key'] is None:
+                    keys = [(year, month)
+                            for year in range(int(match.group('year_start')), int(match.group('year_end')) + 1)
+                            for month in range(1, 13)]
+                else:
+                    keys = [product_info['key'](match)]
+
+                for key in keys:
+                    rank = ('preferred' in product_info and product_info['preferred'](match, key), filename)
+                    if key not in entries or entry_ranks[key] < rank:
+                        entries[key] = entry
+                        entry_ranks[key] = rank
+
+        logger.info('Found {:d} {:s} files in {:s}'.format(len(entries), product, product_dir))
+        return entries
+
+    def build_catalog(self):
+        logger.info('Building input data catalog...')
+        self.catalog = {}
+        self.dir_mtimes = {}
+        for product in self.products:
+            self.catalog[product] = self.scan_product(product)
+
+    def load_catalog(self):
+        import pickle
+        logger.info('Loading input data catalog: {:s}'.format(self.catalog_filepath))
+        with open(self.catalog_filepath, 'rb') as f:
+            saved_catalog = pickle.load(f)
+
+        # Catalogs saved without the directory modification times or by another version get scanned again.
+        self.catalog = saved_catalog.get('catalog', {})
+        self.dir_mtimes = saved_catalog.get('dir_mtimes', {})
+        if saved_catalog.get('version') != self.catalog_version:
+            self.dir_mtimes = {}
+
+    def save_catalog(self):
+        import pickle
+
+        catalog_dir = os.path.dirname(self.catalog_filepath)
+        if not os.path.exists(catalog_dir):
+            logger.info('Creating directory: {:s}'.format(catalog_dir))
+            os.makedirs(catalog_dir)
+
+        logger.info('Saving input data catalog: {:s}'.format(self.catalog_filepath))
+        with open(self.catalog_filepath, 'wb') as f:
+            pickle.dump({'version': self.catalog_version, 'catalog': self.catalog, 'dir_mtimes': self.dir_mtimes}, f,
+                        pickle.HIGHEST_PROTOCOL)
+
+    def date_to_key(self, product, date):
+        period = self.products[product]['period']
+        if period == 'daily':
+            return date
+        elif period == 'monthly':
+            return date.year, date.month
+        elif period == 'yearly':
+            return date.year
+
+    def get_entry(self, product, date):
+        """
+        :return: Dictionary with the filepath, size, and mtime of the file containing the product for the given date,
+                 or None if no such file was found.
+        """
+        if product not in self.products:
+            logger.error('Invalid product: {}'.format(product))
+            raise ValueError('Invalid product: {}'.format(product))
+
+        return self.catalog.get(product, {}).get(self.date_to_key(product, date))
+
+    def get_filepath(self, product, date):
+        entry = self.get_entry(product, date)
+        return None if entry is None else entry['filepath']
+
+    def missing_products(self, date, products=None):
+        if products is None:
+            products = self.daily_surface_stress_products
+
+        return [product for product in products if self.get_entry(product, date) is None]
+
+    def available_dates(self, dates, products=None):
+        """ Return the dates for which all the given products (by default everything process_day needs) exist. """
+        available = []
+        for date in dates:
+            missing = self.missing_products(date, products)
+            if missing:
+                logger.warning('Skipping {}: missing input products {}'.format(date, ', '.join(missing)))
+            else:
+                available.append(date)
+
+        return available
+
+
+# Catalog loaded by this process, see get_input_data_catalog().
+_input_data_catalog = None
+
+
+def get_input_data_catalog():
+    """ Load the input data catalog once per process (building it first if it doesn't exist on disk). """
+    global _input_data_catalog
+    if _input_data_catalog is None:
+        _input_data_catalog = InputDataCatalog()
+    return _input_data_catalog
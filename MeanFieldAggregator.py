@@ -0,0 +1,423 @@
+import os
+import time
+import datetime
+import calendar
+
+import numpy as np
+
+from utils import date_range
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class MeanFieldAggregator(object):
+    """
+    Computes monthly, seasonal, annual and climatological mean fields in a single pass over the daily netCDF files.
+    Periods are registered with the add_* methods, then run() reads each daily file once and adds it to the
+    FieldAccumulator of every period it belongs to, instead of SurfaceStressDataWriter.compute_mean_fields(...)
+    re-reading the same days for every period.
+
+    Periods that cover whole months are built up from monthly partial sums (see FieldAccumulator.monthly_partial),
+    which are saved the first time a month is read, so new climatology windows only need 12 small reads per year.
+
+    The mean fields of a period are written out (and plotted) as soon as its last day has been read and its accumulator
+    is freed, as keeping every finished period in memory until the end of the run would take ~120 MB per period.
+
+    Standard deviations are accumulated along with the means (see FieldAccumulator) and written out as <var>_std for
+    the fields in SurfaceStressDataWriter.std_var_names. Given a climatology, daily anomalies of those fields are also
+    written out as each day is read, in which case every day is read (once) instead of using saved monthly partials.
+
+    Climatologies are updated through their ClimatologyStore after the other periods, so only days added or replaced
+    since they were last written are read again.
+
+    Quantile sketches (see QuantileSketch) registered with add_quantile_sketches(...) are fed from the same pass, in
+    which case their days are read like for anomalies.
+    """
+    season_months = {
+        'DJF': [12, 1, 2],
+        'MAM': [3, 4, 5],
+        'JJA': [6, 7, 8],
+        'SON': [9, 10, 11],
+        'JFM': [1, 2, 3],
+        'AMJ': [4, 5, 6],
+        'JAS': [7, 8, 9],
+        'OND': [10, 11, 12]
+    }
+
+    season_names = {
+        'DJF': 'Summer',
+        'MAM': 'Fall',
+        'JJA': 'Winter',
+        'SON': 'Spring',
+        'JFM': 'Summer',
+        'AMJ': 'Fall',
+        'JAS': 'Winter',
+        'OND': 'Spring'
+    }
+
+    # Fields that can be given a quantile sketch on top of the daily ones, with the daily fields they're computed from.
+    derived_fields = {
+        'tau_magnitude': (['tau_x', 'tau_y'], np.hypot)
+    }
+
+    def __init__(self, avg_method='partial_data_ok', plot=True, skip_existing=True, anomaly_climo=None):
+        """
+        :param plot: Plot the diagnostic fields of every period before writing them out.
+        :param skip_existing: Don't recompute periods whose netCDF file already exists.
+        :param anomaly_climo: (field_type, year_start, year_end) of an existing climatology, with field_type 'climo' or
+                              'monthly_climo', to write out daily anomalies against. See utils.get_anomaly_filepath.
+                              The climatology must already be written out and up to date, it can't be produced by the
+                              same run (see check_anomaly_climo).
+        """
+        self.avg_method = avg_method
+        self.plot = plot
+        self.skip_existing = skip_existing
+
+        if anomaly_climo is not None and anomaly_climo[0] not in ['climo', 'monthly_climo']:
+            logger.error('Invalid anomaly climatology field_type: {}. Choose from [\'climo\', \'monthly_climo\'].'
+                         .format(anomaly_climo[0]))
+            raise ValueError('Invalid anomaly climatology field_type: {}. Choose from [\'climo\', \'monthly_climo\'].'
+                             .format(anomaly_climo[0]))
+
+        self.anomaly_climo = anomaly_climo
+        self.anomaly_climo_fields = {}  # Climatological mean fields in use, keyed by netCDF filepath.
+
+        # Registered periods, keyed by the netCDF filepath they will be written to.
+        self.periods = {}
+
+        # Quantile sketches keyed by field name, and the days they're fed.
+        self.quantile_sketches = {}
+        self.quantile_dates = set()
+
+    def add_period(self, dates, label, field_type, date=None, season_str=None, year_start=None, year_end=None):
+        """
+        Register a period to average over. The other arguments are passed on to SurfaceStressDataWriter. The writer's
+        date is set to the first day of the period.
+        """
+        from utils import get_netCDF_filepath
+        from ClimatologyStore import ClimatologyStore
+
+        if not dates:
+            logger.warning('No days in period {:s}. Skipping it.'.format(label))
+            return
+
+        if date is None:
+            date = dates[0]
+
+        nc_filepath = get_netCDF_filepath(field_type=field_type, date=date, season_str=season_str,
+                                          year_start=year_start, year_end=year_end)
+
+        climo = field_type in ClimatologyStore.climo_field_types
+
+        if self.skip_existing and os.path.isfile(nc_filepath):
+            if not climo:
+                logger.info('{:s} already exists. Skipping it.'.format(nc_filepath))
+                return
+            if ClimatologyStore(nc_filepath, avg_method=self.avg_method).is_fresh(dates):
+                logger.info('{:s} is up to date. Skipping it.'.format(nc_filepath))
+                return
+
+        self.periods[nc_filepath] = {
+            'dates': set(dates),
+            'last_date': max(dates),
+            'label': label,
+            'climo': climo,
+            'writer_kwargs': {'field_type': field_type, 'date': date, 'season_str': season_str,
+                              'year_start': year_start, 'year_end': year_end},
+            'accumulator': None
+        }
+
+    def add_monthly_means(self, months, year_start, year_end):
+        for year in range(year_start, year_end + 1):
+            for month in months:
+                n_days = calendar.monthrange(year, month)[1]
+                dates = date_range(datetime.date(year, month, 1), datetime.date(year, month, n_days))
+                label = calendar.month_abbr[month] + '_' + str(year) + '_average'
+                self.add_period(dates, label, field_type='monthly')
+
+    def add_seasonal_means(self, seasons, year_start, year_end):
+        """ DJF of a given year starts in December of the previous year. """
+        for year in range(year_start, year_end + 1):
+            for season in seasons:
+                dates = []
+                for month in self.season_months[season]:
+                    month_year = year - 1 if season == 'DJF' and month == 12 else year
+                    n_days = calendar.monthrange(month_year, month)[1]
+                    dates = dates + date_range(datetime.date(month_year, month, 1),
+                                               datetime.date(month_year, month, n_days))
+
+                if season == 'DJF':
+                    label = 'Summer_DJF_' + str(year - 1) + '-' + str(year) + '_average'
+                else:
+                    label = self.season_names[season] + '_' + season + '_' + str(year) + '_average'
+
+                self.add_period(dates, label, field_type='seasonal', season_str=season)
+
+    def add_annual_means(self, year_start, year_end):
+        for year in range(year_start, year_end + 1):
+            dates = date_range(datetime.date(year, 1, 1), datetime.date(year, 12, 31))
+            self.add_period(dates, str(year) + '_average', field_type='annual')
+
+    def add_monthly_climatology(self, months, year_start, year_end):
+        year_range = str(year_start) + '-' + str(year_end)
+
+        for month in months:
+            dates = []
+            for year in range(year_start, year_end + 1):
+                n_days = calendar.monthrange(year, month)[1]
+                dates = dates + date_range(datetime.date(year, month, 1), datetime.date(year, month, n_days))
+
+            label = calendar.month_abbr[month] + '_' + year_range + '_average'
+            self.add_period(dates, label, field_type='monthly_climo', date=dates[-1], year_start=year_start,
+                            year_end=year_end)
+
+    def add_seasonal_climatology(self, seasons, year_start, year_end):
+        """ Seasonal climatologies use the months of the season in every year from year_start to year_end. """
+        year_range = str(year_start) + '-' + str(year_end)
+
+        for season in seasons:
+            dates = []
+            for year in range(year_start, year_end + 1):
+                for month in self.season_months[season]:
+                    n_days = calendar.monthrange(year, month)[1]
+                    dates = dates + date_range(datetime.date(year, month, 1), datetime.date(year, month, n_days))
+
+            label = self.season_names[season] + '_' + season + '_' + year_range + '_average'
+            self.add_period(sorted(dates), label, field_type='seasonal_climo', season_str=season,
+                            year_start=year_start, year_end=year_end)
+
+    def add_climatology(self, year_start, year_end):
+        dates = date_range(datetime.date(year_start, 1, 1), datetime.date(year_end, 12, 31))
+        label = str(year_start) + '-' + str(year_end) + '_average'
+        self.add_period(dates, label, field_type='climo', year_start=year_start, year_end=year_end)
+
+    def add_quantile_sketches(self, sketches, dates):
+        """
+        :param sketches: Dictionary of QuantileSketch objects keyed by the daily field (or one of derived_fields) to
+                         feed them, which are left to the caller to write out after run().
+        :param dates: Days to feed them.
+        """
+        from constants import var_units
+
+        for var_name in sketches.keys():
+            if var_name not in var_units and var_name not in self.derived_fields:
+                logger.error('No daily field {:s} to feed a quantile sketch.'.format(var_name))
+                raise ValueError('No daily field {:s} to feed a quantile sketch.'.format(var_name))
+
+        self.quantile_sketches.update(sketches)
+        self.quantile_dates.update(dates)
+
+    def add_to_quantile_sketches(self, day_accumulator):
+        day_fields = day_accumulator.mean_fields()
+
+        for var_name, sketch in self.quantile_sketches.items():
+            if var_name in self.derived_fields:
+                input_var_names, func = self.derived_fields[var_name]
+                sketch.add(func(*[day_fields[input_var_name] for input_var_name in input_var_names]))
+            else:
+                sketch.add(day_fields[var_name])
+
+    def write_period(self, period):
+        from SurfaceStressDataWriter import SurfaceStressDataWriter
+
+        if period['accumulator'] is None or period['accumulator'].n_days == 0:
+            logger.warning('No daily fields found for {:s}. Not writing it.'.format(period['label']))
+            return
+
+        surface_stress_dataset = SurfaceStressDataWriter(**period['writer_kwargs'])
+
+        surface_stress_dataset.set_mean_fields(period['accumulator'])
+
+        if self.plot:
+            surface_stress_dataset.plot_diagnostic_fields(plot_type='custom', custom_label=period['label'])
+
+        surface_stress_dataset.write_fields_to_netcdf()
+
+    def check_anomaly_climo(self, dates):
+        """
+        Make sure the climatologies needed for the anomalies of the given dates exist and are up to date before any of
+        the days are read, rather than failing partway through run().
+        """
+        from utils import get_netCDF_filepath
+        from ClimatologyStore import ClimatologyStore
+
+        field_type, year_start, year_end = self.anomaly_climo
+        climo_dates = date_range(datetime.date(year_start, 1, 1), datetime.date(year_end, 12, 31))
+
+        months = sorted(set(date.month for date in dates)) if field_type == 'monthly_climo' else [None]
+        for month in months:
+            month_climo_dates = [date for date in climo_dates if month is None or date.month == month]
+            climo_filepath = get_netCDF_filepath(field_type=field_type, date=month_climo_dates[-1],
+                                                 year_start=year_start, year_end=year_end)
+
+            if not os.path.isfile(climo_filepath):
+                logger.error('Climatology for anomalies not found: {:s}. Produce it first.'.format(climo_filepath))
+                raise ValueError('Climatology for anomalies not found: {:s}. Produce it first.'.format(climo_filepath))
+
+            if climo_filepath in self.periods \
+                    or not ClimatologyStore(climo_filepath, avg_method=self.avg_method).is_fresh(month_climo_dates):
+                logger.error('Climatology for anomalies is out of date: {:s}. Update it first.'.format(climo_filepath))
+                raise ValueError('Climatology for anomalies is out of date: {:s}. Update it first.'
+                                 .format(climo_filepath))
+
+    def write_anomalies(self, date, day_accumulator):
+        import netCDF4
+        from utils import get_netCDF_filepath, get_anomaly_filepath
+        from constants import var_units, var_long_names
+        from CompressedField import read_netCDF_field
+        from SurfaceStressDataWriter import SurfaceStressDataWriter
+
+        field_type, year_start, year_end = self.anomaly_climo
+        climo_filepath = get_netCDF_filepath(field_type=field_type, date=date, year_start=year_start,
+                                             year_end=year_end)
+
+        if climo_filepath not in self.anomaly_climo_fields:
+            if not os.path.isfile(climo_filepath):
+                logger.error('Climatology for anomalies not found: {:s}'.format(climo_filepath))
+                raise ValueError('Climatology for anomalies not found: {:s}'.format(climo_filepath))
+
+            # Only one climatology is kept in memory as monthly climatologies are used one month at a time.
+            climo_dataset = netCDF4.Dataset(climo_filepath)
+            climo_fields = {var_name: read_netCDF_field(climo_dataset, var_name)
+                            for var_name in SurfaceStressDataWriter.std_var_names}
+            climo_fields['lat'] = np.array(climo_dataset.variables['lat'])
+            climo_fields['lon'] = np.array(climo_dataset.variables['lon'])
+            climo_dataset.close()
+
+            self.anomaly_climo_fields = {climo_filepath: climo_fields}
+
+        climo_fields = self.anomaly_climo_fields[climo_filepath]
+        day_fields = day_accumulator.mean_fields()
+
+        nc_filepath = get_anomaly_filepath(date, field_type, year_start, year_end)
+
+        nc_dir = os.path.dirname(nc_filepath)
+        if not os.path.exists(nc_dir):
+            logger.info('Creating directory: {:s}'.format(nc_dir))
+            os.makedirs(nc_dir)
+
+        logger.info('Saving anomalies to netCDF file: {:s}'.format(nc_filepath))
+
+        tau_dataset = netCDF4.Dataset(nc_filepath, 'w')
+
+        tau_dataset.title = 'Antarctic sea ice zone surface stress anomalies'
+        tau_dataset.climatology = os.path.basename(climo_filepath)
+        tau_dataset.history = 'Created ' + time.ctime() + '.'
+
+        tau_dataset.createDimension('time', None)
+        tau_dataset.createDimension('lat', len(climo_fields['lat']))
+        tau_dataset.createDimension('lon', len(climo_fields['lon']))
+
+        time_var = tau_dataset.createVariable('time', np.float64, ('time',))
+        time_var.units = 'hours since 0001-01-01 00:00:00'
+        time_var.calendar = 'gregorian'
+        time_var[:] = netCDF4.date2num(datetime.datetime(date.year, date.month, date.day), units=time_var.units,
+                                       calendar=time_var.calendar)
+
+        tau_dataset.createVariable('lat', np.float32, ('lat',))[:] = climo_fields['lat']
+        tau_dataset.createVariable('lon', np.float32, ('lon',))[:] = climo_fields['lon']
+
+        for var_name in SurfaceStressDataWriter.std_var_names:
+            field_var = tau_dataset.createVariable(var_name, float, ('lat', 'lon'), zlib=True)
+            field_var[:] = day_fields[var_name] - climo_fields[var_name]
+
+            field_var.units = var_units[var_name]
+            field_var.long_name = var_long_names[var_name] + ' (anomaly)'
+
+        tau_dataset.close()
+
+    def run(self):
+        import itertools
+        from FieldAccumulator import FieldAccumulator
+        from ClimatologyStore import ClimatologyStore
+        from utils import get_monthly_partial_filepath
+        from constants import var_units
+
+        # Every field written out by SurfaceStressDataWriter, unless only quantiles are wanted in which case only the
+        # fields they need are read.
+        read_all_fields = bool(self.periods) or self.anomaly_climo is not None
+        if read_all_fields:
+            var_names = list(var_units.keys())
+        else:
+            var_names = set()
+            for var_name in self.quantile_sketches.keys():
+                var_names.update(self.derived_fields[var_name][0] if var_name in self.derived_fields else [var_name])
+            var_names = sorted(var_names)
+
+        all_dates = sorted(set.union(self.quantile_dates, *[period['dates'] for period in self.periods.values()]))
+
+        if self.anomaly_climo is not None:
+            self.check_anomaly_climo(all_dates)
+        logger.info('Averaging {:d} days into {:d} periods...'.format(len(all_dates), len(self.periods)))
+
+        for (year, month), month_dates in itertools.groupby(all_dates, key=lambda d: (d.year, d.month)):
+            month_dates = list(month_dates)
+            n_days = calendar.monthrange(year, month)[1]
+            whole_month = set(date_range(datetime.date(year, month, 1), datetime.date(year, month, n_days)))
+
+            periods = [period for period in self.periods.values()
+                       if not period['climo'] and period['dates'] & set(month_dates)]
+            whole_month_periods = [period for period in periods if whole_month <= period['dates']]
+            other_periods = [period for period in periods if not whole_month <= period['dates']]
+
+            # Anomalies and quantiles need every day to be read, so whole months are added up from those days (and saved
+            # as the monthly partial) instead.
+            read_days = self.anomaly_climo is not None or bool(self.quantile_dates & set(month_dates))
+            month_accumulator = None
+
+            # Periods covering the whole month get the month's sums in one go, from the saved monthly partial when
+            # possible.
+            if read_days:
+                if set(month_dates) == whole_month and read_all_fields:
+                    month_accumulator = FieldAccumulator(avg_method=self.avg_method)
+            elif whole_month_periods:
+                if self.avg_method == 'partial_data_ok':
+                    month_accumulator = FieldAccumulator.monthly_partial(year, month, var_names)
+                else:
+                    month_accumulator = FieldAccumulator.from_dates(sorted(whole_month), var_names, self.avg_method)
+
+            # Periods covering only part of the month get their days one by one.
+            for date in month_dates:
+                day_periods = [period for period in other_periods if date in period['dates']]
+                if not day_periods and not read_days:
+                    continue
+
+                day_accumulator = FieldAccumulator.from_dates([date], var_names, self.avg_method)
+                for period in day_periods:
+                    self.period_accumulator(period).merge(day_accumulator)
+
+                if read_days and day_accumulator.n_days > 0:
+                    if self.anomaly_climo is not None:
+                        self.write_anomalies(date, day_accumulator)
+                    if date in self.quantile_dates:
+                        self.add_to_quantile_sketches(day_accumulator)
+                    if month_accumulator is not None:
+                        month_accumulator.merge(day_accumulator)
+
+            if read_days and month_accumulator is not None and self.avg_method == 'partial_data_ok':
+                month_accumulator.save(get_monthly_partial_filepath(year, month))
+
+            for period in whole_month_periods:
+                self.period_accumulator(period).merge(month_accumulator)
+
+            for period in periods:
+                if period['last_date'] <= month_dates[-1]:
+                    self.write_period(period)
+                    period['accumulator'] = None
+
+        for nc_filepath, period in self.periods.items():
+            if period['climo']:
+                climo_store = ClimatologyStore(nc_filepath, avg_method=self.avg_method)
+                climo_store.update(period['dates'], var_names)
+
+                period['accumulator'] = climo_store.accumulator
+                self.write_period(period)
+                period['accumulator'] = None
+
+    def period_accumulator(self, period):
+        from FieldAccumulator import FieldAccumulator
+
+        if period['accumulator'] is None:
+            period['accumulator'] = FieldAccumulator(avg_method=self.avg_method)
+        return period['accumulator']
@@ -18,7 +18,7 @@ class NeutralDensityDataset(object):
 
     neutral_density_output_dir = path.join(output_dir_path, 'neutral_density')
 
-    def __init__(self, time_span, avg_period, grid_size, field_type, depth_levels):
+    def __init__(self, time_span, avg_period, grid_size, field_type, depth_levels, load_fields=True):
         """
         :param time_span: Choose from '5564', '6574', '7584', '8594', '95A4', 'A5B2', 'decav', and 'all'.
         :param avg_period: Choose from annual ('00'), monthly ('01'-'12'), and seasonal ('13' for JFM, '14' for AMJ,
@@ -26,6 +26,8 @@ class NeutralDensityDataset(object):
         :param grid_size: Choose from '04', '01', and '5d'.
         :param field_type: Choose from 'an', 'mn', 'dd', 'ma', 'sd', 'se', 'oa', and 'gp'.
         :param depth_level:
+        :param load_fields: Set to False to skip loading the full fields into memory, e.g. when only meridional sections
+                            are needed (see meridional_gamma_profiles).
         """
         self.neutral_density_dataset = None
 
@@ -59,6 +61,9 @@ class NeutralDensityDataset(object):
         self.salinity_dataset = SalinityDataset(time_span, avg_period, grid_size, field_type)
         self.temperature_dataset = TemperatureDataset(time_span, avg_period, grid_size, field_type)
 
+        if not load_fields:
+            return
+
         # If dataset already exists and is stored, load it up.
         for i in range(len(self.depth_levels)):
             neutral_density_dataset_filepath = self.neutral_density_dataset_filepath(self.depth_levels[i])
@@ -166,24 +171,44 @@ class NeutralDensityDataset(object):
 
         gamma_n_dataset.close()
 
-    def meridional_gamma_profile(self, lon, lat_min, lat_max):
-        n_levels, n_lats, n_lons = self.neutral_density_field.shape
-        n_depths = len(self.depth_levels)
+    def meridional_gamma_profiles(self, lons, lat_min, lat_max):
+        """
+        Extract meridional neutral density sections at multiple longitudes. Only the (lat, lon) hyperslab containing
+        them is read from each depth level's netCDF file so the full fields don't need to be loaded.
 
-        idx_lon = np.abs(self.lons - lon).argmin()
+        :return: lats, depth levels, and an array of shape (len(lons), n_depths, n_lats) with one section per longitude.
+        """
+        idx_lons = [np.abs(self.lons - lon).argmin() for lon in lons]
         idx_lat_min = np.abs(self.lats - lat_min).argmin()
         idx_lat_max = np.abs(self.lats - lat_max).argmin() + 1
 
         n_lats = idx_lat_max - idx_lat_min
         lats = self.lats[idx_lat_min:idx_lat_max]
 
-        gamma_profile = np.zeros((n_lats, n_levels))
-        for i in range(n_depths):
-            gamma_profile[:, i] = self.neutral_density_field[i, idx_lat_min:idx_lat_max, idx_lon]
+        # netCDF4 wants increasing indices so read each longitude once and then put them back in the requested order.
+        idx_lons_unique, idx_inverse = np.unique(idx_lons, return_inverse=True)
+
+        gamma_hyperslab = np.zeros((len(self.depth_levels), n_lats, len(idx_lons_unique)))
+        for i in range(len(self.depth_levels)):
+            neutral_density_dataset_filepath = self.neutral_density_dataset_filepath(self.depth_levels[i])
+
+            try:
+                with netCDF4.Dataset(neutral_density_dataset_filepath) as gamma_dataset:
+                    gamma_var = gamma_dataset.variables['neutral_density']
+                    gamma_hyperslab[i] = np.ma.filled(gamma_var[idx_lat_min:idx_lat_max, idx_lons_unique], np.nan)
+            except OSError as e:
+                logger.error('{}'.format(e))
+                logger.warning('{:s} not found. Leaving that depth level as NaN.'
+                               .format(neutral_density_dataset_filepath))
+                gamma_hyperslab[i] = np.nan
 
-        # gamma_profile[gamma_profile > 1e3] = np.nan
+        gamma_profiles = np.moveaxis(gamma_hyperslab, -1, 0)[idx_inverse]
 
-        return lats, self.depth_levels, gamma_profile.transpose()
+        return lats, self.depth_levels, gamma_profiles
+
+    def meridional_gamma_profile(self, lon, lat_min, lat_max):
+        lats, depth_levels, gamma_profiles = self.meridional_gamma_profiles([lon], lat_min, lat_max)
+        return lats, depth_levels, gamma_profiles[0]
 
     def gamma_n(self, lat, lon, depth_level):
         assert -90 <= lat <= 90, "Latitude value {} out of bounds!".format(lat)
@@ -207,3 +232,26 @@ class NeutralDensityDataset(object):
             gamma_n_bar = gamma_n_bar + (self.neutral_density_field[lvl][idx_lat][idx_lon] / len(depth_levels))
 
         return gamma_n_bar
+
+    def gamma_n_depth_averaged_field(self, lats, lons, depth_levels):
+        """
+        Same as calling gamma_n_depth_averaged(lat, lon, depth_levels) at every point of a lat-lon grid, with the
+        nearest grid point found once per row and column and the depth levels gathered in one go.
+
+        :return: Depth-averaged neutral density of shape (len(lats), len(lons)).
+        """
+        from utils import nearest_index
+
+        idx_lat = nearest_index(self.lats, lats)
+        idx_lon = nearest_index(self.lons, lons)
+
+        # neutral_density_field is indexed by position in self.depth_levels, which is only the depth level itself when
+        # the dataset was loaded starting at level 0.
+        idx_levels = [self.depth_levels.index(lvl) for lvl in depth_levels]
+        gamma_n_levels = self.neutral_density_field[np.ix_(idx_levels, idx_lat, idx_lon)]
+
+        gamma_n_bar = np.zeros((len(lats), len(lons)))
+        for gamma_n_level in gamma_n_levels:
+            gamma_n_bar = gamma_n_bar + (gamma_n_level / len(depth_levels))
+
+        return gamma_n_bar
@@ -0,0 +1,150 @@
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class QuantileSketch(object):
+    """
+    Streaming estimates of quantiles of a field at every grid point, plus counts of the days above (or below) some
+    thresholds, without keeping the daily fields around. Memory doesn't grow with the number of days: each quantile
+    takes 5 markers per grid point.
+
+    Quantiles are estimated with the P-square algorithm (Jain and Chlamtac, 1985, Communications of the ACM 28(10),
+    1076-1085), done for all grid points at once. The first 5 days with data at a grid point are kept as they are, so
+    quantiles over fewer days are exact. NaNs are skipped, like avg_method='partial_data_ok'.
+    """
+    def __init__(self, quantiles, shape, thresholds=None, lower_thresholds=None):
+        """
+        :param quantiles: Quantiles to estimate, between 0 and 1, e.g. [0.05, 0.5, 0.95].
+        :param shape: Shape of the fields.
+        :param thresholds: Count the days where the field is greater than each of these values.
+        :param lower_thresholds: Count the days where the field is less than each of these values, e.g. for downwelling
+                                 with a negative Ekman_w.
+        """
+        self.quantiles = list(quantiles)
+        self.shape = shape
+        self.thresholds = [] if thresholds is None else list(thresholds)
+        self.lower_thresholds = [] if lower_thresholds is None else list(lower_thresholds)
+
+        for p in self.quantiles:
+            if not 0 < p < 1:
+                logger.error('Quantiles must be between 0 and 1, got {}.'.format(p))
+                raise ValueError('Quantiles must be between 0 and 1, got {}.'.format(p))
+
+        n_cells = int(np.prod(shape))
+
+        # Number of days with data at each grid point.
+        self.n_obs = np.zeros(n_cells, dtype=np.int32)
+
+        # The first 5 observations at each grid point.
+        self.initial_obs = np.full((5, n_cells), np.nan)
+
+        # Marker heights and positions (1-based as in the paper) for each quantile. Their desired positions are the
+        # same at every grid point for the same number of observations so they are computed when needed.
+        self.marker_heights = {p: np.zeros((5, n_cells)) for p in self.quantiles}
+        self.marker_positions = {p: np.zeros((5, n_cells)) for p in self.quantiles}
+
+        self.exceedances = {threshold: np.zeros(n_cells, dtype=np.int32) for threshold in self.thresholds}
+        self.lower_exceedances = {threshold: np.zeros(n_cells, dtype=np.int32) for threshold in self.lower_thresholds}
+
+    def add(self, field):
+        x = np.asarray(field, dtype=float).ravel()
+        valid = ~np.isnan(x)
+
+        for threshold in self.thresholds:
+            self.exceedances[threshold] += valid & (np.nan_to_num(x, nan=-np.inf) > threshold)
+        for threshold in self.lower_thresholds:
+            self.lower_exceedances[threshold] += valid & (np.nan_to_num(x, nan=np.inf) < threshold)
+
+        # Grid points still filling up their first 5 observations.
+        filling = np.flatnonzero(valid & (self.n_obs < 5))
+        self.initial_obs[self.n_obs[filling], filling] = x[filling]
+
+        # Grid points with 5 observations now have their markers set up from them.
+        full = filling[self.n_obs[filling] == 4]
+        if full.size > 0:
+            sorted_obs = np.sort(self.initial_obs[:, full], axis=0)
+            for p in self.quantiles:
+                self.marker_heights[p][:, full] = sorted_obs
+                self.marker_positions[p][:, full] = np.arange(1, 6)[:, np.newaxis]
+
+        updating = np.flatnonzero(valid & (self.n_obs >= 5))
+        if updating.size > 0:
+            for p in self.quantiles:
+                self._update_markers(p, updating, x[updating])
+
+        self.n_obs[valid] += 1
+
+    def _update_markers(self, p, cells, x):
+        q = self.marker_heights[p][:, cells]
+        n = self.marker_positions[p][:, cells]
+
+        # Find the cell k the new observation falls in, stretching the end markers if it's outside them, then shift
+        # the markers above it.
+        k = np.sum(x >= q[1:4], axis=0)
+        q[0] = np.minimum(q[0], x)
+        q[4] = np.maximum(q[4], x)
+        n += np.arange(5)[:, np.newaxis] > k
+
+        # Desired marker positions after n_obs + 1 observations.
+        n_total = self.n_obs[cells] + 1
+        desired = np.array([np.ones_like(n_total, dtype=float), 1 + (n_total - 1) * p / 2, 1 + (n_total - 1) * p,
+                            1 + (n_total - 1) * (1 + p) / 2, n_total.astype(float)])
+
+        # Move the middle markers towards their desired positions, one at a time as each move depends on the last.
+        for i in range(1, 4):
+            d = desired[i] - n[i]
+            move = ((d >= 1) & (n[i+1] - n[i] > 1)) | ((d <= -1) & (n[i-1] - n[i] < -1))
+            s = np.sign(d) * move
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                parabolic = q[i] + s / (n[i+1] - n[i-1]) * ((n[i] - n[i-1] + s) * (q[i+1] - q[i]) / (n[i+1] - n[i])
+                                                            + (n[i+1] - n[i] - s) * (q[i] - q[i-1]) / (n[i] - n[i-1]))
+                q_neighbour = np.where(s > 0, q[i+1], q[i-1])
+                n_neighbour = np.where(s > 0, n[i+1], n[i-1])
+                linear = q[i] + s * (q_neighbour - q[i]) / (n_neighbour - n[i])
+
+            use_parabolic = (q[i-1] < parabolic) & (parabolic < q[i+1])
+            q[i] = np.where(move, np.where(use_parabolic, parabolic, linear), q[i])
+            n[i] = n[i] + s
+
+        self.marker_heights[p][:, cells] = q
+        self.marker_positions[p][:, cells] = n
+
+    def quantile_fields(self):
+        """
+        :return: Dictionary with the estimated field of each quantile. Grid points without any data are NaN.
+        """
+        import warnings
+
+        quantile_fields = {}
+
+        for p in self.quantiles:
+            field = np.full(self.n_obs.shape, np.nan)
+
+            initialized = self.n_obs >= 5
+            field[initialized] = self.marker_heights[p][2, initialized]
+
+            # Exact quantiles where there are fewer than 5 observations.
+            few = (self.n_obs > 0) & ~initialized
+            if np.any(few):
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', RuntimeWarning)
+                    field[few] = np.nanquantile(self.initial_obs[:, few], p, axis=0)
+
+            quantile_fields[p] = field.reshape(self.shape)
+
+        return quantile_fields
+
+    def exceedance_fields(self, lower=False):
+        """
+        :return: Dictionary with the number of days the field was greater than each threshold, or less than each of the
+                 lower thresholds if lower=True.
+        """
+        exceedances = self.lower_exceedances if lower else self.exceedances
+        return {threshold: counts.reshape(self.shape) for threshold, counts in exceedances.items()}
+
+    def day_counts(self):
+        """ :return: Number of days with data at each grid point. """
+        return self.n_obs.reshape(self.shape)
@@ -0,0 +1,158 @@
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class RegionalStatistics(object):
+    """
+    Area-weighted means and integrals of many fields over named regions of the lat-lon grid, e.g.
+
+        regions = RegionalStatistics()
+        regions.add_box('Weddell_Gyre', -68, -55, -60, 30)
+        regions.add_sectors()
+        means = regions.means({'alpha': alpha_field, 'Ekman_w': w_Ekman_field})
+        WG_alpha = means['Weddell_Gyre']['alpha']
+
+    The regions are compiled once into a matrix of cell area weights (n_regions, n_lat*n_lon) so each day is reduced
+    with a couple of matrix products for all regions and fields at once, instead of building boolean masks and calling
+    np.nanmean on every field. Cells are weighted by their area on the sphere (see Grid.cell_area) so a cell at 80S
+    doesn't count as much as one at 40S. The last longitude column (+180) duplicates the first (-180) so it gets no
+    weight. Like avg_method='partial_data_ok', NaNs are left out of both the integral and the area it's divided by.
+    """
+
+    # Sectors of Zwally et al. (1983) commonly used for Antarctic sea ice, as (lon_min, lon_max).
+    sectors = {
+        'Weddell_Sea': (-60, 20),
+        'Indian_Ocean': (20, 90),
+        'Western_Pacific_Ocean': (90, 160),
+        'Ross_Sea': (160, -130),
+        'Bellingshausen_Amundsen_Seas': (-130, -60)
+    }
+
+    def __init__(self):
+        from Grid import get_grid
+
+        grid = get_grid()
+        self.shape = grid.shape
+        self.lat_grid = grid.lat_grid
+        self.lon_grid = grid.lon_grid
+
+        self.cell_area = np.array(grid.cell_area)
+        self.cell_area[:, -1] = 0
+
+        self.region_names = []
+        self.region_weights = np.zeros((0, self.cell_area.size))
+
+    def add_mask(self, name, mask):
+        """ Add a region made up of the cells where the boolean (n_lat, n_lon) mask is True. """
+        mask = np.asarray(mask, dtype=bool)
+
+        if mask.shape != self.shape:
+            logger.error('Region mask {:s} has shape {}, not {}.'.format(name, mask.shape, self.shape))
+            raise ValueError('Region mask {:s} has shape {}, not {}.'.format(name, mask.shape, self.shape))
+
+        if name in self.region_names:
+            logger.error('Region {:s} was already added.'.format(name))
+            raise ValueError('Region {:s} was already added.'.format(name))
+
+        weights = np.where(mask, self.cell_area, 0).ravel()
+
+        self.region_names.append(name)
+        self.region_weights = np.vstack([self.region_weights, weights])
+
+        logger.info('Added region {:s} ({:.4g} km^2).'.format(name, weights.sum() / 1e6))
+
+    def add_box(self, name, lat_min, lat_max, lon_min, lon_max):
+        """ Add the cells within a lat-lon box (edges included), wrapping around 180 if lon_min > lon_max. """
+        in_lats = (self.lat_grid >= lat_min) & (self.lat_grid <= lat_max)
+
+        if lon_min <= lon_max:
+            in_lons = (self.lon_grid >= lon_min) & (self.lon_grid <= lon_max)
+        else:
+            in_lons = (self.lon_grid >= lon_min) | (self.lon_grid <= lon_max)
+
+        self.add_mask(name, in_lats & in_lons)
+
+    def add_sectors(self, lat_min=-90, lat_max=90):
+        """ Add every sector in RegionalStatistics.sectors, optionally bounded in latitude. """
+        for name, (lon_min, lon_max) in self.sectors.items():
+            self.add_box(name, lat_min, lat_max, lon_min, lon_max)
+
+    def add_streamwise_band(self, name, tau_filepath, c_min, c_max):
+        """
+        Add the cells with a streamwise coordinate (see streamwise_coordinates) c_min <= c < c_max, e.g. the region
+        south of the Antarctic Divergence is c_min=0, c_max=0.5.
+        """
+        contour_coordinates = self.streamwise_coordinates(tau_filepath)
+
+        with np.errstate(invalid='ignore'):
+            self.add_mask(name, (contour_coordinates >= c_min) & (contour_coordinates < c_max))
+
+    @staticmethod
+    def streamwise_coordinates(tau_filepath):
+        """
+        Streamwise coordinate of every cell going from 0 at the coast to 0.5 at the northernmost zero zonal stress line
+        and 1 at the northernmost ice edge, linear in latitude in between. NaN outside of that range and at longitudes
+        where the three lines aren't in that order.
+        """
+        from utils import get_field_from_netcdf
+        from utils import get_northward_zero_zonal_stress_line, get_northward_ice_edge, get_coast_coordinates
+
+        _, lats, _ = get_field_from_netcdf(tau_filepath, 'tau_x')
+
+        _, tau_x_lats = get_northward_zero_zonal_stress_line(tau_filepath)
+        _, alpha_lats = get_northward_ice_edge(tau_filepath)
+        _, coast_lats = get_coast_coordinates(tau_filepath)
+
+        # Each row is a latitude and each column a longitude.
+        lat = lats[:, np.newaxis]
+        lat_0 = coast_lats[np.newaxis, :]
+        lat_h = tau_x_lats[np.newaxis, :]  # lat_h is short for lat_half ~ lat_1/2
+        lat_1 = alpha_lats[np.newaxis, :]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ordered = (lat_1 > lat_h) & (lat_h > lat_0)
+            in_range = ordered & (lat >= lat_0) & (lat <= lat_1)
+
+            contour_coordinates = np.where(lat <= lat_h, (lat - lat_0) / (2 * (lat_h - lat_0)),
+                                           0.5 + (lat - lat_h) / (2 * (lat_1 - lat_h)))
+
+        return np.where(in_range, contour_coordinates, np.nan)
+
+    def integrals(self, fields):
+        """
+        :param fields: Dictionary of (n_lat, n_lon) fields.
+        :return: Dictionary of dictionaries, integrals[region][var_name], of the area integral of each field over each
+                 region, e.g. alpha gives the sea ice area [m^2] and Ekman_w the Ekman upwelling transport [m^3/s].
+        """
+        return self._reduce(fields)[0]
+
+    def means(self, fields):
+        """
+        :param fields: Dictionary of (n_lat, n_lon) fields.
+        :return: Dictionary of dictionaries, means[region][var_name], of the area-weighted mean of each field over each
+                 region. NaN where a region has no data.
+        """
+        return self._reduce(fields)[1]
+
+    def _reduce(self, fields):
+        var_names = list(fields.keys())
+
+        stacked_fields = np.stack([np.asarray(fields[var_name], dtype=float).ravel() for var_name in var_names])
+        valid = ~np.isnan(stacked_fields)
+
+        # Integrals and areas with data, shape (n_vars, n_regions).
+        field_integrals = np.where(valid, stacked_fields, 0) @ self.region_weights.T
+        areas = valid.astype(float) @ self.region_weights.T
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            field_means = np.where(areas > 0, field_integrals / areas, np.nan)
+
+        integrals = {}
+        means = {}
+        for r, region_name in enumerate(self.region_names):
+            integrals[region_name] = {var_name: field_integrals[v, r] for v, var_name in enumerate(var_names)}
+            means[region_name] = {var_name: field_means[v, r] for v, var_name in enumerate(var_names)}
+
+        return integrals, means
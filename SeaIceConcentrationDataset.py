@@ -30,7 +30,10 @@ class SeaIceConcentrationDataset(object):
         self.load_alpha_dataset()
         self.interpolate_alpha_field()
 
-    def date_to_alpha_dataset_filepath(self, date):
+    @staticmethod
+    def sensor_and_release(date):
+        """ The satellite (e.g. 'f13') and release (e.g. 'r00') of the file to use for a date. """
+        rev = None
         if date.year >= 2008:
             rev = 'f17'
         elif 1995 <= date.year <= 2007:
@@ -49,6 +52,18 @@ class SeaIceConcentrationDataset(object):
         else:
             release = 'r00'
 
+        return rev, release
+
+    def date_to_alpha_dataset_filepath(self, date):
+        from InputDataCatalog import get_input_data_catalog
+
+        # Use the file found by the input data catalog if there is one, otherwise guess the filename.
+        dataset_filepath = get_input_data_catalog().get_filepath('sea_ice_concentration', date)
+        if dataset_filepath is not None:
+            return dataset_filepath
+
+        rev, release = self.sensor_and_release(date)
+
         filename = 'seaice_conc_daily_sh_' + rev + '_' + str(date.year) + str(date.month).zfill(2) + \
                    str(date.day).zfill(2) + '_v03' + release + '.nc'
         return path.join(self.sic_data_dir_path, str(date.year), filename)
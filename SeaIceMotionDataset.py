@@ -63,6 +63,13 @@ class SeaIceMotionDataset(object):
             filename = 'icemotion.grid.month.' + str(date.year) + '.' + str(date.month).zfill(2) + '.s.v3.bin'
             return path.join(self.seaice_motion_path, 'means', str(date.year), filename)
         else:
+            from InputDataCatalog import get_input_data_catalog
+
+            # Use the file found by the input data catalog if there is one, otherwise guess the filename.
+            dataset_filepath = get_input_data_catalog().get_filepath('sea_ice_motion', date)
+            if dataset_filepath is not None:
+                return dataset_filepath
+
             filename = 'icemotion.grid.daily.' + str(date.year) + str(date.timetuple().tm_yday).zfill(3) + '.s.v3.bin'
             return path.join(self.seaice_motion_path, 'grid', str(date.year), filename)
 
@@ -1,7 +1,4 @@
 import os
-import csv
-import pickle
-from scipy.spatial.distance import cdist
 
 import numpy as np
 
@@ -13,153 +10,141 @@ class SeaIceThicknessDataset(object):
     from constants import data_dir_path, output_dir_path
 
     h_ice_data_dir_path = os.path.join(data_dir_path, 'ICESat_sea_ice_thickness')
-    h_ice_interp_filepath = os.path.join(output_dir_path, 'h_ice_ICESat_interp.pickle')
+
+    # The seasonal h_ice vectors and the (lat, lon) -> closest point map are cached as .npy files in this directory so
+    # they can be memory-mapped instead of unpickled by every process.
+    h_ice_interp_dir = os.path.join(output_dir_path, 'h_ice_ICESat_interp')
+
+    seasons = ['summer', 'fall', 'spring']
+
+    # Seasonal h_ice fields on the lat-lon grid, shared by all instances so every day of a season reuses the same array.
+    h_ice_field_cache = {}
 
     def __init__(self, date):
         self.date = date
         self.season = None
 
-        self.lats = np.zeros(104913)
-        self.lons = np.zeros(104913)
-        self.h_ice = np.zeros(104913)
-        self.latlon = np.zeros((104913, 2))
+        self.lats = None
+        self.lons = None
+        self.h_ice = None
+        self.kd_tree = None
 
         # Lots of "interpolation" happening here. I am using the Feb/Mar field for JFM, the May/Jun field for AMJ, and
         # the Nov/Dec field for OND. Also, since no JAS data exists, I am using the OND field for JAS, my argument
         # being that the JAS h_ice field looks similar to the OND h_ice field in model data published by Holland
         # et al., "Modeled Trends in Antarctic Sea Ice Thickness", Journal of Climate (2014).
+        self.season = self.date_to_season(date)
+
+        self.dataset_filename = self.season + '_ICESat_gridded_mean_thickness_sorted.txt'
+        self.dataset_filepath = os.path.join(self.h_ice_data_dir_path, self.dataset_filename)
+
+        closest_point_idx_filepath = os.path.join(self.h_ice_interp_dir, 'closest_point_idx.npy')
+
+        if not os.path.isfile(closest_point_idx_filepath):
+            logger.info('{:s} not found, will compute it.'.format(closest_point_idx_filepath))
+            self.build_h_ice_cache()
+
+        logger.info('Memory-mapping cached sea ice thickness fields: {:s}'.format(self.h_ice_interp_dir))
+        self.lats = np.load(os.path.join(self.h_ice_interp_dir, 'lats.npy'), mmap_mode='r')
+        self.lons = np.load(os.path.join(self.h_ice_interp_dir, 'lons.npy'), mmap_mode='r')
+        self.closest_point_idx = np.load(closest_point_idx_filepath, mmap_mode='r')
+
+        self.h_ice_seasonal = {}
+        for season in self.seasons:
+            h_ice_filepath = os.path.join(self.h_ice_interp_dir, 'h_ice_' + season + '.npy')
+            self.h_ice_seasonal[season] = np.load(h_ice_filepath, mmap_mode='r')
+
+        self.h_ice = self.h_ice_seasonal[self.season]
+
+    @staticmethod
+    def date_to_season(date):
         if 1 <= date.month <= 3:
-            self.season = 'summer'
+            return 'summer'
         elif 4 <= date.month <= 6:
-            self.season = 'fall'
+            return 'fall'
         elif 7 <= date.month <= 12:
-            self.season = 'spring'
+            return 'spring'
         else:
             logger.error('No sea ice thickness data for month {:d}!'.format(date.month))
 
-        self.dataset_filename = self.season + '_ICESat_gridded_mean_thickness_sorted.txt'
-        self.dataset_filepath = os.path.join(self.h_ice_data_dir_path, self.dataset_filename)
+    @staticmethod
+    def latlon_to_unit_vectors(lats, lons):
+        # Points on the unit sphere so that Euclidean distances between them are monotonic in great-circle distance,
+        # which keeps nearest-neighbour lookups correct across the dateline and close to the pole.
+        lats, lons = np.deg2rad(lats), np.deg2rad(lons)
+        return np.column_stack((np.cos(lats) * np.cos(lons), np.cos(lats) * np.sin(lons), np.sin(lats)))
 
-        pickle_found = False
-        try:
-            with open(self.h_ice_interp_filepath, 'rb') as f:
-                h_ice_interp_pickle_dict = pickle.load(f)
-                self.h_ice_seasonal = h_ice_interp_pickle_dict['h_ice_seasonal_dict']
-                self.closest_point_idx = h_ice_interp_pickle_dict['closest_point_idx_array']
-                pickle_found = True
-        except OSError as e:
-            logger.info('h_ice_ICESat_interp.pickle not found, will compute it.')
-
-        if not pickle_found:
-            logger.info('SeaIceThicknessDataset object initializing for {:s} season...'.format(self.season))
-            self.load_h_ice_dataset()
-
-            self.h_ice_seasonal = {
-                'summer': np.zeros(104913),
-                'fall': np.zeros(104913),
-                'spring': np.zeros(104913)
-            }
-
-            # Load in all three seasonal h_ice fields.
-            for season in ['summer', 'fall', 'spring']:
-                logger.info('Loading season {:s}...'.format(season))
-                dataset_filename = season + '_ICESat_gridded_mean_thickness_sorted.txt'
-                dataset_filepath = os.path.join(self.h_ice_data_dir_path, dataset_filename)
-
-                with open(dataset_filepath, 'rt') as f:
-                    reader = csv.reader(f, delimiter=' ', skipinitialspace=True)
-                    for i, line in enumerate(reader):
-                        sea_ice_freeboard = line[2]
-                        sea_ice_thickness = line[3]
-
-                        if sea_ice_thickness == '-999':
-                            self.h_ice_seasonal[season][i] = np.nan
-                        else:
-                            self.h_ice_seasonal[season][i] = float(sea_ice_thickness)
-
-            # Create a map from input (lat, lon) to the closest idx in the h_ice list for quick h_ice(lat, lon) lookup.
-            from constants import lat_min, lat_max, n_lat, lon_min, lon_max, n_lon
-            lats_array = np.linspace(lat_min, lat_max, n_lat)
-            lons_array = np.linspace(lon_min, lon_max, n_lon)
-
-            self.closest_point_idx = np.zeros((len(lats_array), len(lons_array)))
-
-            logger.info('Computing (lat, lon) -> closest_point_idx(lat, lon) map...')
-            for i in range(len(lats_array)):
-                lat = lats_array[i]
-                for j in range(len(lons_array)):
-                    lon = lons_array[j]
-
-                    if lon < 0:
-                        lon = lon + 360
-
-                    lat_start_idx = np.searchsorted(self.lats, lat)
-
-                    delta_idx = 250
-                    idx1 = max(0, lat_start_idx - delta_idx)
-                    idx2 = min(lat_start_idx + delta_idx, len(self.lats))
-
-                    point = np.array([lat, lon])
-                    points = np.column_stack((self.lats[idx1:idx2], self.lons[idx1:idx2]))
-
-                    self.closest_point_idx[i][j] = idx1 + cdist([point], points).argmin()
-
-            h_ice_interp_pickle_dict = {
-                'h_ice_seasonal_dict': self.h_ice_seasonal,
-                'closest_point_idx_array': self.closest_point_idx
-            }
-
-            pickle_dir = os.path.dirname(self.h_ice_interp_filepath)
-            if not os.path.exists(pickle_dir):
-                logger.info('Creating directory: {:s}'.format(pickle_dir))
-                os.makedirs(pickle_dir)
-
-            with open(self.h_ice_interp_filepath, 'wb') as f:
-                pickle.dump(h_ice_interp_pickle_dict, f, pickle.HIGHEST_PROTOCOL)
-
-    def load_h_ice_dataset(self):
-        logger.info('Loading sea ice concentration dataset: {}'.format(self.dataset_filepath))
-
-        with open(self.dataset_filepath, 'rt') as f:
-            reader = csv.reader(f, delimiter=' ', skipinitialspace=True)
-            for i, line in enumerate(reader):
-                self.lats[i] = float(line[0])
-                self.lons[i] = float(line[1])
-
-                sea_ice_freeboard = line[2]
-                sea_ice_thickness = line[3]
-
-                if sea_ice_thickness == '-999':
-                    self.h_ice[i] = np.nan
-                else:
-                    self.h_ice[i] = float(sea_ice_thickness)
-
-        logger.info('Successfully loaded sea ice thickness dataset: {}'.format(self.dataset_filepath))
+    def build_h_ice_cache(self):
+        from scipy.spatial import cKDTree
+        from constants import lat_min, lat_max, n_lat, lon_min, lon_max, n_lon
+
+        logger.info('SeaIceThicknessDataset building cache for all seasons...')
+
+        # Load in all three seasonal h_ice fields. Columns are lat, lon, freeboard, thickness with -999 for missing.
+        h_ice_seasonal = {}
+        for season in self.seasons:
+            dataset_filename = season + '_ICESat_gridded_mean_thickness_sorted.txt'
+            dataset_filepath = os.path.join(self.h_ice_data_dir_path, dataset_filename)
+
+            logger.info('Loading sea ice thickness dataset: {}'.format(dataset_filepath))
+            h_ice_table = np.loadtxt(dataset_filepath, usecols=(0, 1, 3))
+
+            h_ice = h_ice_table[:, 2]
+            h_ice[h_ice == -999] = np.nan
+            h_ice_seasonal[season] = h_ice
+
+            # The (lat, lon) -> closest point map is built using the current season's points, same as before.
+            if season == self.season:
+                lats, lons = h_ice_table[:, 0], h_ice_table[:, 1]
+
+        # Create a map from input (lat, lon) to the closest idx in the h_ice list for quick h_ice(lat, lon) lookup.
+        lats_array = np.linspace(lat_min, lat_max, n_lat)
+        lons_array = np.linspace(lon_min, lon_max, n_lon)
+        lat_grid, lon_grid = np.meshgrid(lats_array, lons_array, indexing='ij')
+
+        logger.info('Computing (lat, lon) -> closest_point_idx(lat, lon) map...')
+        kd_tree = cKDTree(self.latlon_to_unit_vectors(lats, lons))
+        _, closest_point_idx = kd_tree.query(self.latlon_to_unit_vectors(lat_grid.ravel(), lon_grid.ravel()))
+        closest_point_idx = closest_point_idx.reshape((n_lat, n_lon))
+
+        if not os.path.exists(self.h_ice_interp_dir):
+            logger.info('Creating directory: {:s}'.format(self.h_ice_interp_dir))
+            os.makedirs(self.h_ice_interp_dir)
+
+        logger.info('Saving cached sea ice thickness fields: {:s}'.format(self.h_ice_interp_dir))
+        np.save(os.path.join(self.h_ice_interp_dir, 'lats.npy'), lats)
+        np.save(os.path.join(self.h_ice_interp_dir, 'lons.npy'), lons)
+        for season in self.seasons:
+            np.save(os.path.join(self.h_ice_interp_dir, 'h_ice_' + season + '.npy'), h_ice_seasonal[season])
+
+        # Written last as its presence marks the cache as complete.
+        np.save(os.path.join(self.h_ice_interp_dir, 'closest_point_idx.npy'), closest_point_idx)
 
     def sea_ice_thickness(self, lat, lon, date=None):
         if date is not None:
-            if 1 <= date.month <= 3:
-                season = 'summer'
-            elif 4 <= date.month <= 6:
-                season = 'fall'
-            elif 7 <= date.month <= 12:
-                season = 'spring'
-
+            season = self.date_to_season(date)
             closest_idx = int(self.closest_point_idx[lat][lon])
             return self.h_ice_seasonal[season][closest_idx]
 
-        if lon < 0:
-            lon = lon + 360
+        if self.kd_tree is None:
+            from scipy.spatial import cKDTree
+            self.kd_tree = cKDTree(self.latlon_to_unit_vectors(self.lats, self.lons))
 
-        lat_start_idx = np.searchsorted(self.lats, lat)
+        _, closest_point_idx = self.kd_tree.query(self.latlon_to_unit_vectors(lat, lon)[0])
 
-        delta_idx = 250
-        idx1 = max(0, lat_start_idx - delta_idx)
-        idx2 = min(lat_start_idx + delta_idx, len(self.lats))
+        return self.h_ice[closest_point_idx]
 
-        point = np.array([lat, lon])
-        points = np.column_stack((self.lats[idx1:idx2], self.lons[idx1:idx2]))
+    def sea_ice_thickness_field(self, date=None):
+        """
+        :return: The h_ice field on the lat-lon grid for the season containing date (or the dataset's own season),
+                 equivalent to calling sea_ice_thickness(i, j, date) for every (i, j). The returned array is shared
+                 between calls so it is read-only.
+        """
+        season = self.season if date is None else self.date_to_season(date)
 
-        closest_point_idx = idx1 + cdist([point], points).argmin()
+        if season not in self.h_ice_field_cache:
+            h_ice_field = np.asarray(self.h_ice_seasonal[season])[self.closest_point_idx]
+            h_ice_field.setflags(write=False)
+            self.h_ice_field_cache[season] = h_ice_field
 
-        return self.h_ice[closest_point_idx]
+        return self.h_ice_field_cache[season]
@@ -0,0 +1,193 @@
+import os
+import datetime
+
+import numpy as np
+import netCDF4
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class StaticMask(object):
+    """
+    Grid cells that can never produce a surface stress, derived once from the input products and saved so that the
+    daily calculation can skip them instead of looking up every input field and writing NaNs.
+
+    Layers (all boolean arrays of shape (n_lat, n_lon)):
+        SIC_land: the nearest cell of the NSIDC sea ice concentration product carries the land flag.
+        CS2_coverage: the CS2 geostrophic current is defined in at least one month of the CS2 dataset.
+        NCEP_land: the nearest cell of the NCEP reanalysis land-sea mask is land. This is kept for reference only, as
+                   the NCEP T62 grid is too coarse to decide anything near the coast.
+
+    The modification times of the input files the layers were built from are saved along with them, and the mask is
+    rebuilt when any of them changes (or a file appears or disappears). StaticMask(rebuild=True) or deleting the .npz
+    file forces a rebuild.
+    """
+    from constants import data_dir_path, output_dir_path, n_lat, n_lon
+
+    static_mask_filename = 'static_mask_' + str(n_lat) + 'lats_' + str(n_lon) + 'lons.npz'
+    static_mask_filepath = os.path.join(output_dir_path, static_mask_filename)
+    NCEP_land_filepath = os.path.join(data_dir_path, 'ncep.reanalysis.dailyavgs', 'surface_gauss', 'land.sfc.gauss.nc')
+
+    layers = ['SIC_land', 'CS2_coverage', 'NCEP_land']
+
+    # Flag value used by the NSIDC sea ice concentration CDR (after scaling) for land.
+    SIC_land_flag = 2.54
+
+    def __init__(self, rebuild=False):
+        self.SIC_land = None
+        self.CS2_coverage = None
+        self.NCEP_land = None
+
+        if not rebuild and os.path.isfile(self.static_mask_filepath):
+            self.load_static_mask()
+
+        if self.SIC_land is None:
+            self.build_static_mask()
+            self.save_static_mask()
+
+    def input_filepaths(self):
+        """ :return: The input files the layers are built from. """
+        from InputDataCatalog import get_input_data_catalog
+        from GeostrophicCurrentDataset import GeostrophicCurrentDataset
+
+        sic_files = get_input_data_catalog().catalog.get('sea_ice_concentration', {})
+        SIC_filepath = sic_files[min(sic_files)]['filepath'] if sic_files else ''
+
+        return [SIC_filepath, GeostrophicCurrentDataset.dataset_filepath, self.NCEP_land_filepath]
+
+    def input_mtimes(self):
+        """ :return: Modification times of the input files, NaN for files that don't exist. """
+        return np.array([os.path.getmtime(filepath) if os.path.isfile(filepath) else np.nan
+                         for filepath in self.input_filepaths()])
+
+    def build_SIC_land_layer(self):
+        from InputDataCatalog import get_input_data_catalog
+        from utils import latlon_to_polar_stereographic_xy
+        from Grid import get_grid
+
+        grid = get_grid()
+
+        # The land flag doesn't change from day to day so any file will do.
+        sic_files = get_input_data_catalog().catalog.get('sea_ice_concentration', {})
+        if not sic_files:
+            logger.warning('No sea ice concentration files found. SIC_land layer will be empty.')
+            return np.zeros(grid.shape, dtype=bool)
+
+        sic_filepath = self.input_filepaths()[0]
+        logger.info('Building SIC_land layer from {:s}...'.format(sic_filepath))
+
+        with netCDF4.Dataset(sic_filepath) as sic_dataset:
+            xgrid = np.array(sic_dataset.variables['xgrid'])
+            ygrid = np.array(sic_dataset.variables['ygrid'])
+            alpha = np.array(sic_dataset.variables['goddard_nt_seaice_conc'][0])
+
+        is_land = np.abs(alpha - self.SIC_land_flag) < 0.005
+
+        # Same nearest-neighbour lookup as SeaIceConcentrationDataset.sea_ice_concentration(lat, lon, 'product'), for
+        # every cell at once.
+        x, y = latlon_to_polar_stereographic_xy(grid.lat_grid, grid.lon_grid)
+        idx_x = self.nearest_grid_index(xgrid, x)
+        idx_y = self.nearest_grid_index(ygrid, y)
+
+        return is_land[idx_y, idx_x]
+
+    @staticmethod
+    def nearest_grid_index(coordinates, values):
+        """ utils.nearest_index for coordinates sorted in either direction (polar stereographic y goes down). """
+        from utils import nearest_index
+
+        if coordinates[0] > coordinates[-1]:
+            return len(coordinates) - 1 - nearest_index(coordinates[::-1], values)
+        return nearest_index(coordinates, values)
+
+    def build_CS2_coverage_layer(self):
+        from GeostrophicCurrentDataset import GeostrophicCurrentDataset
+
+        CS2_coverage = None
+
+        for year in range(2011, 2016 + 1):
+            for month in range(1, 13):
+                logger.info('Building CS2_coverage layer ({:d}-{:02d})...'.format(year, month))
+                u_geo_dataset = GeostrophicCurrentDataset(datetime.date(year, month, 1))
+                u_geo_field, _ = u_geo_dataset.geostrophic_current_velocity_field()
+
+                if CS2_coverage is None:
+                    CS2_coverage = ~np.isnan(u_geo_field)
+                else:
+                    CS2_coverage |= ~np.isnan(u_geo_field)
+
+        return CS2_coverage
+
+    def build_NCEP_land_layer(self):
+        from utils import nearest_index
+        from Grid import get_grid
+
+        grid = get_grid()
+
+        if not os.path.isfile(self.NCEP_land_filepath):
+            logger.warning('{:s} not found. NCEP_land layer will be empty.'.format(self.NCEP_land_filepath))
+            return np.zeros(grid.shape, dtype=bool)
+
+        logger.info('Building NCEP_land layer from {:s}...'.format(self.NCEP_land_filepath))
+        with netCDF4.Dataset(self.NCEP_land_filepath) as land_dataset:
+            lats = np.array(land_dataset.variables['lat'])
+            lons = np.array(land_dataset.variables['lon'])
+            land = np.array(land_dataset.variables['land'][0])
+
+        # NCEP latitudes go from north to south and longitudes from 0 to 360.
+        idx_lat = nearest_index(lats[::-1], grid.lats)
+        idx_lon = nearest_index(lons, np.mod(grid.lons, 360))
+
+        return land[::-1][np.ix_(idx_lat, idx_lon)] > 0.5
+
+    def build_static_mask(self):
+        logger.info('Building static mask...')
+        self.SIC_land = self.build_SIC_land_layer()
+        self.CS2_coverage = self.build_CS2_coverage_layer()
+        self.NCEP_land = self.build_NCEP_land_layer()
+
+    def load_static_mask(self):
+        logger.info('Loading static mask: {:s}'.format(self.static_mask_filepath))
+        with np.load(self.static_mask_filepath) as static_mask:
+            if 'input_mtimes' not in static_mask.files \
+                    or not np.array_equal(static_mask['input_filepaths'], self.input_filepaths()) \
+                    or not np.array_equal(static_mask['input_mtimes'], self.input_mtimes(), equal_nan=True):
+                logger.info('Inputs changed since {:s} was built. Rebuilding it.'.format(self.static_mask_filepath))
+                return
+
+            for layer in self.layers:
+                setattr(self, layer, static_mask[layer])
+
+    def save_static_mask(self):
+        static_mask_dir = os.path.dirname(self.static_mask_filepath)
+        if not os.path.exists(static_mask_dir):
+            logger.info('Creating directory: {:s}'.format(static_mask_dir))
+            os.makedirs(static_mask_dir)
+
+        logger.info('Saving static mask: {:s}'.format(self.static_mask_filepath))
+        np.savez_compressed(self.static_mask_filepath, input_filepaths=np.array(self.input_filepaths()),
+                            input_mtimes=self.input_mtimes(), **{layer: getattr(self, layer) for layer in self.layers})
+
+    def active_cells(self, u_geo_source):
+        """
+        :return: Boolean array that is False for cells that can never have a surface stress with the given u_geo_source.
+        """
+        active = ~self.SIC_land
+
+        if u_geo_source == 'CS2':
+            active = active & self.CS2_coverage
+
+        return active
+
+
+# Static mask loaded by this process, see get_static_mask().
+_static_mask = None
+
+
+def get_static_mask():
+    """ Load the static mask once per process (building it first if it doesn't exist on disk). """
+    global _static_mask
+    if _static_mask is None:
+        _static_mask = StaticMask()
+    return _static_mask
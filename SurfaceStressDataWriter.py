@@ -14,16 +14,18 @@ from SurfaceWindDataset import SurfaceWindDataset
 from SeaIceConcentrationDataset import SeaIceConcentrationDataset
 from SeaIceMotionDataset import SeaIceMotionDataset
 from GeostrophicCurrentDataset import GeostrophicCurrentDataset
+from Grid import get_grid
+from expressions import evaluate
 
 from SalinityDataset import SalinityDataset
 from TemperatureDataset import TemperatureDataset
 from NeutralDensityDataset import NeutralDensityDataset
 
-from utils import distance, get_netCDF_filepath, get_WOA_parameters
+from utils import get_netCDF_filepath, get_WOA_parameters
 from constants import output_dir_path, figure_dir_path
 from constants import lat_min, lat_max, lat_step, n_lat, lon_min, lon_max, lon_step, n_lon
 from constants import rho_air, rho_seawater, C_air, C_seawater
-from constants import Omega, rho_0, D_e
+from constants import rho_0, D_e
 
 import logging
 logger = logging.getLogger(__name__)
@@ -41,6 +43,14 @@ class SurfaceStressDataWriter(object):
     R_45deg = np.array([[np.cos(np.pi/4), -np.sin(np.pi/4)], [np.sin(np.pi/4), np.cos(np.pi/4)]])
     R_m45deg = np.array([[np.cos(-np.pi/4), -np.sin(-np.pi/4)], [np.sin(-np.pi/4), np.cos(-np.pi/4)]])
 
+    # Fields that are NaN everywhere outside the sea ice zone. These can be stored compressed by gathering, see
+    # write_fields_to_netcdf.
+    SIZ_var_names = ['tau_SIZ_x', 'tau_SIZ_y', 'tau_nogeo_SIZ_x', 'tau_nogeo_SIZ_y', 'Ekman_SIZ_u', 'Ekman_SIZ_v',
+                     'Ekman_SIZ_U', 'Ekman_SIZ_V', 'tau_ig_x', 'tau_ig_y']
+
+    # Fields whose standard deviation over the averaging period is written out along with mean fields as <var>_std.
+    std_var_names = ['alpha', 'tau_x', 'tau_y', 'Ekman_w']
+
     def __init__(self, field_type, date=None, season_str=None, year_start=None, year_end=None):
         self.field_type = field_type
         self.date = date
@@ -71,7 +81,8 @@ class SurfaceStressDataWriter(object):
         self.WOA_grid_size = WOA_parameters['grid_size']
         self.WOA_field_type = WOA_parameters['field_type']
 
-        logger.info('Assigned WOA parameters: time_span={:s}, avg_period={:s}, grid_size={:s}, field_type={:s}'
+        # avg_period is None for seasons that WOA doesn't provide (e.g. DJF).
+        logger.info('Assigned WOA parameters: time_span={}, avg_period={}, grid_size={}, field_type={}'
                     .format(self.WOA_time_span, self.WOA_avg_period, self.WOA_grid_size, self.WOA_field_type))
 
         # Initializing all the fields we want to write to the netCDF file.
@@ -238,6 +249,13 @@ class SurfaceStressDataWriter(object):
             'h_ice': self.h_ice_field
         }
 
+        # Fields that have been computed (or loaded) and will be written out by write_fields_to_netcdf.
+        self.var_names = list(self.var_fields.keys())
+
+        # Standard deviations of the fields in std_var_names over the averaging period. Only filled in for mean fields,
+        # see compute_mean_fields.
+        self.std_fields = {}
+
         # Dictionary of all fields to be plotted.
         self.figure_fields = {
             'u_geo': self.u_geo_field,
@@ -283,6 +301,27 @@ class SurfaceStressDataWriter(object):
             field[0, :] = np.nan
             field[i_max, :] = np.nan
 
+        # Flat indices of the sea ice zone cells where the surface stress was solved for (see
+        # compute_SIZ_surface_stress_fields).
+        self.SIZ_cells = None
+
+        # Fields derived from the surface stress by compute_daily_surface_stress_field, only filled in on the cells the
+        # static mask leaves active. The input fields are filled in everywhere except on land (SIC_land), where only
+        # u_geo is, see compute_daily_surface_stress_field.
+        self.surface_stress_fields = [self.tau_air_x_field, self.tau_air_y_field, self.tau_ice_x_field,
+                                      self.tau_ice_y_field, self.tau_x_field, self.tau_y_field, self.tau_SIZ_x_field,
+                                      self.tau_SIZ_y_field,
+                                      self.u_Ekman_field, self.v_Ekman_field, self.u_Ekman_SIZ_field,
+                                      self.v_Ekman_SIZ_field, self.U_Ekman_field, self.V_Ekman_field,
+                                      self.U_Ekman_SIZ_field, self.V_Ekman_SIZ_field,
+                                      self.tau_nogeo_air_x_field, self.tau_nogeo_air_y_field,
+                                      self.tau_nogeo_ice_x_field, self.tau_nogeo_ice_y_field,
+                                      self.tau_nogeo_SIZ_x_field, self.tau_nogeo_SIZ_y_field,
+                                      self.tau_nogeo_x_field, self.tau_nogeo_y_field,
+                                      self.tau_ig_x_field, self.tau_ig_y_field,
+                                      self.tau_ice_dot_u_geo_field, self.tau_ice_dot_u_Ekman_field,
+                                      self.tau_ice_dot_u_ocean_field]
+
         if date is not None and field_type == 'daily':
             # self.u_geo_data = MeanDynamicTopographyDataReader()
             self.u_geo_data = GeostrophicCurrentDataset(self.date)
@@ -346,617 +385,576 @@ class SurfaceStressDataWriter(object):
 
         return tau_vec, tau_air_vec, tau_ice_vec
 
-    def compute_daily_surface_stress_field(self, u_geo_source):
-        logger.info('Calculating surface stress field (tau_x, tau_y) for:')
-        logger.info('lat_min = {}, lat_max = {}, lat_step = {}, n_lat = {}'.format(lat_min, lat_max, lat_step, n_lat))
-        logger.info('lon_min = {}, lon_max = {}, lon_step = {}, n_lon = {}'.format(lon_min, lon_max, lon_step, n_lon))
-
-        for i in range(len(self.lats)):
-            lat = self.lats[i]
-            f = 2 * Omega * np.sin(np.deg2rad(lat))  # Coriolis parameter [s^-1]
-
-            progress_percent = 100 * i / (len(self.lats) - 1)
-            logger.info('({}) lat = {:.2f}/{:.2f} ({:.1f}%)'.format(self.date, lat, lat_max, progress_percent))
-
-            for j in range(len(self.lons)):
-                lon = self.lons[j]
-
-                u_wind_vec = self.u_wind_data.ocean_surface_wind_vector(lat, lon, 'interp')
-                alpha = self.sea_ice_conc_data.sea_ice_concentration(lat, lon, 'interp')
-                u_ice_vec = self.sea_ice_motion_data.seaice_motion_vector(lat, lon, 'interp')
-
-                if u_geo_source == 'zero':
-                    u_geo_vec = np.array([0, 0])
-                elif u_geo_source == 'CS2':
-                    u_geo_vec = self.u_geo_data.geostrophic_current_velocity(lat, lon)
-                # elif u_geo_source == 'climo':
-                #     u_geo_vec = self.u_geo_data.u_geo_mean(lat, lon, 'interp')
+    @staticmethod
+    def quadratic_stress(rho, C, u):
+        """ Quadratic drag law rho * C * |u| * u for an (n, 2) array of velocity vectors. """
+        tau = np.empty_like(u)
+        for c in [0, 1]:
+            tau[:, c] = evaluate('rho * C * sqrt(u_x*u_x + u_y*u_y) * u_c', rho=rho, C=C, u_x=u[:, 0], u_y=u[:, 1],
+                                 u_c=u[:, c])
+        return tau
 
-                self.alpha_field[i][j] = alpha
-                self.u_geo_field[i][j] = u_geo_vec[0]
-                self.v_geo_field[i][j] = u_geo_vec[1]
-                self.u_wind_field[i][j] = u_wind_vec[0]
-                self.v_wind_field[i][j] = u_wind_vec[1]
-                self.u_ice_field[i][j] = u_ice_vec[0]
-                self.v_ice_field[i][j] = u_ice_vec[1]
+    def surface_stress_compressed(self, f, u_geo, u_wind, alpha, u_ice):
+        """
+        Same modified Richardson iteration as surface_stress(...) but for many cells at once, each one stopping under
+        the same conditions as the scalar version.
+
+        :param f: Coriolis parameter, shape (n,).
+        :param u_geo: Geostrophic current vectors, shape (n, 2).
+        :param u_wind: Wind vectors, shape (n, 2).
+        :param alpha: Sea ice concentration, shape (n,).
+        :param u_ice: Sea ice motion vectors, shape (n, 2).
+        :return: tau, tau_air, tau_ice each of shape (n, 2).
+        """
+        n = len(alpha)
+        alpha = alpha[:, np.newaxis]
 
-                # If there's no sea ice at a point and we have data at that point (i.e. the point is still in the ocean)
-                # then tau is just tau_air and easy to calculate. Note that this encompasses regions of alpha < 0.15 as
-                # well since SeaIceConcentrationDataset returns 0 for alpha < 0.15.
-                if alpha == 0 and not np.isnan(u_ice_vec[0]) \
-                        and not np.isnan(u_geo_vec[0]) and not np.isnan(u_wind_vec[0]):
-
-                    tau_air_vec = rho_air * C_air * np.linalg.norm(u_wind_vec) * u_wind_vec
-
-                    self.tau_air_x_field[i][j] = tau_air_vec[0]
-                    self.tau_air_y_field[i][j] = tau_air_vec[1]
-                    self.tau_ice_x_field[i][j] = 0
-                    self.tau_ice_y_field[i][j] = 0
-
-                    self.tau_x_field[i][j] = tau_air_vec[0]
-                    self.tau_y_field[i][j] = tau_air_vec[1]
-                    self.tau_SIZ_x_field[i][j] = np.nan
-                    self.tau_SIZ_y_field[i][j] = np.nan
-
-                    u_Ekman_vec = (np.sqrt(2) / (f * rho_0 * D_e)) * np.matmul(self.R_m45deg, tau_air_vec)
-
-                    tau_x_scalar = tau_air_vec[0]
-                    tau_y_scalar = tau_air_vec[1]
-                    U_Ekman_scalar = tau_y_scalar / (f * rho_0)
-                    V_Ekman_scalar = -tau_x_scalar / (f * rho_0)
-
-                    # if u_Ekman_vec_type == 'surface':
-                    #     u_Ekman_vec = (np.sqrt(2) / (f * rho_0 * D_e)) * np.matmul(self.R_m45deg, tau_air_vec)
-                    # elif u_Ekman_vec_type == 'vertical_avg':
-                    #     tau_x_scalar = tau_air_vec[0]
-                    #     tau_y_scalar = tau_air_vec[1]
-                    #     u_Ekman_scalar = tau_y_scalar / (f * rho_0 * D_e)
-                    #     v_Ekman_scalar = -tau_x_scalar / (f * rho_0 * D_e)
-                    #     u_Ekman_vec = np.array([u_Ekman_scalar, v_Ekman_scalar])
-
-                    self.u_Ekman_field[i][j] = u_Ekman_vec[0]
-                    self.v_Ekman_field[i][j] = u_Ekman_vec[1]
-                    self.u_Ekman_SIZ_field[i][j] = np.nan
-                    self.v_Ekman_SIZ_field[i][j] = np.nan
-
-                    self.U_Ekman_field[i][j] = U_Ekman_scalar
-                    self.V_Ekman_field[i][j] = V_Ekman_scalar
-                    self.U_Ekman_SIZ_field[i][j] = np.nan
-                    self.V_Ekman_SIZ_field[i][j] = np.nan
-
-                    # In the absence of ice, the geostrophic current doesn't matter for the stress so it's
-                    # the same as the surface stress including geostrophic currents.
-                    self.tau_nogeo_air_x_field[i][j] = tau_air_vec[0]
-                    self.tau_nogeo_air_y_field[i][j] = tau_air_vec[1]
-                    self.tau_nogeo_ice_x_field[i][j] = 0
-                    self.tau_nogeo_ice_y_field[i][j] = 0
-                    self.tau_nogeo_SIZ_x_field[i][j] = np.nan
-                    self.tau_nogeo_SIZ_y_field[i][j] = np.nan
-                    self.tau_nogeo_x_field[i][j] = tau_air_vec[0]
-                    self.tau_nogeo_y_field[i][j] = tau_air_vec[1]
-
-                    self.tau_ig_x_field[i][j] = np.nan
-                    self.tau_ig_y_field[i][j] = np.nan
-
-                    self.tau_ice_dot_u_geo_field[i][j] = 0
-                    self.tau_ice_dot_u_Ekman_field[i][j] = 0
-                    self.tau_ice_dot_u_ocean_field[i][j] = 0
-                    continue
+        # Here we set the variables to arbitrary initial guesses before iteratively calculating tau and u_Ekman.
+        tau_vec_residual = np.ones((n, 2))
+        tau_air = np.zeros((n, 2))
+        tau_ice = np.zeros((n, 2))
+        tau = np.zeros((n, 2))
+        omega = 0.01  # Richardson relaxation parameter
 
-                # If we have data missing, then we're probably on land or somewhere where we cannot calculate tau.
-                if np.isnan(alpha) or np.isnan(u_geo_vec[0]) or np.isnan(u_wind_vec[0]) or np.isnan(u_ice_vec[0]):
-                    self.tau_air_x_field[i][j] = np.nan
-                    self.tau_air_y_field[i][j] = np.nan
-                    self.tau_ice_x_field[i][j] = np.nan
-                    self.tau_ice_y_field[i][j] = np.nan
-                    self.tau_x_field[i][j] = np.nan
-                    self.tau_y_field[i][j] = np.nan
-                    self.tau_SIZ_x_field[i][j] = np.nan
-                    self.tau_SIZ_y_field[i][j] = np.nan
-
-                    self.u_Ekman_field[i][j] = np.nan
-                    self.v_Ekman_field[i][j] = np.nan
-                    self.u_Ekman_SIZ_field[i][j] = np.nan
-                    self.v_Ekman_SIZ_field[i][j] = np.nan
-
-                    self.U_Ekman_field[i][j] = np.nan
-                    self.V_Ekman_field[i][j] = np.nan
-                    self.U_Ekman_SIZ_field[i][j] = np.nan
-                    self.V_Ekman_SIZ_field[i][j] = np.nan
-
-                    self.tau_nogeo_air_x_field[i][j] = np.nan
-                    self.tau_nogeo_air_y_field[i][j] = np.nan
-                    self.tau_nogeo_ice_x_field[i][j] = np.nan
-                    self.tau_nogeo_ice_y_field[i][j] = np.nan
-                    self.tau_nogeo_SIZ_x_field[i][j] = np.nan
-                    self.tau_nogeo_SIZ_y_field[i][j] = np.nan
-                    self.tau_nogeo_x_field[i][j] = np.nan
-                    self.tau_nogeo_y_field[i][j] = np.nan
-
-                    self.tau_ig_x_field[i][j] = np.nan
-                    self.tau_ig_y_field[i][j] = np.nan
-
-                    self.tau_ice_dot_u_geo_field[i][j] = np.nan
-                    self.tau_ice_dot_u_Ekman_field[i][j] = np.nan
-                    self.tau_ice_dot_u_ocean_field[i][j] = np.nan
-                    continue
+        # Cells that are still iterating.
+        k = np.ones(n, dtype=bool)
 
-                # If we have data for everything, and we're in the SIZ then use the Richardson method to compute tau.
-                tau_vec, tau_air_vec, tau_ice_vec = self.surface_stress(f, u_geo_vec, u_wind_vec, alpha, u_ice_vec)
-
-                self.tau_air_x_field[i][j] = tau_air_vec[0]
-                self.tau_air_y_field[i][j] = tau_air_vec[1]
-                self.tau_ice_x_field[i][j] = tau_ice_vec[0]
-                self.tau_ice_y_field[i][j] = tau_ice_vec[1]
-                self.tau_x_field[i][j] = tau_vec[0]
-                self.tau_y_field[i][j] = tau_vec[1]
-                self.tau_SIZ_x_field[i][j] = tau_vec[0]
-                self.tau_SIZ_y_field[i][j] = tau_vec[1]
-
-                # Recalculate u_Ekman_vec. Not sure why I have to do this, but otherwise I just get the zero vector...
-                # This is the Ekman velocity vector at the ocean surface where it is 45 degrees to the left of the
-                # stress (in the Southern Hemisphere).
-                u_Ekman_vec = (np.sqrt(2) / (f * rho_0 * D_e)) * np.matmul(self.R_m45deg, tau_vec)
-
-                # if u_Ekman_vec_type == 'surface':
-                #     u_Ekman_vec = (np.sqrt(2) / (f * rho_0 * D_e)) * np.matmul(self.R_m45deg, tau_vec)
-                # elif u_Ekman_vec_type == 'vertical_avg':
-                #     tau_x_scalar = tau_vec[0]
-                #     tau_y_scalar = tau_vec[1]
-                #     u_Ekman_scalar = tau_y_scalar / (f * rho_0 * D_e)
-                #     v_Ekman_scalar = -tau_x_scalar / (f * rho_0 * D_e)
-                #     u_Ekman_vec = np.array([u_Ekman_scalar, v_Ekman_scalar])
-
-                self.u_Ekman_field[i][j] = u_Ekman_vec[0]
-                self.v_Ekman_field[i][j] = u_Ekman_vec[1]
-                self.u_Ekman_SIZ_field[i][j] = u_Ekman_vec[0]
-                self.v_Ekman_SIZ_field[i][j] = u_Ekman_vec[1]
-
-                # Calculate Ekman volume transport
-                tau_x_scalar = tau_air_vec[0]
-                tau_y_scalar = tau_air_vec[1]
-                U_Ekman_scalar = tau_y_scalar / (f * rho_0)
-                V_Ekman_scalar = -tau_x_scalar / (f * rho_0)
-
-                self.U_Ekman_field[i][j] = U_Ekman_scalar
-                self.V_Ekman_field[i][j] = V_Ekman_scalar
-                self.U_Ekman_SIZ_field[i][j] = U_Ekman_scalar
-                self.V_Ekman_SIZ_field[i][j] = V_Ekman_scalar
-
-                # Calculate the ice-ocean and air-ocean surface stresses neglecting geostrophic currents. Here we
-                # are going to calculate it by assuming the Ekman velocity is the same as the case with geostrophic
-                # currents and use u_rel = u_ice - u_Ekman. Since we know u_Ekman there is no need to perform an
-                # iteration and we can just straight away compute tau.
-
-                tau_nogeo_air_vec = rho_air * C_air * np.linalg.norm(u_wind_vec) * u_wind_vec
-                u_nogeo_rel_vec = u_ice_vec - u_Ekman_vec
-                tau_nogeo_ice_vec = rho_0 * C_seawater * np.linalg.norm(u_nogeo_rel_vec) * u_nogeo_rel_vec
-                tau_nogeo_vec = alpha * tau_nogeo_ice_vec + (1 - alpha) * tau_nogeo_air_vec
-
-                self.tau_nogeo_air_x_field[i][j] = tau_nogeo_air_vec[0]
-                self.tau_nogeo_air_y_field[i][j] = tau_nogeo_air_vec[1]
-                self.tau_nogeo_ice_x_field[i][j] = tau_nogeo_ice_vec[0]
-                self.tau_nogeo_ice_y_field[i][j] = tau_nogeo_ice_vec[1]
-                self.tau_nogeo_SIZ_x_field[i][j] = tau_nogeo_vec[0]
-                self.tau_nogeo_SIZ_y_field[i][j] = tau_nogeo_vec[1]
-                self.tau_nogeo_x_field[i][j] = tau_nogeo_vec[0]
-                self.tau_nogeo_y_field[i][j] = tau_nogeo_vec[1]
-
-                self.tau_ig_x_field[i][j] = self.tau_ice_x_field[i][j] - self.tau_nogeo_ice_x_field[i][j]
-                self.tau_ig_y_field[i][j] = self.tau_ice_y_field[i][j] - self.tau_nogeo_ice_y_field[i][j]
-
-                # Calculate the ice-ocean stress dotted with three choices for the ocean velocity.
-                self.tau_ice_dot_u_geo_field[i][j] = self.tau_ice_x_field[i][j]*self.u_geo_field[i][j] + self.tau_ice_y_field[i][j]*self.v_geo_field[i][j]
-                self.tau_ice_dot_u_Ekman_field[i][j] = self.tau_ice_x_field[i][j]*self.u_Ekman_field[i][j] + self.tau_ice_y_field[i][j]*self.v_Ekman_field[i][j]
-                self.tau_ice_dot_u_ocean_field[i][j] = self.tau_ice_x_field[i][j]*(self.u_geo_field[i][j] + self.u_Ekman_field[i][j]) + self.tau_ice_y_field[i][j]*(self.v_geo_field[i][j] + self.v_Ekman_field[i][j])
+        for iter_count in range(1, 52):
+            k &= np.linalg.norm(tau_vec_residual, axis=1) > 1e-5
 
-    def compute_daily_ekman_pumping_field(self):
-        """ Compute daily Ekman pumping field w_Ekman = curl(tau / rho * f). """
+            if iter_count > 50 and np.any(k):
+                logger.warning('iter_count exceeded 50 during calculation of tau and u_Ekman for {:d} cells.'
+                               .format(np.count_nonzero(k)))
+                break
 
-        from constants import Omega, rho_0
-        logger.info('Calculating wind stress curl and Ekman pumping fields...')
+            large_tau = k & (np.linalg.norm(tau, axis=1) > 10)
+            if np.any(large_tau):
+                logger.warning('Large tau for {:d} cells.'.format(np.count_nonzero(large_tau)))
+                k &= ~large_tau
 
-        i_max = len(self.lats) - 1
-        j_max = len(self.lons) - 1
-
-        for i, lat in enumerate(self.lats[1:-1]):
-            f = 2 * Omega * np.sin(np.deg2rad(lat))  # Coriolis parameter [s^-1]
-
-            progress_percent = 100 * i / (len(self.lats) - 2)
-            logger.info('({} w_Ekman) lat = {:.2f}/{:.2f} ({:.1f}%)'.format(self.date, lat, lat_max, progress_percent))
-
-            dx = distance(self.lats[i-1], self.lons[0], self.lats[i+1], self.lons[0])
-            dy = distance(self.lats[i], self.lons[0], self.lats[i], self.lons[2])
-
-            for j, lon in enumerate(self.lons):
-                # Taking modulus of j-1 and j+1 to get the correct index in the special cases of
-                #  * j=0 (180 W) and need to use the value from j=j_max (180 E)
-                #  * j=j_max (180 E) and need to use the value from j=0 (180 W)
-                jm1 = (j-1) % j_max
-                jp1 = (j+1) % j_max
-
-                if not np.isnan(self.tau_x_field[i][jp1]) and not np.isnan(self.tau_x_field[i][jp1]) \
-                        and not np.isnan(self.tau_y_field[i-1][j]) and not np.isnan(self.tau_y_field[i+1][j]):
-
-                    # Second-order centered difference scheme where we divide by the distance between the i+1 and i-1
-                    # cells, which is just dx as defined in the above line. Textbook formulas will usually have a 2*dx
-                    # in the denominator because dx is the width of just one cell.
-                    # dtauydx = (self.tau_y_field[i+1][j] - self.tau_y_field[i-1][j]) / dx
-                    # dtauxdy = (self.tau_x_field[i][j+1] - self.tau_x_field[i][j-1]) / dy
-
-                    # Calculate Ekman pumping rates (including geostrophic currents).
-                    # TODO: Why does it look like accessing the wrong axis gives the right derivative!?
-                    dtauydx = (self.tau_y_field[i][jp1] - self.tau_y_field[i][jm1]) / dx
-                    dtauxdy = (self.tau_x_field[i+1][j] - self.tau_x_field[i-1][j]) / dy
-
-                    # Calculate Ekman pumping with geostrophic currents.
-                    self.ddx_tau_y_field[i][j] = dtauydx
-                    self.ddy_tau_x_field[i][j] = dtauxdy
-                    self.stress_curl_field[i][j] = dtauydx - dtauxdy
-                    self.w_Ekman_field[i][j] = (dtauydx - dtauxdy) / (rho_0 * f)
-
-                    dtauydx_nogeo = (self.tau_nogeo_y_field[i][jp1] - self.tau_nogeo_y_field[i][jm1]) / dx
-                    dtauxdy_nogeo = (self.tau_nogeo_x_field[i+1][j] - self.tau_nogeo_x_field[i-1][j]) / dy
-
-                    # Calculate Ekman pumping without geostrophic currents.
-                    self.ddx_tau_nogeo_y_field[i][j] = dtauydx_nogeo
-                    self.ddy_tau_nogeo_x_field[i][j] = dtauxdy_nogeo
-                    self.stress_curl_nogeo_field[i][j] = dtauydx_nogeo - dtauxdy_nogeo
-                    self.w_Ekman_nogeo_field[i][j] = (dtauydx_nogeo - dtauxdy_nogeo) / (rho_0 * f)
-
-                    alpha_i_jp1 = self.alpha_field[i][jp1]
-                    alpha_i_jm1 = self.alpha_field[i][jm1]
-                    alpha_ip1_j = self.alpha_field[i+1][j]
-                    alpha_im1_j = self.alpha_field[i-1][j]
-
-                    tau_ao_x_ip1_j = self.tau_air_x_field[i+1][j]
-                    tau_ao_x_im1_j = self.tau_air_x_field[i-1][j]
-                    tau_ao_y_i_jp1 = self.tau_air_y_field[i][jp1]
-                    tau_ao_y_i_jm1 = self.tau_air_y_field[i][jm1]
-
-                    tau_io_x_geo_ip1_j = self.tau_ice_x_field[i+1][j]
-                    tau_io_x_geo_im1_j = self.tau_ice_x_field[i-1][j]
-                    tau_io_y_geo_i_jp1 = self.tau_ice_y_field[i][jp1]
-                    tau_io_y_geo_i_jm1 = self.tau_ice_y_field[i][jm1]
-
-                    tau_io_x_nogeo_ip1_j = self.tau_nogeo_ice_x_field[i+1][j]
-                    tau_io_x_nogeo_im1_j = self.tau_nogeo_ice_x_field[i-1][j]
-                    tau_io_y_nogeo_i_jp1 = self.tau_nogeo_ice_y_field[i][jp1]
-                    tau_io_y_nogeo_i_jm1 = self.tau_nogeo_ice_y_field[i][jm1]
-
-                    tau_ig_x_ip1_j = self.tau_ig_x_field[i+1][j]
-                    tau_ig_x_im1_j = self.tau_ig_x_field[i-1][j]
-                    tau_ig_y_i_jp1 = self.tau_ig_y_field[i][jp1]
-                    tau_ig_y_i_jm1 = self.tau_ig_y_field[i][jm1]
-
-                    ddx_tau_ao_y = (tau_ao_y_i_jp1 - tau_ao_y_i_jm1) / dx
-                    ddy_tau_ao_x = (tau_ao_x_ip1_j - tau_ao_x_im1_j) / dy
-                    self.w_A_field[i][j] = (ddx_tau_ao_y - ddy_tau_ao_x) / (rho_0 * f)
-
-                    ddx_1malpha_tau_ao_y = ((1-alpha_i_jp1) * tau_ao_y_i_jp1 - (1-alpha_i_jm1) * tau_ao_y_i_jm1) / dx
-                    ddy_1malpha_tau_ao_x = ((1-alpha_ip1_j) * tau_ao_x_ip1_j - (1-alpha_im1_j) * tau_ao_x_im1_j) / dy
-                    self.w_a_field[i][j] = (ddx_1malpha_tau_ao_y - ddy_1malpha_tau_ao_x) / (rho_0 * f)
-
-                    ddx_alpha_tau_io_y_geo = (alpha_i_jp1 * tau_io_y_geo_i_jp1 - alpha_i_jm1 * tau_io_y_geo_i_jm1) / dx
-                    ddy_alpha_tau_io_x_geo = (alpha_ip1_j * tau_io_x_geo_ip1_j - alpha_im1_j * tau_io_x_geo_im1_j) / dy
-                    self.w_i_field[i][j] = (ddx_alpha_tau_io_y_geo - ddy_alpha_tau_io_x_geo) / (rho_0 * f)
-
-                    ddx_alpha_tau_io_y_nogeo = (alpha_i_jp1 * tau_io_y_nogeo_i_jp1 - alpha_i_jm1 * tau_io_y_nogeo_i_jm1) / dx
-                    ddy_alpha_tau_io_x_nogeo = (alpha_ip1_j * tau_io_x_nogeo_ip1_j - alpha_im1_j * tau_io_x_nogeo_im1_j) / dy
-                    self.w_i0_field[i][j] = (ddx_alpha_tau_io_y_nogeo - ddy_alpha_tau_io_x_nogeo) / (rho_0 * f)
-
-                    ddx_alpha_tau_ig_y = (alpha_i_jp1 * tau_ig_y_i_jp1 - alpha_i_jm1 * tau_ig_y_i_jm1) / dx
-                    ddy_alpha_tau_ig_x = (alpha_ip1_j * tau_ig_x_ip1_j - alpha_im1_j * tau_ig_x_im1_j) / dy
-                    self.w_ig_field[i][j] = (ddx_alpha_tau_ig_y - ddy_alpha_tau_ig_x) / (rho_0 * f)
-
-                    self.gamma_metric_field[i][j] = np.abs(self.w_ig_field[i][j]) \
-                        / (np.abs(self.w_a_field[i][j]) + np.abs(self.w_i0_field[i][j]) + np.abs(self.w_ig_field[i][j]))
-                else:
-                    self.ddx_tau_y_field[i][j] = np.nan
-                    self.ddy_tau_x_field[i][j] = np.nan
-                    self.stress_curl_field[i][j] = np.nan
-                    self.w_Ekman_field[i][j] = np.nan
-
-                    self.w_A_field[i][j] = np.nan
-                    self.w_a_field[i][j] = np.nan
-                    self.w_i_field[i][j] = np.nan
-                    self.w_i0_field[i][j] = np.nan
-                    self.w_ig_field[i][j] = np.nan
-                    self.gamma_metric_field[i][j] = np.nan
+            if not np.any(k):
+                break
 
-    def process_thermodynamic_fields(self, levels=None, process_neutral_density=False):
-        logger.info('Calculating average T, S, gamma_n...')
+            tau_air[k] = self.quadratic_stress(rho_air, C_air, u_wind[k])
 
-        salinity_dataset = SalinityDataset(time_span=self.WOA_time_span, avg_period=self.WOA_avg_period,
-                                           grid_size=self.WOA_grid_size, field_type=self.WOA_field_type)
-        temperature_dataset = TemperatureDataset(time_span=self.WOA_time_span, avg_period=self.WOA_avg_period,
-                                                 grid_size=self.WOA_grid_size, field_type=self.WOA_field_type)
+            u_Ekman = (np.sqrt(2) / (f[k] * rho_0 * D_e))[:, np.newaxis] * np.matmul(tau[k], self.R_m45deg.T)
 
-        if process_neutral_density:
-            gamma_dataset = NeutralDensityDataset(time_span=self.WOA_time_span, avg_period=self.WOA_avg_period,
-                                                  grid_size=self.WOA_grid_size, field_type=self.WOA_field_type)
-        else:
-            self.neutral_density_field[:] = np.nan
+            u_rel = u_ice[k] - (u_geo[k] + u_Ekman)
+            tau_ice[k] = self.quadratic_stress(rho_0, C_seawater, u_rel)
+            tau_k = alpha[k] * tau_ice[k] + (1 - alpha[k]) * tau_air[k]
 
-        for i in range(len(self.lats)):
-            lat = self.lats[i]
+            tau_vec_residual[k] = tau_k - (alpha[k] * tau_ice[k] + (1 - alpha[k]) * tau_air[k])
+            tau[k] = tau_k + omega * tau_vec_residual[k]
 
-            progress_percent = 100 * i / (len(self.lats) - 1)
+        n_nan = np.count_nonzero(np.isnan(tau).any(axis=1))
+        if n_nan > 0:
+            logger.warning('NaN tau for {:d} cells.'.format(n_nan))
 
-            if process_neutral_density:
-                logger.info('({} T, S, gamma^n) lat = {:.2f}/{:.2f} ({:.1f}%)'
-                            .format(self.date, lat, lat_max, progress_percent))
-            else:
-                logger.info('({} T, S) lat = {:.2f}/{:.2f} ({:.1f}%)'
-                            .format(self.date, lat, lat_max, progress_percent))
+        return tau, tau_air, tau_ice
 
-            for j in range(len(self.lons)):
-                lon = self.lons[j]
-                self.salinity_field[i][j] = salinity_dataset.salinity(lat, lon, levels)
-                self.temperature_field[i][j] = temperature_dataset.temperature(lat, lon, levels)
+    def compute_open_water_surface_stress_fields(self, open_water_cells):
+        """
+        Compute tau and everything that depends on it for the open water cells (alpha == 0, with data for every input),
+        given as flat indices into the lat-lon grid. There tau is just tau_air so no iteration is needed.
+        """
+        from CompressedField import CompressedField
 
-                if process_neutral_density:
-                    self.neutral_density_field[i][j] = gamma_dataset.gamma_n_depth_averaged(lat, lon, levels)
+        if len(open_water_cells) == 0:
+            return
 
-    def load_sea_ice_thickness_field(self):
-        from SeaIceThicknessDataset import SeaIceThicknessDataset
-        h_ice_dataset = SeaIceThicknessDataset(self.date)
+        def scatter(values, field):
+            CompressedField(open_water_cells, values, field.shape).scatter(field)
 
-        for i in range(len(self.lats)):
-            lat = self.lats[i]
+        f = get_grid().f[open_water_cells // len(self.lons)]  # Coriolis parameter [s^-1]
+        u_wind = np.stack([CompressedField.gather(self.u_wind_field, open_water_cells).values,
+                           CompressedField.gather(self.v_wind_field, open_water_cells).values], axis=1)
 
-            progress_percent = 100 * i / (len(self.lats) - 1)
-            logger.info('({} h_ice) lat = {:.2f}/{:.2f} ({:.1f}%)'.format(self.date, lat, lat_max, progress_percent))
-            for j in range(len(self.lons)):
-                self.h_ice_field[i][j] = h_ice_dataset.sea_ice_thickness(i, j, self.date)
+        tau_air = self.quadratic_stress(rho_air, C_air, u_wind)
 
-    def compute_daily_freshwater_ekman_advection_field(self):
-        """ Calculate freshwater flux div(u_Ek*S).  """
+        u_Ekman = (np.sqrt(2) / (f * rho_0 * D_e))[:, np.newaxis] * np.matmul(tau_air, self.R_m45deg.T)
+        U_Ekman = tau_air[:, 1] / (f * rho_0)
+        V_Ekman = -tau_air[:, 0] / (f * rho_0)
 
-        j_max = len(self.lons) - 1
+        # In the absence of ice, the geostrophic current doesn't matter for the stress so it's the same as the surface
+        # stress including geostrophic currents.
+        for values, field in [(tau_air[:, 0], self.tau_air_x_field), (tau_air[:, 1], self.tau_air_y_field),
+                              (tau_air[:, 0], self.tau_x_field), (tau_air[:, 1], self.tau_y_field),
+                              (u_Ekman[:, 0], self.u_Ekman_field), (u_Ekman[:, 1], self.v_Ekman_field),
+                              (U_Ekman, self.U_Ekman_field), (V_Ekman, self.V_Ekman_field),
+                              (tau_air[:, 0], self.tau_nogeo_air_x_field), (tau_air[:, 1], self.tau_nogeo_air_y_field),
+                              (tau_air[:, 0], self.tau_nogeo_x_field), (tau_air[:, 1], self.tau_nogeo_y_field)]:
+            scatter(values, field)
 
-        for i in range(1, len(self.lats) - 1):
-            lat = self.lats[i]
-            f = 2 * Omega * np.sin(np.deg2rad(lat))  # Coriolis parameter [s^-1]
+        for field in [self.tau_ice_x_field, self.tau_ice_y_field, self.tau_nogeo_ice_x_field,
+                      self.tau_nogeo_ice_y_field, self.tau_ice_dot_u_geo_field, self.tau_ice_dot_u_Ekman_field,
+                      self.tau_ice_dot_u_ocean_field]:
+            field.flat[open_water_cells] = 0
 
-            progress_percent = 100 * i / (len(self.lats) - 2)
-            logger.info('({} freshwater_flux) lat = {:.2f}/{:.2f} ({:.1f}%)'
-                        .format(self.date, lat, lat_max, progress_percent))
+        for field in [self.tau_SIZ_x_field, self.tau_SIZ_y_field, self.u_Ekman_SIZ_field, self.v_Ekman_SIZ_field,
+                      self.U_Ekman_SIZ_field, self.V_Ekman_SIZ_field, self.tau_nogeo_SIZ_x_field,
+                      self.tau_nogeo_SIZ_y_field, self.tau_ig_x_field, self.tau_ig_y_field]:
+            field.flat[open_water_cells] = np.nan
 
-            dx = distance(self.lats[i-1], self.lons[0], self.lats[i+1], self.lons[0])
-            dy = distance(self.lats[i], self.lons[0], self.lats[i], self.lons[2])
+    def compute_SIZ_surface_stress_fields(self, SIZ_cells):
+        """
+        Compute tau and everything that depends on it for the cells in the sea ice zone, given as flat indices into the
+        lat-lon grid. The input fields (alpha, u_geo, u_wind, u_ice) must already be filled in for these cells. The
+        calculation is done on the compressed (n_cells,) arrays and the results are scattered back onto the grid.
+        """
+        from CompressedField import CompressedField
+        import stress_kernels
+        from stress_kernels import get_surface_stress_solver
 
-            for j in range(len(self.lons)):
-                lon = self.lons[j]
+        logger.info('({}) Solving for the surface stress in {:d} sea ice zone cells...'
+                    .format(self.date, len(SIZ_cells)))
 
-                # Taking modulus of j-1 and j+1 to get the correct index in the special cases of
-                #  * j=0 (180 W) and need to use the value from j=j_max (180 E)
-                #  * j=j_max (180 E) and need to use the value from j=0 (180 W)
-                jm1 = (j-1) % j_max
-                jp1 = (j+1) % j_max
+        if len(SIZ_cells) == 0:
+            return
 
-                u_Ekman_scalar = self.u_Ekman_field[i][j]
-                v_Ekman_scalar = self.v_Ekman_field[i][j]
+        def gather(field):
+            return CompressedField.gather(field, SIZ_cells).values
 
-                salinity_ij = self.salinity_field[i][j]
-                salinity_ip1_j = self.salinity_field[i+1][j]
-                salinity_im1_j = self.salinity_field[i-1][j]
-                salinity_i_jp1 = self.salinity_field[i][jp1]
-                salinity_i_jm1 = self.salinity_field[i][jm1]
+        def gather_vector(field_x, field_y):
+            return np.stack([gather(field_x), gather(field_y)], axis=1)
 
-                if not np.isnan(u_Ekman_scalar) and not np.isnan(salinity_i_jm1) \
-                        and not np.isnan(salinity_i_jp1):
-                    # dSdx = (salinity_ip1_j - salinity_im1_j) / dx
-                    dSdx = (salinity_i_jp1 - salinity_i_jm1) / dx
+        def scatter(values, field):
+            CompressedField(SIZ_cells, values, field.shape).scatter(field)
 
-                    self.dSdx_field[i][j] = dSdx
-                    self.ddx_uEk_S_field[i][j] = u_Ekman_scalar * dSdx
-                else:
-                    self.dSdx_field[i][j] = np.nan
-                    self.ddx_uEk_S_field[i][j] = np.nan
+        f = get_grid().f[SIZ_cells // len(self.lons)]  # Coriolis parameter [s^-1]
+        alpha = gather(self.alpha_field)
+        u_geo = gather_vector(self.u_geo_field, self.v_geo_field)
+        u_wind = gather_vector(self.u_wind_field, self.v_wind_field)
+        u_ice = gather_vector(self.u_ice_field, self.v_ice_field)
 
-                if not np.isnan(v_Ekman_scalar) and not np.isnan(salinity_im1_j) \
-                        and not np.isnan(salinity_ip1_j):
-                    # dSdy = (salinity_i_jp1 - salinity_i_jm1) / dy
-                    dSdy = (salinity_ip1_j - salinity_im1_j) / dy
+        if get_surface_stress_solver() == 'numba':
+            tau, tau_air, tau_ice = stress_kernels.surface_stress(f, u_geo, u_wind, alpha, u_ice, self.R_m45deg)
+        else:
+            tau, tau_air, tau_ice = self.surface_stress_compressed(f, u_geo, u_wind, alpha, u_ice)
+
+        # Recalculate u_Ekman. This is the Ekman velocity vector at the ocean surface where it is 45 degrees to the left
+        # of the stress (in the Southern Hemisphere).
+        u_Ekman = (np.sqrt(2) / (f * rho_0 * D_e))[:, np.newaxis] * np.matmul(tau, self.R_m45deg.T)
+
+        # Calculate Ekman volume transport
+        U_Ekman = tau_air[:, 1] / (f * rho_0)
+        V_Ekman = -tau_air[:, 0] / (f * rho_0)
+
+        # Calculate the ice-ocean and air-ocean surface stresses neglecting geostrophic currents. Here we are going to
+        # calculate it by assuming the Ekman velocity is the same as the case with geostrophic currents and use
+        # u_rel = u_ice - u_Ekman. Since we know u_Ekman there is no need to perform an iteration and we can just
+        # straight away compute tau.
+        tau_nogeo_air = self.quadratic_stress(rho_air, C_air, u_wind)
+        u_nogeo_rel = u_ice - u_Ekman
+        tau_nogeo_ice = self.quadratic_stress(rho_0, C_seawater, u_nogeo_rel)
+        tau_nogeo = alpha[:, np.newaxis] * tau_nogeo_ice + (1 - alpha[:, np.newaxis]) * tau_nogeo_air
+
+        tau_ig = tau_ice - tau_nogeo_ice
+
+        for values, field in [(tau_air[:, 0], self.tau_air_x_field), (tau_air[:, 1], self.tau_air_y_field),
+                              (tau_ice[:, 0], self.tau_ice_x_field), (tau_ice[:, 1], self.tau_ice_y_field),
+                              (tau[:, 0], self.tau_x_field), (tau[:, 1], self.tau_y_field),
+                              (tau[:, 0], self.tau_SIZ_x_field), (tau[:, 1], self.tau_SIZ_y_field),
+                              (u_Ekman[:, 0], self.u_Ekman_field), (u_Ekman[:, 1], self.v_Ekman_field),
+                              (u_Ekman[:, 0], self.u_Ekman_SIZ_field), (u_Ekman[:, 1], self.v_Ekman_SIZ_field),
+                              (U_Ekman, self.U_Ekman_field), (V_Ekman, self.V_Ekman_field),
+                              (U_Ekman, self.U_Ekman_SIZ_field), (V_Ekman, self.V_Ekman_SIZ_field),
+                              (tau_nogeo_air[:, 0], self.tau_nogeo_air_x_field),
+                              (tau_nogeo_air[:, 1], self.tau_nogeo_air_y_field),
+                              (tau_nogeo_ice[:, 0], self.tau_nogeo_ice_x_field),
+                              (tau_nogeo_ice[:, 1], self.tau_nogeo_ice_y_field),
+                              (tau_nogeo[:, 0], self.tau_nogeo_SIZ_x_field),
+                              (tau_nogeo[:, 1], self.tau_nogeo_SIZ_y_field),
+                              (tau_nogeo[:, 0], self.tau_nogeo_x_field), (tau_nogeo[:, 1], self.tau_nogeo_y_field),
+                              (tau_ig[:, 0], self.tau_ig_x_field), (tau_ig[:, 1], self.tau_ig_y_field)]:
+            scatter(values, field)
+
+        # Calculate the ice-ocean stress dotted with three choices for the ocean velocity.
+        scatter(tau_ice[:, 0]*u_geo[:, 0] + tau_ice[:, 1]*u_geo[:, 1], self.tau_ice_dot_u_geo_field)
+        scatter(tau_ice[:, 0]*u_Ekman[:, 0] + tau_ice[:, 1]*u_Ekman[:, 1], self.tau_ice_dot_u_Ekman_field)
+        scatter(tau_ice[:, 0]*(u_geo[:, 0] + u_Ekman[:, 0]) + tau_ice[:, 1]*(u_geo[:, 1] + u_Ekman[:, 1]),
+                self.tau_ice_dot_u_ocean_field)
+
+    def compute_daily_surface_stress_field(self, u_geo_source, use_static_mask=True):
+        logger.info('Calculating surface stress field (tau_x, tau_y) for:')
+        logger.info('lat_min = {}, lat_max = {}, lat_step = {}, n_lat = {}'.format(lat_min, lat_max, lat_step, n_lat))
+        logger.info('lon_min = {}, lon_max = {}, lon_step = {}, n_lon = {}'.format(lon_min, lon_max, lon_step, n_lon))
 
-                    self.dSdy_field[i][j] = dSdy
-                    self.ddy_vEk_S_field[i][j] = v_Ekman_scalar * dSdy
-                else:
-                    self.dSdy_field[i][j] = np.nan
-                    self.ddy_vEk_S_field[i][j] = np.nan
+        # Only compute the surface stress on the cells that can produce one. The stress fields are NaN on the others
+        # (land and cells that are never covered by CS2). The wind, sea ice concentration and ice motion aren't even
+        # looked up on land, where the last two are NaN anyway, so they're all left NaN there.
+        if use_static_mask:
+            from StaticMask import get_static_mask
+            static_mask = get_static_mask()
+            land = static_mask.SIC_land
+            active = static_mask.active_cells(u_geo_source)
+            logger.info('Static mask: {:d}/{:d} grid cells active, {:d} land.'
+                        .format(np.count_nonzero(active), active.size, np.count_nonzero(land)))
+
+            for field in self.surface_stress_fields:
+                field[~active] = np.nan
+        else:
+            land = np.zeros((len(self.lats), len(self.lons)), dtype=bool)
+            active = ~land
 
-                if not np.isnan(self.ddx_uEk_S_field[i][j]) and not np.isnan(self.ddy_vEk_S_field[i][j]):
-                    self.freshwater_ekman_advection_field[i][j] \
-                        = self.ddx_uEk_S_field[i][j] + self.ddy_vEk_S_field[i][j]
-                else:
-                    self.freshwater_ekman_advection_field[i][j] = np.nan
-                    # self.psi_delta_field[i][j] = np.nan
-                    # self.melt_rate_field[i][j] = np.nan
+        # The CS2 geostrophic current only changes monthly so compute the whole field at once (or load it) instead of
+        # differentiating the DOT field at every grid point.
+        if u_geo_source == 'CS2':
+            u_geo_CS2_field, v_geo_CS2_field = self.u_geo_data.geostrophic_current_velocity_field()
 
-    def compute_daily_ice_flux_divergence_field(self):
-        """ Calculate ice divergence \grad \cdot (h*u_ice) ~ f - r """
+        for i in range(len(self.lats)):
+            lat = self.lats[i]
 
-        i_max = len(self.lats) - 1
-        j_max = len(self.lons) - 1
+            progress_percent = 100 * i / (len(self.lats) - 1)
+            logger.info('({}) lat = {:.2f}/{:.2f} ({:.1f}%)'.format(self.date, lat, lat_max, progress_percent))
 
-        for i in range(1, len(self.lats) - 1):
-            lat = self.lats[i]
+            for j in range(len(self.lons)):
+                lon = self.lons[j]
 
-            progress_percent = 100 * i / (len(self.lats) - 2)
-            logger.info('(ice_div) lat = {:.2f}/{:.2f} ({:.1f}%)'.format(lat, lat_max, progress_percent))
+                if u_geo_source == 'zero':
+                    u_geo_vec = np.array([0, 0])
+                elif u_geo_source == 'CS2':
+                    u_geo_vec = np.array([u_geo_CS2_field[i][j], v_geo_CS2_field[i][j]])
+                # elif u_geo_source == 'climo':
+                #     u_geo_vec = self.u_geo_data.u_geo_mean(lat, lon, 'interp')
 
-            dx = distance(self.lats[i-1], self.lons[0], self.lats[i+1], self.lons[0])
-            dy = distance(self.lats[i], self.lons[0], self.lats[i], self.lons[2])
+                self.u_geo_field[i][j] = u_geo_vec[0]
+                self.v_geo_field[i][j] = u_geo_vec[1]
 
-            for j in range(1, len(self.lons) - 1):
-                lon = self.lons[j]
+                if land[i][j]:
+                    self.alpha_field[i][j] = np.nan
+                    self.u_wind_field[i][j] = np.nan
+                    self.v_wind_field[i][j] = np.nan
+                    self.u_ice_field[i][j] = np.nan
+                    self.v_ice_field[i][j] = np.nan
+                    continue
 
-                # Taking modulus of j-1 and j+1 to get the correct index in the special cases of
-                #  * j=0 (180 W) and need to use the value from j=j_max (180 E)
-                #  * j=j_max (180 E) and need to use the value from j=0 (180 W)
-                jm1 = (j - 1) % j_max
-                jp1 = (j + 1) % j_max
+                u_wind_vec = self.u_wind_data.ocean_surface_wind_vector(lat, lon, 'interp')
+                alpha = self.sea_ice_conc_data.sea_ice_concentration(lat, lon, 'interp')
+                u_ice_vec = self.sea_ice_motion_data.seaice_motion_vector(lat, lon, 'interp')
 
-                u_ice_i_jp1 = self.u_ice_field[i][jp1]
-                u_ice_i_jm1 = self.u_ice_field[i][jm1]
-                v_ice_ip1_j = self.v_ice_field[i+1][j]
-                v_ice_im1_j = self.v_ice_field[i-1][j]
+                self.alpha_field[i][j] = alpha
+                self.u_wind_field[i][j] = u_wind_vec[0]
+                self.v_wind_field[i][j] = u_wind_vec[1]
+                self.u_ice_field[i][j] = u_ice_vec[0]
+                self.v_ice_field[i][j] = u_ice_vec[1]
 
-                alpha_i_jp1 = self.alpha_field[i][jp1]
-                alpha_i_jm1 = self.alpha_field[i][jm1]
-                alpha_ip1_j = self.alpha_field[i+1][j]
-                alpha_im1_j = self.alpha_field[i-1][j]
+        # If there's no sea ice at a point and we have data at that point (i.e. the point is still in the ocean) then
+        # tau is just tau_air and easy to calculate. Note that this encompasses regions of alpha < 0.15 as well since
+        # SeaIceConcentrationDataset returns 0 for alpha < 0.15.
+        have_data = ~np.isnan(self.u_ice_field) & ~np.isnan(self.u_geo_field) & ~np.isnan(self.u_wind_field)
+        open_water = active & (self.alpha_field == 0) & have_data
 
-                h_ice_i_jp1 = self.h_ice_field[i][jp1]
-                h_ice_i_jm1 = self.h_ice_field[i][jm1]
-                h_ice_ip1_j = self.h_ice_field[i+1][j]
-                h_ice_im1_j = self.h_ice_field[i-1][j]
+        # If we have data missing, then we're probably on land or somewhere where we cannot calculate tau.
+        missing_data = active & (np.isnan(self.alpha_field) | ~have_data)
 
-                if not np.isnan(u_ice_i_jm1) and not np.isnan(u_ice_i_jp1):
-                    div_x = (alpha_i_jp1 * h_ice_i_jp1 * u_ice_i_jp1 - alpha_i_jm1 * h_ice_i_jm1 * u_ice_i_jm1) / dx
-                    # dSdx = (salinity_ip1_j - salinity_im1_j) / dx
+        for field in self.surface_stress_fields:
+            field[missing_data] = np.nan
 
-                    self.zonal_ice_flux_div_field[i][j] = div_x
-                else:
-                    self.zonal_ice_flux_div_field[i][j] = np.nan
+        self.compute_open_water_surface_stress_fields(np.flatnonzero(open_water))
 
-                if not np.isnan(v_ice_im1_j) and not np.isnan(v_ice_ip1_j):
-                    div_y = (alpha_ip1_j * h_ice_ip1_j * v_ice_ip1_j - alpha_im1_j * h_ice_im1_j * v_ice_im1_j) / dy
-                    # dSdy = (salinity_i_jp1 - salinity_i_jm1) / dy
+        # If we have data for everything, and we're in the SIZ then tau is computed using the Richardson method, for
+        # all SIZ cells at once.
+        self.SIZ_cells = np.flatnonzero(active & ~open_water & ~missing_data)
+        self.compute_SIZ_surface_stress_fields(self.SIZ_cells)
 
-                    self.merid_ice_flux_div_field[i][j] = div_y
-                else:
-                    self.merid_ice_flux_div_field[i][j] = np.nan
+    def compute_daily_ekman_pumping_field(self):
+        """ Compute daily Ekman pumping field w_Ekman = curl(tau / rho * f) and its decomposition. """
 
-                if not np.isnan(self.zonal_ice_flux_div_field[i][j]) \
-                        and not np.isnan(self.merid_ice_flux_div_field[i][j]):
-                    self.ice_flux_div_field[i][j] = div_x + div_y
-                else:
-                    self.ice_flux_div_field[i][j] = np.nan
+        from constants import rho_0
+        from stencils import zonal_neighbours, meridional_neighbours, zonal_difference, meridional_difference
+        logger.info('Calculating wind stress curl and Ekman pumping fields...')
 
-    def compute_meridional_streamfunction_and_melt_rate(self):
-        from constants import R
+        # Coriolis parameter and metric terms for each row. The first and last rows have no northern or southern
+        # neighbour so the derivatives are set to NaN there below.
+        grid = get_grid()
+        f = grid.f[:, np.newaxis]  # Coriolis parameter [s^-1]
+        dx = grid.dx[:, np.newaxis]
+        dy = grid.dy[:, np.newaxis]
+
+        # Second-order centered difference scheme where we divide by the distance between the i+1 and i-1 cells, which
+        # is just dx as defined above. Textbook formulas will usually have a 2*dx in the denominator because dx is the
+        # width of just one cell.
+        # TODO: Why does it look like accessing the wrong axis gives the right derivative!?
+        def ddx(field):
+            return zonal_difference(field) / dx
+
+        def ddy(field):
+            return meridional_difference(field) / dy
+
+        def ekman_pumping(tau_x, tau_y, weight=None):
+            """ (d(weight*tau_y)/dx - d(weight*tau_x)/dy) / (rho_0 * f) evaluated as one expression. """
+            if weight is not None:
+                tau_x = evaluate('weight * tau_x', weight=weight, tau_x=tau_x)
+                tau_y = evaluate('weight * tau_y', weight=weight, tau_y=tau_y)
+            tau_y_i_jm1, tau_y_i_jp1 = zonal_neighbours(tau_y)
+            tau_x_im1_j, tau_x_ip1_j = meridional_neighbours(tau_x)
+            return evaluate('((tau_y_i_jp1 - tau_y_i_jm1) / dx - (tau_x_ip1_j - tau_x_im1_j) / dy) / (rho_0 * f)',
+                            tau_y_i_jm1=tau_y_i_jm1, tau_y_i_jp1=tau_y_i_jp1, tau_x_im1_j=tau_x_im1_j,
+                            tau_x_ip1_j=tau_x_ip1_j, dx=dx, dy=dy, rho_0=rho_0, f=f)
+
+        # Cells where the stress stencil is incomplete get NaN for the Ekman pumping and its decomposition.
+        _, tau_x_i_jp1 = zonal_neighbours(self.tau_x_field)
+        tau_y_im1_j, tau_y_ip1_j = meridional_neighbours(self.tau_y_field)
+        valid = ~np.isnan(tau_x_i_jp1) & ~np.isnan(tau_y_im1_j) & ~np.isnan(tau_y_ip1_j)
+
+        # Calculate Ekman pumping with geostrophic currents.
+        dtauydx = ddx(self.tau_y_field)
+        dtauxdy = ddy(self.tau_x_field)
+
+        self.ddx_tau_y_field[:] = dtauydx
+        self.ddy_tau_x_field[:] = dtauxdy
+        self.stress_curl_field[:] = dtauydx - dtauxdy
+        evaluate('(dtauydx - dtauxdy) / (rho_0 * f)', out=self.w_Ekman_field, dtauydx=dtauydx, dtauxdy=dtauxdy,
+                 rho_0=rho_0, f=f)
+
+        # Calculate Ekman pumping without geostrophic currents.
+        dtauydx_nogeo = ddx(self.tau_nogeo_y_field)
+        dtauxdy_nogeo = ddy(self.tau_nogeo_x_field)
+
+        self.ddx_tau_nogeo_y_field[valid] = dtauydx_nogeo[valid]
+        self.ddy_tau_nogeo_x_field[valid] = dtauxdy_nogeo[valid]
+        self.stress_curl_nogeo_field[valid] = (dtauydx_nogeo - dtauxdy_nogeo)[valid]
+        self.w_Ekman_nogeo_field[valid] = evaluate('(dtauydx_nogeo - dtauxdy_nogeo) / (rho_0 * f)',
+                                                   dtauydx_nogeo=dtauydx_nogeo, dtauxdy_nogeo=dtauxdy_nogeo,
+                                                   rho_0=rho_0, f=f)[valid]
+
+        # Decompose the Ekman pumping into contributions from the air-ocean stress, and the ice-ocean stress with and
+        # without geostrophic currents.
+        alpha = self.alpha_field
+
+        self.w_A_field[:] = ekman_pumping(self.tau_air_x_field, self.tau_air_y_field)
+        self.w_a_field[:] = ekman_pumping(self.tau_air_x_field, self.tau_air_y_field,
+                                          weight=evaluate('1 - alpha', alpha=alpha))
+        self.w_i_field[:] = ekman_pumping(self.tau_ice_x_field, self.tau_ice_y_field, weight=alpha)
+        self.w_i0_field[:] = ekman_pumping(self.tau_nogeo_ice_x_field, self.tau_nogeo_ice_y_field, weight=alpha)
+        self.w_ig_field[:] = ekman_pumping(self.tau_ig_x_field, self.tau_ig_y_field, weight=alpha)
+
+        evaluate('abs(w_ig) / (abs(w_a) + abs(w_i0) + abs(w_ig))', out=self.gamma_metric_field, w_ig=self.w_ig_field,
+                 w_a=self.w_a_field, w_i0=self.w_i0_field)
+
+        for field in [self.ddx_tau_y_field, self.ddy_tau_x_field, self.stress_curl_field, self.w_Ekman_field,
+                      self.w_A_field, self.w_a_field, self.w_i_field, self.w_i0_field, self.w_ig_field,
+                      self.gamma_metric_field]:
+            field[~valid] = np.nan
 
-        for i in range(1, len(self.lats) - 1):
-            lat = self.lats[i]
-            f = 2 * Omega * np.sin(np.deg2rad(lat))  # Coriolis parameter [s^-1]
+    def process_thermodynamic_fields(self, levels=None, process_neutral_density=False):
+        logger.info('Calculating average T, S, gamma_n...')
 
-            progress_percent = 100 * i / (len(self.lats) - 2)
-            logger.info('({} Psi_delta, M-F) lat = {:.2f}/{:.2f} ({:.1f}%)'
-                        .format(self.date, lat, lat_max, progress_percent))
+        salinity_dataset = SalinityDataset(time_span=self.WOA_time_span, avg_period=self.WOA_avg_period,
+                                           grid_size=self.WOA_grid_size, field_type=self.WOA_field_type)
+        temperature_dataset = TemperatureDataset(time_span=self.WOA_time_span, avg_period=self.WOA_avg_period,
+                                                 grid_size=self.WOA_grid_size, field_type=self.WOA_field_type)
 
-            for j in range(len(self.lons)):
-                tau_x = self.tau_x_field[i][j]
-                tau_y = self.tau_y_field[i][j]
-                S = self.salinity_field[i][j]
-                dSdx = self.dSdx_field[i][j]
-                dSdy = self.dSdy_field[i][j]
+        self.salinity_field[:] = salinity_dataset.salinity_field(self.lats, self.lons, levels)
+        self.temperature_field[:] = temperature_dataset.temperature_field(self.lats, self.lons, levels)
 
-                Psi_delta = np.nan
+        if process_neutral_density:
+            gamma_dataset = NeutralDensityDataset(time_span=self.WOA_time_span, avg_period=self.WOA_avg_period,
+                                                  grid_size=self.WOA_grid_size, field_type=self.WOA_field_type,
+                                                  depth_levels=levels)
+            self.neutral_density_field[:] = gamma_dataset.gamma_n_depth_averaged_field(self.lats, self.lons, levels)
+        else:
+            self.neutral_density_field[:] = np.nan
 
-                if not np.isnan(tau_x):
-                    Psi_delta = -self.tau_x_field[i][j] / (rho_0 * f)
-                    self.psi_delta_field[i][j] = Psi_delta
+    def load_sea_ice_thickness_field(self):
+        from SeaIceThicknessDataset import SeaIceThicknessDataset
+        h_ice_dataset = SeaIceThicknessDataset(self.date)
 
-                if not np.isnan(tau_y) and not np.isnan(Psi_delta) and not np.isnan(S) and not np.isnan(dSdy):
-                    self.zonal_melt_rate_field[i][j] = Psi_delta * (1 / S) * dSdy
-                    self.merid_melt_rate_field[i][j] = (tau_y / (rho_0 * f)) * (1 / S) * dSdx
-                    self.melt_rate_field[i][j] = self.zonal_melt_rate_field[i][j] + self.merid_melt_rate_field[i][j]
+        logger.info('({} h_ice) Loading {:s} sea ice thickness field...'.format(self.date, h_ice_dataset.season))
+        self.h_ice_field[:] = h_ice_dataset.sea_ice_thickness_field(self.date)
 
-                if not np.isnan(Psi_delta):
-                    # Convert [m^2/s] -> [Sv] and account for the latitudinal dependence of the circumpolar distance.
-                    L = 2 * np.pi * R * np.cos(np.deg2rad(lat))  # Circumpolar distance [m].
-                    self.psi_delta_field[i][j] = self.psi_delta_field[i][j] * L / 1e6
+    def compute_daily_freshwater_ice_flux_and_melt_rate_fields(self):
+        """
+        Calculate the freshwater flux div(u_Ek*S), the ice flux divergence div(alpha*h*u_ice) ~ f - r, the meridional
+        streamfunction Psi_delta, and the melt rate M - F in one go on whole arrays.
+        """
+        from stencils import zonal_neighbours, meridional_neighbours
+        logger.info('({}) Calculating freshwater flux, ice flux divergence, and melt rate fields...'.format(self.date))
+
+        grid = get_grid()
+        f = grid.f[:, np.newaxis]  # Coriolis parameter [s^-1]
+        dx = grid.dx[:, np.newaxis]
+        dy = grid.dy[:, np.newaxis]
+        L = grid.circumpolar_length[:, np.newaxis]  # Circumpolar distance [m].
+
+        # Only the interior rows are filled in as the first and last rows are missing a neighbour. The ice flux
+        # divergence has also never been computed at j=0 (180 W) and j=j_max (180 E).
+        interior = np.zeros(self.salinity_field.shape, dtype=bool)
+        interior[1:-1, :] = True
+
+        interior_ice_div = np.zeros(self.salinity_field.shape, dtype=bool)
+        interior_ice_div[1:-1, 1:-1] = True
+
+        # Freshwater Ekman advection.
+        S = self.salinity_field
+        S_i_jm1, S_i_jp1 = zonal_neighbours(S)
+        S_im1_j, S_ip1_j = meridional_neighbours(S)
+
+        valid_x = ~np.isnan(self.u_Ekman_field) & ~np.isnan(S_i_jm1) & ~np.isnan(S_i_jp1)
+        valid_y = ~np.isnan(self.v_Ekman_field) & ~np.isnan(S_im1_j) & ~np.isnan(S_ip1_j)
+
+        dSdx = np.where(valid_x, (S_i_jp1 - S_i_jm1) / dx, np.nan)
+        dSdy = np.where(valid_y, (S_ip1_j - S_im1_j) / dy, np.nan)
+        ddx_uEk_S = self.u_Ekman_field * dSdx
+        ddy_vEk_S = self.v_Ekman_field * dSdy
+
+        self.dSdx_field[interior] = dSdx[interior]
+        self.dSdy_field[interior] = dSdy[interior]
+        self.ddx_uEk_S_field[interior] = ddx_uEk_S[interior]
+        self.ddy_vEk_S_field[interior] = ddy_vEk_S[interior]
+        self.freshwater_ekman_advection_field[interior] = (ddx_uEk_S + ddy_vEk_S)[interior]
+
+        # Ice flux divergence.
+        alpha_h_u_ice = self.alpha_field * self.h_ice_field * self.u_ice_field
+        alpha_h_v_ice = self.alpha_field * self.h_ice_field * self.v_ice_field
+        alpha_h_u_ice_i_jm1, alpha_h_u_ice_i_jp1 = zonal_neighbours(alpha_h_u_ice)
+        alpha_h_v_ice_im1_j, alpha_h_v_ice_ip1_j = meridional_neighbours(alpha_h_v_ice)
+        u_ice_i_jm1, u_ice_i_jp1 = zonal_neighbours(self.u_ice_field)
+        v_ice_im1_j, v_ice_ip1_j = meridional_neighbours(self.v_ice_field)
+
+        zonal_div = np.where(~np.isnan(u_ice_i_jm1) & ~np.isnan(u_ice_i_jp1),
+                             (alpha_h_u_ice_i_jp1 - alpha_h_u_ice_i_jm1) / dx, np.nan)
+        merid_div = np.where(~np.isnan(v_ice_im1_j) & ~np.isnan(v_ice_ip1_j),
+                             (alpha_h_v_ice_ip1_j - alpha_h_v_ice_im1_j) / dy, np.nan)
+
+        self.zonal_ice_flux_div_field[interior_ice_div] = zonal_div[interior_ice_div]
+        self.merid_ice_flux_div_field[interior_ice_div] = merid_div[interior_ice_div]
+        self.ice_flux_div_field[interior_ice_div] = (zonal_div + merid_div)[interior_ice_div]
+
+        # Meridional streamfunction and melt rate.
+        Psi_delta = evaluate('-tau_x / (rho_0 * f)', tau_x=self.tau_x_field, rho_0=rho_0, f=f)
+        zonal_melt_rate = evaluate('Psi_delta * (1 / S) * dSdy', Psi_delta=Psi_delta, S=S, dSdy=dSdy)
+        merid_melt_rate = evaluate('(tau_y / (rho_0 * f)) * (1 / S) * dSdx', tau_y=self.tau_y_field, rho_0=rho_0, f=f,
+                                   S=S, dSdx=dSdx)
+
+        valid_melt = interior & ~np.isnan(self.tau_y_field) & ~np.isnan(Psi_delta) & ~np.isnan(S) & ~np.isnan(dSdy)
+        self.zonal_melt_rate_field[valid_melt] = zonal_melt_rate[valid_melt]
+        self.merid_melt_rate_field[valid_melt] = merid_melt_rate[valid_melt]
+        self.melt_rate_field[valid_melt] = (zonal_melt_rate + merid_melt_rate)[valid_melt]
+
+        # Convert [m^2/s] -> [Sv] and account for the latitudinal dependence of the circumpolar distance.
+        valid_psi = interior & ~np.isnan(Psi_delta)
+        self.psi_delta_field[valid_psi] = (Psi_delta * L / 1e6)[valid_psi]
 
     def compute_daily_auxillary_fields(self):
         self.compute_daily_ekman_pumping_field()
         self.process_thermodynamic_fields(levels=[0, 1, 2, 3, 4, 5], process_neutral_density=False)
         self.load_sea_ice_thickness_field()
-        self.compute_daily_freshwater_ekman_advection_field()
-        self.compute_daily_ice_flux_divergence_field()
-        self.compute_meridional_streamfunction_and_melt_rate()
+        self.compute_daily_freshwater_ice_flux_and_melt_rate_fields()
 
-    def compute_mean_fields(self, dates, avg_method):
+    def compute_mean_fields(self, dates, avg_method, n_jobs=1, var_names=None):
+        """
+        :param n_jobs: Number of worker processes to read the daily files with, see FieldAccumulator.from_period(...).
+        :param var_names: Only average (or load) these fields instead of all of var_fields. If the mean field file
+                          already exists but only has some of them, the others are computed and var_names is extended
+                          to all of its fields so that write_fields_to_netcdf() writes them all back.
+        """
         import netCDF4
         from utils import log_netCDF_dataset_metadata
+        from CompressedField import read_netCDF_field
+        from FieldAccumulator import FieldAccumulator
+        from ClimatologyStore import ClimatologyStore
 
-        try:
-            tau_dataset = netCDF4.Dataset(self.nc_filepath)
-            log_netCDF_dataset_metadata(tau_dataset)
-            dataset_found = True
-        except OSError as e:
-            logger.info('Dataset not found, will compute mean fields: {:s}'.format(self.nc_filepath))
-            dataset_found = False
-
-        if dataset_found:
-            logger.info('Dataset found! Loading fields from: {:s}'.format(self.nc_filepath))
-            self.lats = np.array(tau_dataset.variables['lat'])
-            self.lons = np.array(tau_dataset.variables['lon'])
+        if var_names is None:
+            var_names = list(self.var_fields.keys())
+        else:
+            var_names = [var_name for var_name in self.var_fields.keys() if var_name in var_names]
 
-            for var in self.var_fields.keys():
-                loaded_field = np.array(tau_dataset.variables[var])
-                self.var_fields[var][:] = loaded_field[:]
+        # Climatologies keep their sums next to the netCDF file so they can be updated as daily files are added or
+        # replaced. The netCDF file is only reused if it was written from the daily files that exist now.
+        climo_store = None
+        if self.field_type in ClimatologyStore.climo_field_types:
+            climo_store = ClimatologyStore(self.nc_filepath, avg_method=avg_method)
 
-            return
+        saved_var_names = []
+        if climo_store is not None and os.path.isfile(self.nc_filepath) and not climo_store.is_fresh(dates):
+            logger.info('Dataset is out of date, will update mean fields: {:s}'.format(self.nc_filepath))
+        else:
+            try:
+                tau_dataset = netCDF4.Dataset(self.nc_filepath)
+                log_netCDF_dataset_metadata(tau_dataset)
+                saved_var_names = self.netCDF_var_names(tau_dataset)
+            except OSError as e:
+                logger.info('Dataset not found, will compute mean fields: {:s}'.format(self.nc_filepath))
 
-        n_days = len(dates)
+        self.var_names = []
+        missing_var_names = [var_name for var_name in var_names if var_name not in saved_var_names]
 
-        # Dictionary storing all the averaged fields.
-        field_avg = {}
+        if saved_var_names:
+            logger.info('Dataset found! Loading fields from: {:s}'.format(self.nc_filepath))
+            self.lats = np.array(tau_dataset.variables['lat'])
+            self.lons = np.array(tau_dataset.variables['lon'])
 
-        # Dictionary storing the number of days of available data at each gridpoint for each field (these are used when
-        # avg_method = 'partial_data_ok').
-        field_days = {}
+            # Load everything in the file if it's going to be extended with the missing fields.
+            self.var_names = saved_var_names if missing_var_names else var_names
 
-        # Initializing all the fields we want to calculate an average for.
-        for var_name in self.var_fields.keys():
-            field_avg[var_name] = np.zeros((len(self.lats), len(self.lons)))
-            field_days[var_name] = np.zeros((len(self.lats), len(self.lons)))
+            for var in self.var_names:
+                loaded_field = read_netCDF_field(tau_dataset, var)
+                self.var_fields[var][:] = loaded_field[:]
 
-        for date in dates:
-            tau_filepath = get_netCDF_filepath(field_type='daily', date=date)
+            for var in self.std_var_names:
+                if var in self.var_names and var + '_std' in tau_dataset.variables:
+                    self.std_fields[var] = read_netCDF_field(tau_dataset, var + '_std')
 
-            logger.info('Averaging {:%b %d, %Y} ({:s})...'.format(date, tau_filepath))
+            tau_dataset.close()
 
-            try:
-                current_tau_dataset = netCDF4.Dataset(tau_filepath)
-                log_netCDF_dataset_metadata(current_tau_dataset)
-            except OSError as e:
-                logger.error('{}'.format(e))
-                logger.warning('{:s} not found. Proceeding without it...'.format(tau_filepath))
-                n_days = n_days - 1  # Must account for lost day if using avg_method='full_data_only'.
-                continue
+            if not missing_var_names:
+                return
 
-            self.lats = np.array(current_tau_dataset.variables['lat'])
-            self.lons = np.array(current_tau_dataset.variables['lon'])
+            logger.info('Dataset is missing {:d} fields, will compute them: {}'
+                        .format(len(missing_var_names), missing_var_names))
 
-            daily_fields = {}
-            for var_name in self.var_fields.keys():
-                daily_fields[var_name] = np.array(current_tau_dataset.variables[var_name])
+        if climo_store is not None:
+            climo_store.update(dates, missing_var_names, n_jobs=n_jobs)
+            accumulator = climo_store.accumulator
+        else:
+            accumulator = FieldAccumulator.from_period(dates, missing_var_names, avg_method, n_jobs=n_jobs)
 
-            if avg_method == 'full_data_only':
-                for var_name in self.var_fields.keys():
-                    field_avg[var_name] = field_avg[var_name] + daily_fields[var_name]/n_days
+        self.set_mean_fields(accumulator, missing_var_names)
+        self.var_names = [var_name for var_name in self.var_fields.keys()
+                          if var_name in self.var_names or var_name in missing_var_names]
 
-            elif avg_method == 'partial_data_ok':
-                for var_name in self.var_fields.keys():
-                    field_avg[var_name] = field_avg[var_name] + np.nan_to_num(daily_fields[var_name])
-                    daily_fields[var_name][~np.isnan(daily_fields[var_name])] = 1
-                    daily_fields[var_name][np.isnan(daily_fields[var_name])] = 0
-                    field_days[var_name] = field_days[var_name] + daily_fields[var_name]
+    def set_mean_fields(self, accumulator, var_names=None):
+        """
+        Set the fields in var_names (all of them by default) to the means, and their std_fields to the standard
+        deviations, of a FieldAccumulator.
+        """
+        if var_names is None:
+            var_names = self.var_fields.keys()
 
         # Remember that the [:] syntax is used is so that we perform deep copies. Otherwise, e.g.
         # self.var_fields['ice_u'] will point to a different array than the original self.u_ice_field, and will NOT be
         # the same object as self.figure_fields['u_ice']!. The figure plots will come out all empty.
-        if avg_method == 'full_data_only':
-            for var_name in self.var_fields.keys():
-                self.var_fields[var_name][:] = field_avg[var_name][:]
+        mean_fields = accumulator.mean_fields()
+        for var_name in var_names:
+            if var_name in mean_fields:
+                self.var_fields[var_name][:] = mean_fields[var_name][:]
+
+        std_fields = accumulator.std_fields()
+        for var_name in self.std_var_names:
+            if var_name in var_names and var_name in std_fields:
+                self.std_fields[var_name] = std_fields[var_name]
+
+    def netCDF_var_names(self, tau_dataset):
+        """ Fields stored in a netCDF dataset, from its var_names attribute if it has one. """
+        if 'var_names' in tau_dataset.ncattrs():
+            return tau_dataset.var_names.split()
+        return [var_name for var_name in self.var_fields.keys() if var_name in tau_dataset.variables]
+
+    @staticmethod
+    def read_daily_fields(tau_dataset, var_names):
+        """
+        Read the fields of a daily netCDF dataset for averaging. Fields stored compressed by gathering come back as
+        CompressedField objects, see FieldAccumulator.
+        """
+        from CompressedField import read_netCDF_field
+
+        return {var_name: read_netCDF_field(tau_dataset, var_name, decompress=False) for var_name in var_names}
 
-        elif avg_method == 'partial_data_ok':
-            for var_name in self.var_fields.keys():
-                field_avg[var_name] = np.divide(field_avg[var_name], field_days[var_name])
-                self.var_fields[var_name][:] = field_avg[var_name][:]
+    def smoothed_fields(self, var_names, kernel):
+        """ Smoothed copies of the fields in var_names, all smoothed together. See smoothing.smooth(...). """
+        from smoothing import smooth
+        return dict(zip(var_names, smooth([self.var_fields[var_name] for var_name in var_names], kernel)))
 
     def plot_diagnostic_fields(self, plot_type, custom_label=None, avg_period=None):
         import matplotlib
@@ -1112,8 +1110,14 @@ class SurfaceStressDataWriter(object):
 
         plt.close()
 
-    def write_fields_to_netcdf(self):
+    def write_fields_to_netcdf(self, compress_SIZ_fields=False):
+        """
+        :param compress_SIZ_fields: If True, the fields in SIZ_var_names are only stored on the cells where at least one
+                                    of them isn't NaN, using CF compression by gathering along a SIZ_cell dimension.
+                                    Use CompressedField.read_netCDF_field to read them back onto the full grid.
+        """
         from constants import var_units, var_positive, var_long_names
+        from CompressedField import CompressedField, create_compressed_dimension, write_netCDF_variable
 
         nc_dir = os.path.dirname(self.nc_filepath)
         if not os.path.exists(nc_dir):
@@ -1148,11 +1152,34 @@ class SurfaceStressDataWriter(object):
         lat_var.units = 'degrees west/east'
         lon_var[:] = self.lons
 
-        for var_name in self.var_fields.keys():
-            field_var = tau_dataset.createVariable(var_name, float, ('lat', 'lon'), zlib=True)
+        # Lets readers tell which fields a file has when only some of them were computed.
+        tau_dataset.var_names = ' '.join(self.var_names)
+
+        SIZ_var_names = [var_name for var_name in self.SIZ_var_names if var_name in self.var_names]
+        compress_SIZ_fields = compress_SIZ_fields and len(SIZ_var_names) > 0
+
+        if compress_SIZ_fields:
+            SIZ_fields = [self.var_fields[var_name] for var_name in SIZ_var_names]
+            SIZ_cells = np.flatnonzero(np.any([~np.isnan(field) for field in SIZ_fields], axis=0))
+            create_compressed_dimension(tau_dataset, 'SIZ_cell', SIZ_cells, compress='lat lon')
+
+        for var_name in self.var_names:
+            if compress_SIZ_fields and var_name in self.SIZ_var_names:
+                compressed_field = CompressedField.gather(self.var_fields[var_name], SIZ_cells)
+                field_var = write_netCDF_variable(tau_dataset, var_name, compressed_field, 'SIZ_cell')
+            else:
+                field_var = tau_dataset.createVariable(var_name, float, ('lat', 'lon'), zlib=True)
+                field_var[:] = self.var_fields[var_name]
+
             field_var.units = var_units[var_name]
             field_var.positive = var_positive[var_name]
             field_var.long_name = var_long_names[var_name]
-            field_var[:] = self.var_fields[var_name]
+
+        for var_name, std_field in self.std_fields.items():
+            field_var = tau_dataset.createVariable(var_name + '_std', float, ('lat', 'lon'), zlib=True)
+            field_var[:] = std_field
+
+            field_var.units = var_units[var_name]
+            field_var.long_name = var_long_names[var_name] + ' (standard deviation)'
 
         tau_dataset.close()
@@ -39,8 +39,17 @@ class SurfaceWindDataset(object):
         self.interpolate_wind_field()
 
     def date_to_dataset_filepath(self, date):
-        uwind_filepath = path.join(self.data_dir_path, 'uwnd.10m.gauss.' + str(self.date.year) + '.nc')
-        vwind_filepath = path.join(self.data_dir_path, 'vwnd.10m.gauss.' + str(self.date.year) + '.nc')
+        from InputDataCatalog import get_input_data_catalog
+
+        # Use the files found by the input data catalog if there are any, otherwise guess the filenames.
+        catalog = get_input_data_catalog()
+        uwind_filepath = catalog.get_filepath('u_wind', date)
+        vwind_filepath = catalog.get_filepath('v_wind', date)
+
+        if uwind_filepath is None:
+            uwind_filepath = path.join(self.data_dir_path, 'uwnd.10m.gauss.' + str(self.date.year) + '.nc')
+        if vwind_filepath is None:
+            vwind_filepath = path.join(self.data_dir_path, 'vwnd.10m.gauss.' + str(self.date.year) + '.nc')
 
         return uwind_filepath, vwind_filepath
 
@@ -36,7 +36,10 @@ class TemperatureDataset(object):
         self.lats = None
         self.lons = None
         self.depths = None
-        self.temperature_data = None
+
+        # Depth levels are only read from disk when they are needed, see temperature_levels(depth_levels).
+        self.field_var = 't_' + self.field_type
+        self.WOA_parameters = (self.time_span, self.avg_period, self.grid_size, self.field_type)
 
         logger.info('TemperatureDataset object initializing for time span {} and averaging period {}...'
                     .format(self.time_span, self.avg_period))
@@ -61,28 +64,75 @@ class TemperatureDataset(object):
         self.lons = np.array(self.temperature_dataset.variables['lon'])
         self.depths = np.array(self.temperature_dataset.variables['depth'])
 
-        field_var = 't_' + self.field_type
+    def temperature_levels(self, depth_levels):
+        """
+        :param depth_levels: List of integer depth levels.
+        :return: Temperature on the given depth levels as an array of shape (n_levels, n_lats, n_lons) with missing
+                 values set to NaN. Only the requested levels are read and they are cached for other instances to reuse.
+        """
+        from utils import load_WOA_depth_levels
+        return load_WOA_depth_levels(self.temperature_dataset, self.field_var, self.WOA_parameters, depth_levels)
 
-        self.temperature_data = np.array(self.temperature_dataset.variables[field_var])
+    def temperature_level(self, depth_level):
+        """
+        :param depth_level: Integer depth level.
+        :return: Temperature on the given depth level, shape (n_lats, n_lons). This is the cached array itself so don't
+                 modify it.
+        """
+        from utils import load_WOA_depth_level
+        return load_WOA_depth_level(self.temperature_dataset, self.field_var, self.WOA_parameters, depth_level)
 
-    def meridional_temperature_profile(self, lon, lat_min, lat_max):
-        _, n_levels, n_lats, n_lons = self.temperature_data.shape
-        n_depths = len(self.depths)
+    def depth_averaged_temperature(self, depth_levels):
+        """
+        :param depth_levels: List of integer depth levels.
+        :return: Temperature averaged over the given depth levels on the WOA grid, shape (n_lats, n_lons).
+        """
+        from utils import load_WOA_depth_averaged_field
+        return load_WOA_depth_averaged_field(self.temperature_dataset, self.field_var, self.WOA_parameters,
+                                             depth_levels)
 
-        idx_lon = np.abs(self.lons - lon).argmin()
+    def temperature_field(self, lats, lons, depth_levels):
+        """
+        Same as calling temperature(lat, lon, depth_levels) at every point of a lat-lon grid, but the nearest WOA grid
+        point is found for each row and column once and the whole field is gathered in one go.
+
+        :return: Depth-averaged temperature of shape (len(lats), len(lons)).
+        """
+        from utils import nearest_index
+
+        idx_lat = nearest_index(self.lats, lats)
+        idx_lon = nearest_index(self.lons, lons)
+
+        return self.depth_averaged_temperature(depth_levels)[np.ix_(idx_lat, idx_lon)]
+
+    def meridional_temperature_profiles(self, lons, lat_min, lat_max):
+        """
+        Extract meridional temperature sections at multiple longitudes by reading only the (depth, lat, lon) hyperslab
+        that contains them from disk.
+
+        :return: lats, depths, and an array of shape (len(lons), n_depths, n_lats) with one section per longitude.
+        """
+        idx_lons = [np.abs(self.lons - lon).argmin() for lon in lons]
         idx_lat_min = np.abs(self.lats - lat_min).argmin()
         idx_lat_max = np.abs(self.lats - lat_max).argmin() + 1
 
-        n_lats = idx_lat_max - idx_lat_min
         lats = self.lats[idx_lat_min:idx_lat_max]
 
-        temperature_profile = np.zeros((n_lats, n_levels))
-        for i in range(n_depths):
-            temperature_profile[:, i] = self.temperature_data[0, i, idx_lat_min:idx_lat_max, idx_lon]
+        # netCDF4 wants increasing indices so read each longitude once and then put them back in the requested order.
+        idx_lons_unique, idx_inverse = np.unique(idx_lons, return_inverse=True)
+
+        field_var = self.temperature_dataset.variables[self.field_var]
+        temperature_hyperslab = np.ma.filled(field_var[0, :, idx_lat_min:idx_lat_max, idx_lons_unique], np.nan)
+        temperature_hyperslab = temperature_hyperslab.astype(float)
+        temperature_hyperslab[temperature_hyperslab > 1e3] = np.nan
 
-        temperature_profile[temperature_profile > 1e3] = np.nan
+        temperature_profiles = np.moveaxis(temperature_hyperslab, -1, 0)[idx_inverse]
 
-        return lats, self.depths, temperature_profile.transpose()
+        return lats, self.depths, temperature_profiles
+
+    def meridional_temperature_profile(self, lon, lat_min, lat_max):
+        lats, depths, temperature_profiles = self.meridional_temperature_profiles([lon], lat_min, lat_max)
+        return lats, depths, temperature_profiles[0]
 
     def temperature(self, lat, lon, depth_levels):
         """
@@ -100,22 +150,9 @@ class TemperatureDataset(object):
         idx_lon = np.abs(self.lons - lon).argmin()
 
         if isinstance(depth_levels, int):
-            temperature_scalar = self.temperature_data[0][depth_levels][idx_lat][idx_lon]
-
-            if temperature_scalar > 1e3:
-                return np.nan
-            else:
-                return temperature_scalar
+            return self.temperature_level(depth_levels)[idx_lat, idx_lon]
 
         elif isinstance(depth_levels, list):
-            temperature_avg = 0
-            for level in depth_levels:
-                temperature_scalar = self.temperature_data[0][level][idx_lat][idx_lon]
-                if temperature_scalar > 1e3:
-                    return np.nan
-                else:
-                    temperature_avg = temperature_avg + (temperature_scalar/len(depth_levels))
-
-            return temperature_avg
+            return self.depth_averaged_temperature(depth_levels)[idx_lat][idx_lon]
         else:
             logger.error('depth_levels not an int or list instance! depth_level={}'.format(depth_levels))
\ No newline at end of file
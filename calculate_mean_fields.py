@@ -1,3 +1,4 @@
+import os
 import datetime
 import calendar
 
@@ -78,7 +79,10 @@ def produce_seasonal_mean(seasons_to_compute, year):
     # surface_stress_dataset.write_fields_to_netcdf(field_type='seasonal')
 
 
-def produce_seasonal_climatology(seasons, year_start, year_end):
+def produce_seasonal_climatology(seasons, year_start, year_end, n_jobs=None):
+    """ :param n_jobs: Number of worker processes to read the daily files with, all the CPUs by default. """
+    n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+
     year_range = str(year_start) + '-' + str(year_end)
 
     labels = {
@@ -129,16 +133,19 @@ def produce_seasonal_climatology(seasons, year_start, year_end):
                                                          year_start=year_start, year_end=year_end)
         surface_stress_dataset.date = season_days[0]
 
-        surface_stress_dataset.compute_mean_fields(season_days, avg_method='partial_data_ok')
+        surface_stress_dataset.compute_mean_fields(season_days, avg_method='partial_data_ok', n_jobs=n_jobs)
 
         surface_stress_dataset.plot_diagnostic_fields(plot_type='custom', custom_label=labels[season])
         surface_stress_dataset.write_fields_to_netcdf()
 
 
-def produce_monthly_climatology(months, year_start, year_end):
+def produce_monthly_climatology(months, year_start, year_end, n_jobs=None):
+    """ :param n_jobs: Number of worker processes to read the daily files with, all the CPUs by default. """
     import calendar
     from utils import get_netCDF_filepath
 
+    n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+
     year_range = str(year_start) + '-' + str(year_end)
 
     for month in months:
@@ -157,15 +164,18 @@ def produce_monthly_climatology(months, year_start, year_end):
                                                          year_start=year_start, year_end=year_end)
         surface_stress_dataset.date = month_days[-1]
 
-        surface_stress_dataset.compute_mean_fields(month_days, avg_method='partial_data_ok')
+        surface_stress_dataset.compute_mean_fields(month_days, avg_method='partial_data_ok', n_jobs=n_jobs)
 
         surface_stress_dataset.plot_diagnostic_fields(plot_type='custom', custom_label=label)
         surface_stress_dataset.write_fields_to_netcdf()
 
 
-def produce_climatology(year_start, year_end):
+def produce_climatology(year_start, year_end, n_jobs=None):
+    """ :param n_jobs: Number of worker processes to read the daily files with, all the CPUs by default. """
     from utils import get_netCDF_filepath
 
+    n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+
     climo_label = str(year_start) + '-' + str(year_end) + '_average'
 
     dates = date_range(datetime.date(year_start, 1, 1), datetime.date(year_end, 12, 31))
@@ -173,13 +183,150 @@ def produce_climatology(year_start, year_end):
     surface_stress_dataset = SurfaceStressDataWriter(field_type='climo', year_start=year_start, year_end=year_end)
     surface_stress_dataset.date = dates[0]
 
-    surface_stress_dataset.compute_mean_fields(dates, avg_method='partial_data_ok')
+    surface_stress_dataset.compute_mean_fields(dates, avg_method='partial_data_ok', n_jobs=n_jobs)
 
     surface_stress_dataset.plot_diagnostic_fields(plot_type='custom', custom_label=climo_label)
     surface_stress_dataset.write_fields_to_netcdf()
 
 
+def produce_mean_fields(year_start, year_end, anomaly_climo=None, quantiles=None, thresholds=None,
+                        lower_thresholds=None):
+    """
+    Monthly, seasonal and annual means for every year plus the monthly, seasonal and full climatologies, all from a
+    single pass over the daily files. Daily anomalies are also written out if anomaly_climo is given, against a
+    climatology that must already exist, see MeanFieldAggregator. Quantiles are also written out from the same pass if
+    quantiles is given, see produce_quantiles(...).
+    """
+    from MeanFieldAggregator import MeanFieldAggregator
+
+    aggregator = MeanFieldAggregator(avg_method='partial_data_ok', anomaly_climo=anomaly_climo)
+
+    aggregator.add_monthly_means(list(range(1, 13)), year_start, year_end)
+    aggregator.add_seasonal_means(['DJF', 'JFM', 'AMJ', 'JAS', 'OND'], year_start, year_end)
+    aggregator.add_annual_means(year_start, year_end)
+    aggregator.add_monthly_climatology(list(range(1, 13)), year_start, year_end)
+    aggregator.add_seasonal_climatology(['JFM', 'AMJ', 'JAS', 'OND'], year_start, year_end)
+    aggregator.add_climatology(year_start, year_end)
+
+    sketches = None
+    if quantiles is not None:
+        sketches = quantile_sketches(quantiles, thresholds, lower_thresholds)
+        aggregator.add_quantile_sketches(sketches, date_range(datetime.date(year_start, 1, 1),
+                                                              datetime.date(year_end, 12, 31)))
+
+    aggregator.run()
+
+    if sketches is not None:
+        write_quantiles(sketches, year_start, year_end)
+
+
+def produce_quantiles(year_start, year_end, quantiles=(0.05, 0.5, 0.95), thresholds=None, lower_thresholds=None):
+    """
+    Quantiles of the daily surface stress magnitude and Ekman pumping at every grid point over a range of years, plus
+    the number of days they're above or below some thresholds, from a single pass over the daily files. See
+    QuantileSketch and MeanFieldAggregator.add_quantile_sketches(...).
+
+    :param thresholds: Dictionary of thresholds for 'tau_magnitude' and 'Ekman_w' to count the days above.
+    :param lower_thresholds: Dictionary of thresholds for 'tau_magnitude' and 'Ekman_w' to count the days below.
+    """
+    from MeanFieldAggregator import MeanFieldAggregator
+
+    sketches = quantile_sketches(quantiles, thresholds, lower_thresholds)
+
+    aggregator = MeanFieldAggregator(avg_method='partial_data_ok', plot=False)
+    aggregator.add_quantile_sketches(sketches, date_range(datetime.date(year_start, 1, 1),
+                                                          datetime.date(year_end, 12, 31)))
+    aggregator.run()
+
+    write_quantiles(sketches, year_start, year_end)
+
+
+def quantile_sketches(quantiles, thresholds=None, lower_thresholds=None):
+    """ Empty quantile sketches of the surface stress magnitude and Ekman pumping, see produce_quantiles(...). """
+    from QuantileSketch import QuantileSketch
+    from constants import n_lat, n_lon
+
+    thresholds = {} if thresholds is None else thresholds
+    lower_thresholds = {} if lower_thresholds is None else lower_thresholds
+
+    return {var_name: QuantileSketch(quantiles, (n_lat, n_lon), thresholds.get(var_name),
+                                     lower_thresholds.get(var_name))
+            for var_name in ['tau_magnitude', 'Ekman_w']}
+
+
+def write_quantiles(sketches, year_start, year_end):
+    import time
+    import netCDF4
+    from utils import get_quantile_filepath
+    from constants import lat_min, lat_max, lon_min, lon_max, n_lat, n_lon, var_units, var_long_names
+
+    units = {'tau_magnitude': var_units['tau_x'], 'Ekman_w': var_units['Ekman_w']}
+    long_names = {'tau_magnitude': 'surface stress magnitude', 'Ekman_w': var_long_names['Ekman_w']}
+
+    nc_filepath = get_quantile_filepath(year_start, year_end)
+
+    nc_dir = os.path.dirname(nc_filepath)
+    if not os.path.exists(nc_dir):
+        logger.info('Creating directory: {:s}'.format(nc_dir))
+        os.makedirs(nc_dir)
+
+    logger.info('Saving quantiles to netCDF file: {:s}'.format(nc_filepath))
+
+    tau_dataset = netCDF4.Dataset(nc_filepath, 'w')
+
+    tau_dataset.title = 'Antarctic sea ice zone surface stress quantiles ' + str(year_start) + '-' + str(year_end)
+    tau_dataset.quantile_method = 'P-square (Jain and Chlamtac, 1985), exact where there are fewer than 5 days'
+    tau_dataset.history = 'Created ' + time.ctime() + '.'
+
+    tau_dataset.createDimension('lat', n_lat)
+    tau_dataset.createDimension('lon', n_lon)
+
+    tau_dataset.createVariable('lat', np.float32, ('lat',))[:] = np.linspace(lat_min, lat_max, n_lat)
+    tau_dataset.createVariable('lon', np.float32, ('lon',))[:] = np.linspace(lon_min, lon_max, n_lon)
+
+    for var_name, sketch in sketches.items():
+        for p, field in sketch.quantile_fields().items():
+            field_var = tau_dataset.createVariable(var_name + '_p' + str(int(round(100 * p))).zfill(2), float,
+                                                   ('lat', 'lon'), zlib=True)
+            field_var[:] = field
+            field_var.units = units[var_name]
+            field_var.long_name = long_names[var_name] + ' ({:g}th percentile)'.format(100 * p)
+
+        days_var = tau_dataset.createVariable(var_name + '_days', np.int32, ('lat', 'lon'), zlib=True)
+        days_var[:] = sketch.day_counts()
+        days_var.long_name = 'number of days with ' + long_names[var_name]
+
+        # Days above the thresholds as <var>_exceedances and days below the lower thresholds as <var>_lower_exceedances.
+        for prefix, thresholds, comparison, lower in [('', sketch.thresholds, 'greater', False),
+                                                      ('_lower', sketch.lower_thresholds, 'less', True)]:
+            if not thresholds:
+                continue
+
+            threshold_dim = var_name + prefix + '_threshold'
+            tau_dataset.createDimension(threshold_dim, len(thresholds))
+
+            threshold_var = tau_dataset.createVariable(threshold_dim, float, (threshold_dim,))
+            threshold_var[:] = thresholds
+            threshold_var.units = units[var_name]
+
+            exceedance_var = tau_dataset.createVariable(var_name + prefix + '_exceedances', np.int32,
+                                                        (threshold_dim, 'lat', 'lon'), zlib=True)
+            exceedance_fields = sketch.exceedance_fields(lower=lower)
+            exceedance_var[:] = np.stack([exceedance_fields[threshold] for threshold in thresholds])
+            exceedance_var.long_name = 'number of days with ' + long_names[var_name] + ' ' + comparison \
+                + ' than the threshold'
+
+    tau_dataset.close()
+
+
 if __name__ == '__main__':
+    # produce_mean_fields(2005, 2015)
+    # Anomalies need the climatology written out by the line above first.
+    # produce_mean_fields(2005, 2015, anomaly_climo=('monthly_climo', 2005, 2015))
+    # Strong stress, upwelling (Ekman_w > 0) and downwelling (Ekman_w < 0) days.
+    # produce_quantiles(1995, 2014, thresholds={'tau_magnitude': [0.1, 0.2], 'Ekman_w': [1e-6]},
+    #                   lower_thresholds={'Ekman_w': [-1e-6]})
+
     # produce_monthly_mean(datetime.date(2015, 10, 1))
     # produce_monthly_climatology([2, 9], 2005, 2015)
     # produce_monthly_climatology([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12], 2005, 2012)
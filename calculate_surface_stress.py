@@ -2,6 +2,7 @@
 # TODO: Use propoer docstrings for functions.
 # TODO: Estimate tau_error? Can you? NCEP Reanalysis doesn't really provide a "measurement error".
 
+import os
 import datetime
 import calendar
 
@@ -35,9 +36,22 @@ def check_sea_ice_motion_field():
     sic.plot_sea_ice_motion_vector_field()
 
 
-def process_day(date):
-    """ Process for only one day. """
+def process_day(date, expression_threads=None):
+    """
+    Process for only one day.
+
+    :param expression_threads: Number of threads used to evaluate field expressions (see expressions.py). Pass 1 when
+                               processing days in parallel so the workers don't compete for cores.
+
+    The fields are also added to the monthly partial sums while they're still in memory, see write_monthly_mean(...).
+    """
     from SurfaceStressDataWriter import SurfaceStressDataWriter
+    from FieldAccumulator import FieldAccumulator
+
+    if expression_threads is not None:
+        from expressions import set_expression_backend
+        from constants import expression_backend
+        set_expression_backend(expression_backend, n_threads=expression_threads)
 
     try:
         surface_stress_dataset = SurfaceStressDataWriter(field_type='daily', date=date)
@@ -46,6 +60,9 @@ def process_day(date):
         surface_stress_dataset.compute_daily_auxillary_fields()
 
         surface_stress_dataset.write_fields_to_netcdf()
+
+        FieldAccumulator.add_to_monthly_partial(date, surface_stress_dataset.var_fields,
+                                                mtime=os.path.getmtime(surface_stress_dataset.nc_filepath))
     except Exception as e:
         logger.error('Failed to process day {}. Returning.'.format(date))
         logger.error('{}'.format(e), exc_info=True)
@@ -73,24 +90,64 @@ def plot_day(date):
     surface_stress_dataset.plot_diagnostic_fields(plot_type='daily')
 
 
-def process_month(date_in_month):
-    """ Process one month. """
-    from utils import date_range
+def write_monthly_mean(year, month):
+    """
+    Write out the monthly mean from the monthly partial sums that process_day adds each day to, so only days that
+    weren't processed through process_day (if any) have to be read.
+    """
+    from SurfaceStressDataWriter import SurfaceStressDataWriter
+    from FieldAccumulator import FieldAccumulator
+    from constants import var_units
 
-    year = date_in_month.year
-    month = date_in_month.month
+    partial = FieldAccumulator.monthly_partial(year, month, list(var_units.keys()))
+    if partial.n_days == 0:
+        logger.warning('No daily fields found for {:d}-{:02d}. Not writing its monthly mean.'.format(year, month))
+        return
 
-    n_days = calendar.monthrange(year, month)[1]
-    dates = date_range(datetime.date(year, month, 1), datetime.date(year, month, n_days))
+    surface_stress_dataset = SurfaceStressDataWriter(field_type='monthly', date=datetime.date(year, month, 1))
+    surface_stress_dataset.set_mean_fields(partial)
+    surface_stress_dataset.write_fields_to_netcdf()
 
-    Parallel(n_jobs=16)(delayed(process_day)(datetime.date(year, month, day)) for day in range(1, n_days + 1))
 
+def plan_days(months, year_start, year_end):
+    """
+    Use the input data catalog to plan a run up front: returns a list of (year, month, dates) in processing order where
+    dates only includes the days that have every input product process_day needs. Impossible days are logged and
+    skipped here instead of failing inside a worker.
+    """
+    from InputDataCatalog import get_input_data_catalog
+    from utils import date_range
 
-def process_months_multiple_years(months, year_start, year_end):
+    catalog = get_input_data_catalog()
+
+    plan = []
+    n_days_total = 0
     for year in range(year_end, year_start - 1, -1):
         for month in months:
             n_days = calendar.monthrange(year, month)[1]
-            Parallel(n_jobs=16)(delayed(process_day)(datetime.date(year, month, day)) for day in range(1, n_days + 1))
+            month_dates = date_range(datetime.date(year, month, 1), datetime.date(year, month, n_days))
+            dates = catalog.available_dates(month_dates)
+            n_days_total = n_days_total + n_days
+            if dates:
+                plan.append((year, month, dates))
+
+    n_days_planned = sum(len(dates) for _, _, dates in plan)
+    logger.info('Planned {:d}/{:d} days for {:d}-{:d}.'.format(n_days_planned, n_days_total, year_start, year_end))
+
+    return plan
+
+
+def process_month(date_in_month):
+    """ Process one month. """
+    for year, month, dates in plan_days([date_in_month.month], date_in_month.year, date_in_month.year):
+        Parallel(n_jobs=16)(delayed(process_day)(date, expression_threads=1) for date in dates)
+        write_monthly_mean(year, month)
+
+
+def process_months_multiple_years(months, year_start, year_end):
+    for year, month, dates in plan_days(months, year_start, year_end):
+        Parallel(n_jobs=16)(delayed(process_day)(date, expression_threads=1) for date in dates)
+        write_monthly_mean(year, month)
 
 
 def process_year(date_in_year):
@@ -103,17 +160,16 @@ def process_year(date_in_year):
 
 
 def process_multiple_years(year_start, year_end):
-    for year in range(year_end, year_start - 1, -1):
-        for month in range(1, 13):
-            n_days = calendar.monthrange(year, month)[1]
-            Parallel(n_jobs=20)(delayed(process_day)(datetime.date(year, month, day)) for day in range(1, n_days + 1))
-
-            # try:
-            #     Parallel(n_jobs=12)(delayed(process_day)(datetime.date(date_in_month.year, date_in_month.month, day))
-            #                         for day in range(1, n_days+1))
-            # except Exception as e:
-            #     logger.error('{}'.format(e), exc_info=True)
-            #     continue
+    for year, month, dates in plan_days(list(range(1, 13)), year_start, year_end):
+        Parallel(n_jobs=20)(delayed(process_day)(date, expression_threads=1) for date in dates)
+        write_monthly_mean(year, month)
+
+        # try:
+        #     Parallel(n_jobs=12)(delayed(process_day)(datetime.date(date_in_month.year, date_in_month.month, day))
+        #                         for day in range(1, n_days+1))
+        # except Exception as e:
+        #     logger.error('{}'.format(e), exc_info=True)
+        #     continue
 
 
 if __name__ == '__main__':
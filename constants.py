@@ -79,6 +79,12 @@ u_ice_interp_method = 'cubic'
 u_wind_interp_method = 'cubic'
 dot_interp_method = 'linear'
 
+""" Backend used to evaluate elementwise field formulas, see expressions.py ('numexpr' or 'numpy') """
+expression_backend = 'numexpr'
+
+""" Solver used for the surface stress in the sea ice zone, see stress_kernels.py ('numba' or 'numpy') """
+surface_stress_solver = 'numba'
+
 """ Constants for saving fields to netCDF file. """
 var_units = {
     'geo_u': 'm/s',
@@ -0,0 +1,104 @@
+"""
+Evaluation of elementwise field formulas, e.g. the quadratic drag laws, the Ekman pumping components and the melt rate
+terms, which on whole (n_lat, n_lon) arrays otherwise allocate a temporary array for every operation.
+
+Formulas are written as strings in numexpr syntax and evaluated with
+
+    evaluate('rho * C * sqrt(u*u + v*v) * u', rho=rho_0, C=C_seawater, u=u, v=v)
+
+With the numexpr backend each formula is compiled into a single multithreaded kernel without intermediate arrays. With
+the numpy backend the same formula is evaluated as a plain numpy expression, performing the same operations in the same
+order, so both backends give the same result. The numpy backend is used when numexpr isn't installed.
+
+The backend is chosen by expression_backend in constants and can be changed at run time with set_expression_backend.
+"""
+
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+backends = ['numexpr', 'numpy']
+
+# Functions that can be used in formulas, and their numpy equivalents.
+_numpy_functions = {
+    'where': np.where,
+    'sqrt': np.sqrt,
+    'abs': np.abs,
+    'exp': np.exp,
+    'log': np.log,
+    'sin': np.sin,
+    'cos': np.cos,
+    'arctan2': np.arctan2
+}
+
+# Backend used by evaluate(...), see get_expression_backend().
+_backend = None
+
+# Formulas compiled for the numpy backend.
+_compiled_expressions = {}
+
+
+def numexpr_available():
+    import importlib.util
+    return importlib.util.find_spec('numexpr') is not None
+
+
+def set_expression_backend(backend, n_threads=None):
+    """
+    :param backend: 'numexpr' or 'numpy'. Falls back to 'numpy' (with a warning) if numexpr isn't installed.
+    :param n_threads: Number of threads used by numexpr. Set this to 1 when days are already being processed in
+                      parallel, otherwise numexpr uses all the cores for each day.
+    """
+    global _backend
+
+    if backend not in backends:
+        logger.error('Invalid expression backend: {}. Choose from {}.'.format(backend, backends))
+        raise ValueError('Invalid expression backend: {}. Choose from {}.'.format(backend, backends))
+
+    if backend == 'numexpr' and not numexpr_available():
+        logger.warning('numexpr is not installed. Falling back to the numpy expression backend.')
+        backend = 'numpy'
+
+    if backend == 'numexpr' and n_threads is not None:
+        import numexpr
+        numexpr.set_num_threads(n_threads)
+
+    logger.info('Using the {:s} expression backend.'.format(backend))
+    _backend = backend
+
+
+def get_expression_backend():
+    """ Backend used by evaluate(...). The first call picks it up from constants. """
+    if _backend is None:
+        from constants import expression_backend
+        set_expression_backend(expression_backend)
+    return _backend
+
+
+def evaluate(expression, out=None, **variables):
+    """
+    Evaluate an elementwise formula on arrays (and scalars) that broadcast against each other.
+
+    :param expression: Formula in numexpr syntax using the names in variables and the functions in _numpy_functions.
+    :param out: Optional array to write the result into.
+    :return: Array holding the result (out if it was given).
+    """
+    if get_expression_backend() == 'numexpr':
+        import numexpr
+        return numexpr.evaluate(expression, local_dict=variables, global_dict={}, out=out)
+
+    if expression not in _compiled_expressions:
+        _compiled_expressions[expression] = compile(expression, '<expression>', 'eval')
+
+    namespace = dict(_numpy_functions)
+    namespace['__builtins__'] = {}
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = eval(_compiled_expressions[expression], namespace, variables)
+
+    if out is None:
+        return np.asarray(result)
+
+    out[...] = result
+    return out
@@ -139,8 +139,9 @@ def make_five_box_climo_fig(var):
 
 def make_melt_rate_diagnostic_fig():
     from SalinityDataset import SalinityDataset
-    from utils import distance, get_netCDF_filepath, get_field_from_netcdf
-    from constants import Omega, rho_0, figure_dir_path
+    from Grid import get_grid
+    from utils import get_netCDF_filepath, get_field_from_netcdf
+    from constants import rho_0, figure_dir_path
 
     salinity_dataset = SalinityDataset(time_span='A5B2', avg_period='00', grid_size='04', field_type='an')
 
@@ -167,15 +168,17 @@ def make_melt_rate_diagnostic_fig():
     #
     # salinity[:] = salinity_smoothed[:]
 
+    grid = get_grid()
+
     for i in range(1, len(lats)-1):
         lat = lats[i]
-        f = 2 * Omega * np.sin(np.deg2rad(lat))  # Coriolis parameter [s^-1]
+        f = grid.f[i]  # Coriolis parameter [s^-1]
 
         progress_percent = 100 * i / (len(lats) - 2)
         logger.info('(melt_rate_field) lat = {:.2f}/{:.2f} ({:.1f}%)'.format(lat, lats[-1], progress_percent))
 
-        dx = distance(lats[i-1], lons[0], lats[i+1], lons[0])
-        dy = distance(lats[i], lons[0], lats[i], lons[2])
+        dx = grid.dx[i]
+        dy = grid.dy[i]
 
         for j in range(1, len(lons)-1):
             lon = lons[j]
@@ -326,7 +329,8 @@ def make_zonal_and_contour_averaged_plots():
 
     from utils import get_netCDF_filepath, get_field_from_netcdf
     from utils import get_northward_zero_zonal_stress_line, get_northward_ice_edge, get_coast_coordinates
-    from constants import figure_dir_path, D_e, Omega
+    from constants import figure_dir_path, D_e
+    from Grid import get_grid
 
     tau_filepath = get_netCDF_filepath(field_type='climo', year_start=2005, year_end=2015)
 
@@ -345,10 +349,11 @@ def make_zonal_and_contour_averaged_plots():
     dSdy_field = get_field_from_netcdf(tau_filepath, 'dSdy')[2]
 
     melt_rate_field_v2 = np.zeros(melt_rate_field.shape)
+    grid = get_grid()
 
     for i in range(1, len(lats) - 1):
         lat = lats[i]
-        f = 2 * Omega * np.sin(np.deg2rad(lat))  # Coriolis parameter [s^-1]
+        f = grid.f[i]  # Coriolis parameter [s^-1]
 
         progress_percent = 100 * i / (len(lats) - 2)
         logger.info('(M-F) lat = {:.2f}/-40 ({:.1f}%)'.format(lat, progress_percent))
@@ -811,7 +816,7 @@ def make_zonal_and_contour_averaged_plots():
     plt.savefig(png_filepath, dpi=300, format='png', transparent=False, bbox_inches='tight')
 
 
-def plot_meridional_salinity_profiles(time_span, grid_size, field_type, lon, split_depth):
+def plot_meridional_salinity_profiles(time_span, grid_size, field_type, lons, split_depth):
     import os
 
     import matplotlib.pyplot as plt
@@ -821,116 +826,122 @@ def plot_meridional_salinity_profiles(time_span, grid_size, field_type, lon, spl
     from SalinityDataset import SalinityDataset
     from constants import output_dir_path
 
-    image_filepaths = []
+    # Duplicate longitudes would share (and overwrite) their images, so each one is only plotted once.
+    lons = np.unique(lons)
+    image_filepaths = {lon: [] for lon in lons}
 
     for avg_period in ['00', '13', '14', '15', '16']:
         salinity_dataset = SalinityDataset(time_span, avg_period, grid_size, field_type)
-        lats, depths, salinity_profile = salinity_dataset.meridional_salinity_profile(lon=lon, lat_min=-80, lat_max=0)
-
-        time_span_str = time_span
-        if time_span == 'A5B2':
-            time_span_str = '2005-12'
-        elif time_span == '95A4':
-            time_span_str = '1995-2004'
-
-        avg_period_str = avg_period
-        if avg_period == '00':
-            avg_period_str = 'mean'
-        elif avg_period == '13':
-            avg_period_str = 'JFM-seasonal'
-        elif avg_period == '14':
-            avg_period_str = 'AMJ-seasonal'
-        elif avg_period == '15':
-            avg_period_str = 'JAS-seasonal'
-        elif avg_period == '16':
-            avg_period_str = 'OND-seasonal'
-
-        title_str = time_span_str + '-' + avg_period_str + '-lon=' + str(int(lon))
-
-        fig, (ax1, ax2) = plt.subplots(2)
-
-        levels = np.linspace(33.8, 36, 21)
-        idx_split_depth = np.abs(depths - split_depth).argmin()
-
-        im1 = ax1.contourf(lats, depths[:idx_split_depth], salinity_profile[:idx_split_depth, :],
-                             cmap=cmocean.cm.haline, colors=None, vmin=33.8, vmax=36, levels=levels, extend='both')
-        im2 = ax2.contourf(lats, depths[idx_split_depth:], salinity_profile[idx_split_depth:, :],
-                             cmap=cmocean.cm.haline, colors=None, vmin=33.8, vmax=36, levels=levels, extend='both')
-
-        # plt.xticks(list(plt.xticks()[0]) + [split_depth])
-
-        idx_40S = np.nanargmin(np.abs(lats - -40))
-        idx_80S = np.nanargmin(np.abs(lats - -80))
-        idx_min_salinity = np.nanargmin(salinity_profile[0, idx_80S:idx_40S]) + idx_80S
-        lat_min_salinity = lats[idx_min_salinity]
-        ax1.plot([lat_min_salinity, lat_min_salinity], [0, 50], 'red', lw=2)
-        ax1.text(lat_min_salinity + 0.5, 30, '{:.1f}°'.format(lat_min_salinity), fontsize=10, color='red')
-
-        ax1.set_title(title_str, y=1.15, fontsize=12)
-
-        fig.subplots_adjust(left=0.10, bottom=0.20, right=0.95, top=0.9, hspace=0)
-        cbar_ax = fig.add_axes([0.15, 0.1, 0.7, 0.05])
-        clb = fig.colorbar(im1, cax=cbar_ax, extend='both', orientation='horizontal')
-        clb.ax.set_title('salinity (g/kg)', fontsize=12)
-
-        ax1.set_ylim(0, depths[idx_split_depth - 1])
-        ax2.set_ylim(depths[idx_split_depth], 5000)
-        ax1.set_xlim(-75, 0)
-        ax2.set_xlim(-75, 0)
-        ax1.invert_yaxis()
-        ax2.invert_yaxis()
-
-        ax1.spines['bottom'].set_visible(False)
-        ax2.spines['top'].set_visible(False)
-
-        ax2.xaxis.set_tick_params(which='both', bottom=False, labelbottom=False)
-        ax1.xaxis.tick_top()
-        ax1.xaxis.set_major_formatter(FormatStrFormatter('%d°'))
-
-        # plt.subplot_tool()
-        # plt.show()
-
-        png_filename = 'salinity_profile_woa13_' + time_span + '_' + avg_period + '_' + grid_size + '_' + \
-                       'lon' + str(int(lon))
-        png_filepath = os.path.join(output_dir_path, 'salinity_profiles', png_filename + '.png')
-
-        image_filepaths.append(png_filepath)
-
-        dir = os.path.dirname(png_filepath)
-        if not os.path.exists(dir):
-            logger.info('Creating directory: {:s}'.format(dir))
-            os.makedirs(dir)
-
-        logger.info('Saving salinity profile: {:s}'.format(png_filepath))
-        plt.savefig(png_filepath, dpi=300, format='png', transparent=False, bbox_inches='tight')
+        lats, depths, salinity_profiles = salinity_dataset.meridional_salinity_profiles(lons=lons, lat_min=-80,
+                                                                                        lat_max=0)
+
+        for lon, salinity_profile in zip(lons, salinity_profiles):
+            time_span_str = time_span
+            if time_span == 'A5B2':
+                time_span_str = '2005-12'
+            elif time_span == '95A4':
+                time_span_str = '1995-2004'
+
+            avg_period_str = avg_period
+            if avg_period == '00':
+                avg_period_str = 'mean'
+            elif avg_period == '13':
+                avg_period_str = 'JFM-seasonal'
+            elif avg_period == '14':
+                avg_period_str = 'AMJ-seasonal'
+            elif avg_period == '15':
+                avg_period_str = 'JAS-seasonal'
+            elif avg_period == '16':
+                avg_period_str = 'OND-seasonal'
+
+            title_str = time_span_str + '-' + avg_period_str + '-lon=' + str(int(lon))
+
+            fig, (ax1, ax2) = plt.subplots(2)
+
+            levels = np.linspace(33.8, 36, 21)
+            idx_split_depth = np.abs(depths - split_depth).argmin()
+
+            im1 = ax1.contourf(lats, depths[:idx_split_depth], salinity_profile[:idx_split_depth, :],
+                                 cmap=cmocean.cm.haline, colors=None, vmin=33.8, vmax=36, levels=levels, extend='both')
+            im2 = ax2.contourf(lats, depths[idx_split_depth:], salinity_profile[idx_split_depth:, :],
+                                 cmap=cmocean.cm.haline, colors=None, vmin=33.8, vmax=36, levels=levels, extend='both')
+
+            # plt.xticks(list(plt.xticks()[0]) + [split_depth])
+
+            idx_40S = np.nanargmin(np.abs(lats - -40))
+            idx_80S = np.nanargmin(np.abs(lats - -80))
+            idx_min_salinity = np.nanargmin(salinity_profile[0, idx_80S:idx_40S]) + idx_80S
+            lat_min_salinity = lats[idx_min_salinity]
+            ax1.plot([lat_min_salinity, lat_min_salinity], [0, 50], 'red', lw=2)
+            ax1.text(lat_min_salinity + 0.5, 30, '{:.1f}°'.format(lat_min_salinity), fontsize=10, color='red')
+
+            ax1.set_title(title_str, y=1.15, fontsize=12)
+
+            fig.subplots_adjust(left=0.10, bottom=0.20, right=0.95, top=0.9, hspace=0)
+            cbar_ax = fig.add_axes([0.15, 0.1, 0.7, 0.05])
+            clb = fig.colorbar(im1, cax=cbar_ax, extend='both', orientation='horizontal')
+            clb.ax.set_title('salinity (g/kg)', fontsize=12)
+
+            ax1.set_ylim(0, depths[idx_split_depth - 1])
+            ax2.set_ylim(depths[idx_split_depth], 5000)
+            ax1.set_xlim(-75, 0)
+            ax2.set_xlim(-75, 0)
+            ax1.invert_yaxis()
+            ax2.invert_yaxis()
+
+            ax1.spines['bottom'].set_visible(False)
+            ax2.spines['top'].set_visible(False)
+
+            ax2.xaxis.set_tick_params(which='both', bottom=False, labelbottom=False)
+            ax1.xaxis.tick_top()
+            ax1.xaxis.set_major_formatter(FormatStrFormatter('%d°'))
+
+            # plt.subplot_tool()
+            # plt.show()
+
+            png_filename = 'salinity_profile_woa13_' + time_span + '_' + avg_period + '_' + grid_size + '_' + \
+                           'lon' + str(int(lon))
+            png_filepath = os.path.join(output_dir_path, 'salinity_profiles', png_filename + '.png')
+
+            image_filepaths[lon].append(png_filepath)
+
+            dir = os.path.dirname(png_filepath)
+            if not os.path.exists(dir):
+                logger.info('Creating directory: {:s}'.format(dir))
+                os.makedirs(dir)
+
+            logger.info('Saving salinity profile: {:s}'.format(png_filepath))
+            plt.savefig(png_filepath, dpi=300, format='png', transparent=False, bbox_inches='tight')
+            plt.close(fig)
 
     from PIL import Image
 
-    images = []
-    for fp in image_filepaths:
-        images.append(Image.open(fp, 'r'))
+    for lon in lons:
+        images = []
+        for fp in image_filepaths[lon]:
+            images.append(Image.open(fp, 'r'))
 
-    widths, heights = zip(*(i.size for i in images))
+        widths, heights = zip(*(i.size for i in images))
 
-    w = widths[0]
-    h = heights[0]
+        w = widths[0]
+        h = heights[0]
 
-    new_im = Image.new('RGB', (3*w, 2*h), color=(255, 255, 255))
+        new_im = Image.new('RGB', (3*w, 2*h), color=(255, 255, 255))
 
-    new_im.paste(images[1], (0, 0))
-    new_im.paste(images[2], (w, 0))
-    new_im.paste(images[3], (0, h))
-    new_im.paste(images[4], (w, h))
-    new_im.paste(images[0], (2*w, int(np.ceil(0.5*h))))
+        new_im.paste(images[1], (0, 0))
+        new_im.paste(images[2], (w, 0))
+        new_im.paste(images[3], (0, h))
+        new_im.paste(images[4], (w, h))
+        new_im.paste(images[0], (2*w, int(np.ceil(0.5*h))))
 
-    all_filename = 'salinity_profile_woa13_' + time_span + '_all_' + grid_size + '_' + 'lon' + str(int(lon))
-    all_filepath = os.path.join(output_dir_path, 'salinity_profiles', all_filename + '.png')
+        all_filename = 'salinity_profile_woa13_' + time_span + '_all_' + grid_size + '_' + 'lon' + str(int(lon))
+        all_filepath = os.path.join(output_dir_path, 'salinity_profiles', all_filename + '.png')
 
-    logger.info('Saving combined salinity profiles: {:s}'.format(all_filepath))
-    new_im.save(all_filepath)
+        logger.info('Saving combined salinity profiles: {:s}'.format(all_filepath))
+        new_im.save(all_filepath)
 
 
-def plot_meridional_temperature_profiles(time_span, grid_size, field_type, lon, split_depth):
+def plot_meridional_temperature_profiles(time_span, grid_size, field_type, lons, split_depth):
     import os
 
     import matplotlib.pyplot as plt
@@ -940,113 +951,119 @@ def plot_meridional_temperature_profiles(time_span, grid_size, field_type, lon,
     from TemperatureDataset import TemperatureDataset
     from constants import output_dir_path
 
-    image_filepaths = []
+    # Duplicate longitudes would share (and overwrite) their images, so each one is only plotted once.
+    lons = np.unique(lons)
+    image_filepaths = {lon: [] for lon in lons}
 
     for avg_period in ['00', '13', '14', '15', '16']:
         temperature_dataset = TemperatureDataset(time_span, avg_period, grid_size, field_type)
-        lats, depths, temperature_profile = temperature_dataset.meridional_temperature_profile(lon=lon, lat_min=-80, lat_max=0)
-
-        time_span_str = time_span
-        if time_span == 'A5B2':
-            time_span_str = '2005-12'
-        elif time_span == '95A4':
-            time_span_str = '1995-2004'
-
-        avg_period_str = avg_period
-        if avg_period == '00':
-            avg_period_str = 'mean'
-        elif avg_period == '13':
-            avg_period_str = 'JFM-seasonal'
-        elif avg_period == '14':
-            avg_period_str = 'AMJ-seasonal'
-        elif avg_period == '15':
-            avg_period_str = 'JAS-seasonal'
-        elif avg_period == '16':
-            avg_period_str = 'OND-seasonal'
-
-        title_str = time_span_str + '-' + avg_period_str + '-lon=' + str(int(lon))
-
-        fig, (ax1, ax2) = plt.subplots(2)
-
-        idx_split_depth = np.abs(depths - split_depth).argmin()
-
-        im1 = ax1.pcolormesh(lats, depths[:idx_split_depth], temperature_profile[:idx_split_depth, :],
-                             cmap=cmocean.cm.thermal, vmin=-2, vmax=2)
-        im2 = ax2.pcolormesh(lats, depths[idx_split_depth:], temperature_profile[idx_split_depth:, :],
-                             cmap=cmocean.cm.thermal, vmin=-2, vmax=2)
-
-        # idx_40S = np.abs(lats - -40).argmin()
-        # idx_60S = np.abs(lats - -60).argmin()
-        # idx_max_temperature = temperature_profile[0, idx_60S:idx_40S].argmin() + idx_60S
-        # lat_max_temperature = lats[idx_max_temperature]
-        # ax1.plot([lat_max_temperature, lat_max_temperature], [0, 50], 'red', lw=2)
-        # ax1.text(lat_max_temperature + 0.5, 30, '{:.1f}°'.format(lat_max_temperature), fontsize=10, color='red')
-
-        ax1.set_title(title_str, y=1.15, fontsize=12)
-
-        fig.subplots_adjust(left=0.10, bottom=0.20, right=0.95, top=0.9, hspace=0)
-        cbar_ax = fig.add_axes([0.15, 0.1, 0.7, 0.05])
-        clb = fig.colorbar(im1, cax=cbar_ax, extend='both', orientation='horizontal')
-        clb.ax.set_title('temperature (g/kg)', fontsize=12)
-
-        ax1.set_ylim(0, depths[idx_split_depth - 1])
-        ax2.set_ylim(depths[idx_split_depth], 5000)
-        ax1.set_xlim(-70, 0)
-        ax2.set_xlim(-70, 0)
-        ax1.invert_yaxis()
-        ax2.invert_yaxis()
-
-        ax1.spines['bottom'].set_visible(False)
-        ax2.spines['top'].set_visible(False)
-
-        ax2.xaxis.set_tick_params(which='both', bottom=False, labelbottom=False)
-        ax1.xaxis.tick_top()
-        ax1.xaxis.set_major_formatter(FormatStrFormatter('%d°'))
-
-        # plt.subplot_tool()
-        # plt.show()
-
-        png_filename = 'temperature_profile_woa13_' + time_span + '_' + avg_period + '_' + grid_size + '_' + \
-                       'lon' + str(int(lon))
-        png_filepath = os.path.join(output_dir_path, 'temperature_profiles', png_filename + '.png')
-
-        image_filepaths.append(png_filepath)
-
-        dir = os.path.dirname(png_filepath)
-        if not os.path.exists(dir):
-            logger.info('Creating directory: {:s}'.format(dir))
-            os.makedirs(dir)
-
-        logger.info('Saving temperature profile: {:s}'.format(png_filepath))
-        plt.savefig(png_filepath, dpi=300, format='png', transparent=False, bbox_inches='tight')
+        lats, depths, temperature_profiles = temperature_dataset.meridional_temperature_profiles(lons=lons, lat_min=-80,
+                                                                                                 lat_max=0)
+
+        for lon, temperature_profile in zip(lons, temperature_profiles):
+            time_span_str = time_span
+            if time_span == 'A5B2':
+                time_span_str = '2005-12'
+            elif time_span == '95A4':
+                time_span_str = '1995-2004'
+
+            avg_period_str = avg_period
+            if avg_period == '00':
+                avg_period_str = 'mean'
+            elif avg_period == '13':
+                avg_period_str = 'JFM-seasonal'
+            elif avg_period == '14':
+                avg_period_str = 'AMJ-seasonal'
+            elif avg_period == '15':
+                avg_period_str = 'JAS-seasonal'
+            elif avg_period == '16':
+                avg_period_str = 'OND-seasonal'
+
+            title_str = time_span_str + '-' + avg_period_str + '-lon=' + str(int(lon))
+
+            fig, (ax1, ax2) = plt.subplots(2)
+
+            idx_split_depth = np.abs(depths - split_depth).argmin()
+
+            im1 = ax1.pcolormesh(lats, depths[:idx_split_depth], temperature_profile[:idx_split_depth, :],
+                                 cmap=cmocean.cm.thermal, vmin=-2, vmax=2)
+            im2 = ax2.pcolormesh(lats, depths[idx_split_depth:], temperature_profile[idx_split_depth:, :],
+                                 cmap=cmocean.cm.thermal, vmin=-2, vmax=2)
+
+            # idx_40S = np.abs(lats - -40).argmin()
+            # idx_60S = np.abs(lats - -60).argmin()
+            # idx_max_temperature = temperature_profile[0, idx_60S:idx_40S].argmin() + idx_60S
+            # lat_max_temperature = lats[idx_max_temperature]
+            # ax1.plot([lat_max_temperature, lat_max_temperature], [0, 50], 'red', lw=2)
+            # ax1.text(lat_max_temperature + 0.5, 30, '{:.1f}°'.format(lat_max_temperature), fontsize=10, color='red')
+
+            ax1.set_title(title_str, y=1.15, fontsize=12)
+
+            fig.subplots_adjust(left=0.10, bottom=0.20, right=0.95, top=0.9, hspace=0)
+            cbar_ax = fig.add_axes([0.15, 0.1, 0.7, 0.05])
+            clb = fig.colorbar(im1, cax=cbar_ax, extend='both', orientation='horizontal')
+            clb.ax.set_title('temperature (g/kg)', fontsize=12)
+
+            ax1.set_ylim(0, depths[idx_split_depth - 1])
+            ax2.set_ylim(depths[idx_split_depth], 5000)
+            ax1.set_xlim(-70, 0)
+            ax2.set_xlim(-70, 0)
+            ax1.invert_yaxis()
+            ax2.invert_yaxis()
+
+            ax1.spines['bottom'].set_visible(False)
+            ax2.spines['top'].set_visible(False)
+
+            ax2.xaxis.set_tick_params(which='both', bottom=False, labelbottom=False)
+            ax1.xaxis.tick_top()
+            ax1.xaxis.set_major_formatter(FormatStrFormatter('%d°'))
+
+            # plt.subplot_tool()
+            # plt.show()
+
+            png_filename = 'temperature_profile_woa13_' + time_span + '_' + avg_period + '_' + grid_size + '_' + \
+                           'lon' + str(int(lon))
+            png_filepath = os.path.join(output_dir_path, 'temperature_profiles', png_filename + '.png')
+
+            image_filepaths[lon].append(png_filepath)
+
+            dir = os.path.dirname(png_filepath)
+            if not os.path.exists(dir):
+                logger.info('Creating directory: {:s}'.format(dir))
+                os.makedirs(dir)
+
+            logger.info('Saving temperature profile: {:s}'.format(png_filepath))
+            plt.savefig(png_filepath, dpi=300, format='png', transparent=False, bbox_inches='tight')
+            plt.close(fig)
 
     from PIL import Image
 
-    images = []
-    for fp in image_filepaths:
-        images.append(Image.open(fp, 'r'))
+    for lon in lons:
+        images = []
+        for fp in image_filepaths[lon]:
+            images.append(Image.open(fp, 'r'))
 
-    widths, heights = zip(*(i.size for i in images))
+        widths, heights = zip(*(i.size for i in images))
 
-    w = widths[0]
-    h = heights[0]
+        w = widths[0]
+        h = heights[0]
 
-    new_im = Image.new('RGB', (3*w, 2*h), color=(255, 255, 255))
+        new_im = Image.new('RGB', (3*w, 2*h), color=(255, 255, 255))
 
-    new_im.paste(images[1], (0, 0))
-    new_im.paste(images[2], (w, 0))
-    new_im.paste(images[3], (0, h))
-    new_im.paste(images[4], (w, h))
-    new_im.paste(images[0], (2*w, int(np.ceil(0.5*h))))
+        new_im.paste(images[1], (0, 0))
+        new_im.paste(images[2], (w, 0))
+        new_im.paste(images[3], (0, h))
+        new_im.paste(images[4], (w, h))
+        new_im.paste(images[0], (2*w, int(np.ceil(0.5*h))))
 
-    all_filename = 'temperature_profile_woa13_' + time_span + '_all_' + grid_size + '_' + 'lon' + str(int(lon))
-    all_filepath = os.path.join(output_dir_path, 'temperature_profiles', all_filename + '.png')
+        all_filename = 'temperature_profile_woa13_' + time_span + '_all_' + grid_size + '_' + 'lon' + str(int(lon))
+        all_filepath = os.path.join(output_dir_path, 'temperature_profiles', all_filename + '.png')
 
-    logger.info('Saving combined temperature profiles: {:s}'.format(all_filepath))
-    new_im.save(all_filepath)
+        logger.info('Saving combined temperature profiles: {:s}'.format(all_filepath))
+        new_im.save(all_filepath)
 
 
-def plot_meridional_gamma_profiles(time_span, grid_size, field_type, lon, split_depth):
+def plot_meridional_gamma_profiles(time_span, grid_size, field_type, lons, split_depth):
     import os
 
     import matplotlib.pyplot as plt
@@ -1056,96 +1073,101 @@ def plot_meridional_gamma_profiles(time_span, grid_size, field_type, lon, split_
     from NeutralDensityDataset import NeutralDensityDataset
     from constants import output_dir_path
 
-    image_filepaths = []
+    # Duplicate longitudes would share (and overwrite) their images, so each one is only plotted once.
+    lons = np.unique(lons)
+    image_filepaths = {lon: [] for lon in lons}
 
     for avg_period in ['00']:
-        gamma_dataset = NeutralDensityDataset(time_span, avg_period, grid_size, field_type, depth_levels=np.arange(100))
-        lats, depths, gamma_profile = gamma_dataset.meridional_gamma_profile(lon=lon, lat_min=-80, lat_max=-40)
-
-        depths = [0, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65, 70, 75, 80, 85, 90, 95, 100,
-                  125, 150, 175, 200, 225, 250, 275, 300, 325, 350, 375, 400, 425, 450, 475, 500,
-                  550, 600, 650, 700, 750, 800, 850, 900, 950, 1000, 1050, 1100, 1150, 1200, 1250, 1300, 1350, 1400,
-                  1450, 1500, 1550, 1600, 1650, 1700, 1750, 1800, 1850, 1900, 1950, 2000,
-                  2100, 2200, 2300, 2400, 2500, 2600, 2700, 2800, 2900, 3000, 3100, 3200, 3300, 3400, 3500, 3600, 3700,
-                  3800, 3900, 4000, 4100, 4200, 4300, 4400, 4500, 4600, 4700, 4800, 4900, 5000, 5100, 5200, 5300]
-        depths = np.array(depths)
-
-        time_span_str = time_span
-        if time_span == 'A5B2':
-            time_span_str = '2005-12'
-        elif time_span == '95A4':
-            time_span_str = '1995-2004'
-
-        avg_period_str = avg_period
-        if avg_period == '00':
-            avg_period_str = 'mean'
-        elif avg_period == '13':
-            avg_period_str = 'JFM-seasonal'
-        elif avg_period == '14':
-            avg_period_str = 'AMJ-seasonal'
-        elif avg_period == '15':
-            avg_period_str = 'JAS-seasonal'
-        elif avg_period == '16':
-            avg_period_str = 'OND-seasonal'
-
-        title_str = time_span_str + '-' + avg_period_str + '-lon=' + str(int(lon))
-
-        fig, (ax1, ax2) = plt.subplots(2)
-
-        levels = np.linspace(26.6, 28, 21)
-        idx_split_depth = np.abs(depths - split_depth).argmin()
-
-        im1 = ax1.contourf(lats, depths[:idx_split_depth], gamma_profile[:idx_split_depth, :],
-                             cmap=cmocean.cm.dense, colors=None, vmin=26.6, vmax=28, levels=levels, extend='both')
-        im2 = ax2.contourf(lats, depths[idx_split_depth:], gamma_profile[idx_split_depth:, :],
-                             cmap=cmocean.cm.dense, colors=None, vmin=26.6, vmax=28, levels=levels, extend='both')
-
-        # plt.xticks(list(plt.xticks()[0]) + [split_depth])
-
-        idx_40S = np.nanargmin(np.abs(lats - -40))
-        idx_80S = np.nanargmin(np.abs(lats - -80))
-        idx_min_gamma = np.nanargmax(gamma_profile[0, idx_80S:idx_40S]) + idx_80S
-        lat_min_gamma = lats[idx_min_gamma]
-        ax1.plot([lat_min_gamma, lat_min_gamma], [0, 50], 'red', lw=2)
-        ax1.text(lat_min_gamma + 0.5, 30, '{:.1f}°'.format(lat_min_gamma), fontsize=10, color='red')
-
-        ax1.set_title(title_str, y=1.15, fontsize=12)
-
-        fig.subplots_adjust(left=0.10, bottom=0.20, right=0.95, top=0.9, hspace=0)
-        cbar_ax = fig.add_axes([0.15, 0.1, 0.7, 0.05])
-        clb = fig.colorbar(im1, cax=cbar_ax, extend='both', orientation='horizontal')
-        clb.ax.set_title('gamma_n (kg/m$^3$)', fontsize=12)
-
-        ax1.set_ylim(0, depths[idx_split_depth - 1])
-        ax2.set_ylim(depths[idx_split_depth], 5000)
-        ax1.set_xlim(-75, -40)
-        ax2.set_xlim(-75, -40)
-        ax1.invert_yaxis()
-        ax2.invert_yaxis()
-
-        ax1.spines['bottom'].set_visible(False)
-        ax2.spines['top'].set_visible(False)
-
-        ax2.xaxis.set_tick_params(which='both', bottom=False, labelbottom=False)
-        ax1.xaxis.tick_top()
-        ax1.xaxis.set_major_formatter(FormatStrFormatter('%d°'))
-
-        # plt.subplot_tool()
-        # plt.show()
-
-        png_filename = 'gamma_profile_woa13_' + time_span + '_' + avg_period + '_' + grid_size + '_' + \
-                       'lon' + str(int(lon))
-        png_filepath = os.path.join(output_dir_path, 'gamma_profiles', png_filename + '.png')
-
-        image_filepaths.append(png_filepath)
-
-        dir = os.path.dirname(png_filepath)
-        if not os.path.exists(dir):
-            logger.info('Creating directory: {:s}'.format(dir))
-            os.makedirs(dir)
-
-        logger.info('Saving gamma profile: {:s}'.format(png_filepath))
-        plt.savefig(png_filepath, dpi=300, format='png', transparent=False, bbox_inches='tight')
+        gamma_dataset = NeutralDensityDataset(time_span, avg_period, grid_size, field_type, depth_levels=np.arange(100),
+                                              load_fields=False)
+        lats, _, gamma_profiles = gamma_dataset.meridional_gamma_profiles(lons=lons, lat_min=-80, lat_max=-40)
+
+        for lon, gamma_profile in zip(lons, gamma_profiles):
+            depths = [0, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65, 70, 75, 80, 85, 90, 95, 100,
+                      125, 150, 175, 200, 225, 250, 275, 300, 325, 350, 375, 400, 425, 450, 475, 500,
+                      550, 600, 650, 700, 750, 800, 850, 900, 950, 1000, 1050, 1100, 1150, 1200, 1250, 1300, 1350, 1400,
+                      1450, 1500, 1550, 1600, 1650, 1700, 1750, 1800, 1850, 1900, 1950, 2000,
+                      2100, 2200, 2300, 2400, 2500, 2600, 2700, 2800, 2900, 3000, 3100, 3200, 3300, 3400, 3500, 3600,
+                      3700, 3800, 3900, 4000, 4100, 4200, 4300, 4400, 4500, 4600, 4700, 4800, 4900, 5000, 5100, 5200, 5300]
+            depths = np.array(depths)
+
+            time_span_str = time_span
+            if time_span == 'A5B2':
+                time_span_str = '2005-12'
+            elif time_span == '95A4':
+                time_span_str = '1995-2004'
+
+            avg_period_str = avg_period
+            if avg_period == '00':
+                avg_period_str = 'mean'
+            elif avg_period == '13':
+                avg_period_str = 'JFM-seasonal'
+            elif avg_period == '14':
+                avg_period_str = 'AMJ-seasonal'
+            elif avg_period == '15':
+                avg_period_str = 'JAS-seasonal'
+            elif avg_period == '16':
+                avg_period_str = 'OND-seasonal'
+
+            title_str = time_span_str + '-' + avg_period_str + '-lon=' + str(int(lon))
+
+            fig, (ax1, ax2) = plt.subplots(2)
+
+            levels = np.linspace(26.6, 28, 21)
+            idx_split_depth = np.abs(depths - split_depth).argmin()
+
+            im1 = ax1.contourf(lats, depths[:idx_split_depth], gamma_profile[:idx_split_depth, :],
+                                 cmap=cmocean.cm.dense, colors=None, vmin=26.6, vmax=28, levels=levels, extend='both')
+            im2 = ax2.contourf(lats, depths[idx_split_depth:], gamma_profile[idx_split_depth:, :],
+                                 cmap=cmocean.cm.dense, colors=None, vmin=26.6, vmax=28, levels=levels, extend='both')
+
+            # plt.xticks(list(plt.xticks()[0]) + [split_depth])
+
+            idx_40S = np.nanargmin(np.abs(lats - -40))
+            idx_80S = np.nanargmin(np.abs(lats - -80))
+            idx_min_gamma = np.nanargmax(gamma_profile[0, idx_80S:idx_40S]) + idx_80S
+            lat_min_gamma = lats[idx_min_gamma]
+            ax1.plot([lat_min_gamma, lat_min_gamma], [0, 50], 'red', lw=2)
+            ax1.text(lat_min_gamma + 0.5, 30, '{:.1f}°'.format(lat_min_gamma), fontsize=10, color='red')
+
+            ax1.set_title(title_str, y=1.15, fontsize=12)
+
+            fig.subplots_adjust(left=0.10, bottom=0.20, right=0.95, top=0.9, hspace=0)
+            cbar_ax = fig.add_axes([0.15, 0.1, 0.7, 0.05])
+            clb = fig.colorbar(im1, cax=cbar_ax, extend='both', orientation='horizontal')
+            clb.ax.set_title('gamma_n (kg/m$^3$)', fontsize=12)
+
+            ax1.set_ylim(0, depths[idx_split_depth - 1])
+            ax2.set_ylim(depths[idx_split_depth], 5000)
+            ax1.set_xlim(-75, -40)
+            ax2.set_xlim(-75, -40)
+            ax1.invert_yaxis()
+            ax2.invert_yaxis()
+
+            ax1.spines['bottom'].set_visible(False)
+            ax2.spines['top'].set_visible(False)
+
+            ax2.xaxis.set_tick_params(which='both', bottom=False, labelbottom=False)
+            ax1.xaxis.tick_top()
+            ax1.xaxis.set_major_formatter(FormatStrFormatter('%d°'))
+
+            # plt.subplot_tool()
+            # plt.show()
+
+            png_filename = 'gamma_profile_woa13_' + time_span + '_' + avg_period + '_' + grid_size + '_' + \
+                           'lon' + str(int(lon))
+            png_filepath = os.path.join(output_dir_path, 'gamma_profiles', png_filename + '.png')
+
+            image_filepaths[lon].append(png_filepath)
+
+            dir = os.path.dirname(png_filepath)
+            if not os.path.exists(dir):
+                logger.info('Creating directory: {:s}'.format(dir))
+                os.makedirs(dir)
+
+            logger.info('Saving gamma profile: {:s}'.format(png_filepath))
+            plt.savefig(png_filepath, dpi=300, format='png', transparent=False, bbox_inches='tight')
+            plt.close(fig)
 
     # from PIL import Image
     #
@@ -3146,9 +3168,6 @@ def plot_Weddell_Gyre_time_series():
     lat1_WGR, lat2_WGR = -68, -55
     lon1_WGR, lon2_WGR = -60, 30
 
-    lat1_idx_WGR, lat2_idx_WGR = 48, 101
-    lon1_idx_WGR, lon2_idx_WGR = 480, 841
-
     year_start = 2011
     year_end = 2015
     dates = date_range(datetime.date(year_start, 1, 1), datetime.date(year_end, 12, 31))
@@ -3166,33 +3185,16 @@ def plot_Weddell_Gyre_time_series():
     except OSError:
         logger.info('Computing Weddell Gyre Region (WGR) time series...')
 
-    if pickle_found:
-        alpha_WGR = WGR_time_series_dict['alpha']
-        u_wind_WGR = WGR_time_series_dict['u_wind']
-        v_wind_WGR = WGR_time_series_dict['v_wind']
-        wind_speed_WGR = WGR_time_series_dict['wind_speed']
-        u_ice_WGR = WGR_time_series_dict['u_ice']
-        v_ice_WGR = WGR_time_series_dict['v_ice']
-        ice_speed_WGR = WGR_time_series_dict['ice_speed']
-        u_geo_WGR = WGR_time_series_dict['u_geo']
-        v_geo_WGR = WGR_time_series_dict['v_geo']
-        geo_speed_WGR = WGR_time_series_dict['geo_speed']
-        w_Ekman_WGR = WGR_time_series_dict['w_Ekman']
-        w_Ekman_geo_WGR = WGR_time_series_dict['w_Ekman_geo']
+    if not pickle_found:
+        from RegionalStatistics import RegionalStatistics
+        from smoothing import smooth, box_kernel_1d
 
-    else:
-        alpha_WGR = np.zeros(n_days)
-        u_wind_WGR = np.zeros(n_days)
-        v_wind_WGR = np.zeros(n_days)
-        wind_speed_WGR = np.zeros(n_days)
-        u_ice_WGR = np.zeros(n_days)
-        v_ice_WGR = np.zeros(n_days)
-        ice_speed_WGR = np.zeros(n_days)
-        u_geo_WGR = np.zeros(n_days)
-        v_geo_WGR = np.zeros(n_days)
-        geo_speed_WGR = np.zeros(n_days)
-        w_Ekman_WGR = np.zeros(n_days)
-        w_Ekman_geo_WGR = np.zeros(n_days)
+        regions = RegionalStatistics()
+        regions.add_box('WGR', lat1_WGR, lat2_WGR, lon1_WGR, lon2_WGR)
+
+        WGR_time_series_dict = {var_name: np.zeros(n_days) for var_name in
+                                ['alpha', 'u_wind', 'v_wind', 'wind_speed', 'u_ice', 'v_ice', 'ice_speed', 'u_geo',
+                                 'v_geo', 'geo_speed', 'w_Ekman', 'w_Ekman_geo']}
 
         for d, date in enumerate(dates):
             tau_filepath = get_netCDF_filepath(field_type='daily', date=date)
@@ -3221,59 +3223,40 @@ def plot_Weddell_Gyre_time_series():
 
             logger.info('Averaging {:%b %d, %Y} ({:s})...'.format(date, tau_filepath))
 
-            lats = np.array(tau_dataset.variables['lat'])[lat1_idx_WGR:lat2_idx_WGR]
-            lons = np.array(tau_dataset.variables['lon'])[lon1_idx_WGR:lon2_idx_WGR]
-
-            alpha_field = np.array(tau_dataset.variables['alpha'])[lat1_idx_WGR:lat2_idx_WGR, lon1_idx_WGR:lon2_idx_WGR]
-            u_wind_field = np.array(tau_dataset.variables['wind_u'])[lat1_idx_WGR:lat2_idx_WGR, lon1_idx_WGR:lon2_idx_WGR]
-            v_wind_field = np.array(tau_dataset.variables['wind_v'])[lat1_idx_WGR:lat2_idx_WGR, lon1_idx_WGR:lon2_idx_WGR]
-            u_ice_field = np.array(tau_dataset.variables['ice_u'])[lat1_idx_WGR:lat2_idx_WGR, lon1_idx_WGR:lon2_idx_WGR]
-            v_ice_field = np.array(tau_dataset.variables['ice_v'])[lat1_idx_WGR:lat2_idx_WGR, lon1_idx_WGR:lon2_idx_WGR]
-            u_geo_field = np.array(tau_dataset.variables['geo_u'])[lat1_idx_WGR:lat2_idx_WGR, lon1_idx_WGR:lon2_idx_WGR]
-            v_geo_field = np.array(tau_dataset.variables['geo_v'])[lat1_idx_WGR:lat2_idx_WGR, lon1_idx_WGR:lon2_idx_WGR]
-            w_Ekman_geo_field = np.array(tau_dataset.variables['Ekman_w'])[lat1_idx_WGR:lat2_idx_WGR, lon1_idx_WGR:lon2_idx_WGR]
-
-            w_Ekman_field = w_Ekman_field[lat1_idx_WGR:lat2_idx_WGR, lon1_idx_WGR:lon2_idx_WGR]
-
-            import astropy.convolution
-            kernel = astropy.convolution.Box2DKernel(10)
-            # kernel = astropy.convolution.Gaussian2DKernel(2)
-            w_Ekman_geo_field = astropy.convolution.convolve(w_Ekman_geo_field, kernel, boundary='wrap')
-
-            alpha_WGR[d] = np.nanmean(alpha_field)
-            u_wind_WGR[d] = np.nanmean(u_wind_field)
-            v_wind_WGR[d] = np.nanmean(v_wind_field)
-            u_ice_WGR[d] = np.nanmean(u_ice_field)
-            v_ice_WGR[d] = np.nanmean(v_ice_field)
-            u_geo_WGR[d] = np.nanmean(u_geo_field)
-            v_geo_WGR[d] = np.nanmean(v_geo_field)
-            w_Ekman_WGR[d] = np.nanmean(w_Ekman_field)
-            w_Ekman_geo_WGR[d] = np.nanmean(w_Ekman_geo_field)
-
-            wind_speed_field = np.zeros(alpha_field.shape)
-            ice_speed_field = np.zeros(alpha_field.shape)
-            geo_speed_field = np.zeros(alpha_field.shape)
-
-            for i, lat in enumerate(lats):
-                for j, lon in enumerate(lons):
-                    if not np.isnan(u_wind_field[i][j]) and not np.isnan(v_wind_field[i][j]):
-                        wind_speed_field[i][j] = np.sqrt(u_wind_field[i][j]**2 + v_wind_field[i][j]**2)
-                    else:
-                        wind_speed_field[i][j] = np.nan
-
-                    if not np.isnan(u_ice_field[i][j]) and not np.isnan(v_ice_field[i][j]):
-                        ice_speed_field[i][j] = np.sqrt(u_ice_field[i][j]**2 + v_ice_field[i][j]**2)
-                    else:
-                        ice_speed_field[i][j] = np.nan
-
-                    if not np.isnan(u_geo_field[i][j]) and not np.isnan(v_geo_field[i][j]):
-                        geo_speed_field[i][j] = np.sqrt(u_geo_field[i][j]**2 + v_geo_field[i][j]**2)
-                    else:
-                        geo_speed_field[i][j] = np.nan
-
-            wind_speed_WGR[d] = np.nanmean(wind_speed_field)
-            ice_speed_WGR[d] = np.nanmean(ice_speed_field)
-            geo_speed_WGR[d] = np.nanmean(geo_speed_field)
+            fields = {
+                'alpha': np.array(tau_dataset.variables['alpha']),
+                'u_wind': np.array(tau_dataset.variables['wind_u']),
+                'v_wind': np.array(tau_dataset.variables['wind_v']),
+                'u_ice': np.array(tau_dataset.variables['ice_u']),
+                'v_ice': np.array(tau_dataset.variables['ice_v']),
+                'u_geo': np.array(tau_dataset.variables['geo_u']),
+                'v_geo': np.array(tau_dataset.variables['geo_v']),
+                'w_Ekman': w_Ekman_field,
+                'w_Ekman_geo': smooth(np.array(tau_dataset.variables['Ekman_w']), box_kernel_1d(10))
+                # 'w_Ekman_geo': smooth(np.array(tau_dataset.variables['Ekman_w']), gaussian_kernel_1d(2))
+            }
+            tau_dataset.close()
+
+            fields['wind_speed'] = np.hypot(fields['u_wind'], fields['v_wind'])
+            fields['ice_speed'] = np.hypot(fields['u_ice'], fields['v_ice'])
+            fields['geo_speed'] = np.hypot(fields['u_geo'], fields['v_geo'])
+
+            # Area-weighted means over the region, all fields at once.
+            for var_name, WGR_mean in regions.means(fields)['WGR'].items():
+                WGR_time_series_dict[var_name][d] = WGR_mean
+
+    alpha_WGR = WGR_time_series_dict['alpha']
+    u_wind_WGR = WGR_time_series_dict['u_wind']
+    v_wind_WGR = WGR_time_series_dict['v_wind']
+    wind_speed_WGR = WGR_time_series_dict['wind_speed']
+    u_ice_WGR = WGR_time_series_dict['u_ice']
+    v_ice_WGR = WGR_time_series_dict['v_ice']
+    ice_speed_WGR = WGR_time_series_dict['ice_speed']
+    u_geo_WGR = WGR_time_series_dict['u_geo']
+    v_geo_WGR = WGR_time_series_dict['v_geo']
+    geo_speed_WGR = WGR_time_series_dict['geo_speed']
+    w_Ekman_WGR = WGR_time_series_dict['w_Ekman']
+    w_Ekman_geo_WGR = WGR_time_series_dict['w_Ekman_geo']
 
     with open(pickle_filepath, 'wb') as f:
         WGR_time_series_dict = {
@@ -3987,7 +3970,8 @@ def plot_ice_ocean_pumping():
 def antarctic_divergence_time_series():
     import pickle
     import constants
-    from utils import get_northward_zero_zonal_stress_line, get_northward_ice_edge, get_coast_coordinates
+    from utils import get_fields_from_netcdf
+    from RegionalStatistics import RegionalStatistics
 
     nogeo_output_dir_path = 'E:\\output\\'
     geo_output_dir_path = 'C:\\Users\\Ali\\Downloads\\output\\'
@@ -3997,32 +3981,9 @@ def antarctic_divergence_time_series():
     climo_nogeo_filepath = get_netCDF_filepath(field_type='seasonal_climo', season_str='JAS',
                                                year_start=2005, year_end=2015)
 
-    lons, lats, tau_x_nogeo_field = get_field_from_netcdf(climo_nogeo_filepath, 'tau_x')
-
-    contour_coordinates = np.empty((len(lats), len(lons)))
-    contour_coordinates[:] = np.nan
-
-    tau_x_lons, tau_x_lats = get_northward_zero_zonal_stress_line(climo_nogeo_filepath)
-    alpha_lons, alpha_lats = get_northward_ice_edge(climo_nogeo_filepath)
-    coast_lons, coast_lats = get_coast_coordinates(climo_nogeo_filepath)
-
-    for i, lon in enumerate(lons):
-        if alpha_lats[i] > tau_x_lats[i] > coast_lats[i]:
-            lat_0 = coast_lats[i]
-            lat_h = tau_x_lats[i]  # lat_h is short for lat_half ~ lat_1/2
-            lat_1 = alpha_lats[i]
-
-            for j, lat in enumerate(lats):
-                if lat < lat_0 or lat > lat_1:
-                    contour_coordinates[j][i] = np.nan
-                elif lat_0 <= lat <= lat_h:
-                    contour_coordinates[j][i] = (lat - lat_0) / (2 * (lat_h - lat_0))
-                elif lat_h <= lat <= lat_1:
-                    contour_coordinates[j][i] = 0.5 + ((lat - lat_h) / (2 * (lat_1 - lat_h)))
-
-    c_bins = np.linspace(0, 1, 41)[:-1]
-    delta_c = c_bins[1] - c_bins[0]
-    c_bins = c_bins + (delta_c / 2)
+    # South of the Antarctic Divergence: between the coast and the zero zonal stress line.
+    regions = RegionalStatistics()
+    regions.add_streamwise_band('south_of_AD', climo_nogeo_filepath, 0, 0.5)
 
     year_start = 2011
     year_end = 2015
@@ -4041,47 +4002,13 @@ def antarctic_divergence_time_series():
     except OSError:
         logger.info('Computing Antarctic Divergence time series...')
 
-    if pickle_found:
-        alpha_AD = AD_time_series_dict['alpha']
-        u_wind_AD = AD_time_series_dict['u_wind']
-        v_wind_AD = AD_time_series_dict['v_wind']
-        wind_speed_AD = AD_time_series_dict['wind_speed']
-        u_ice_AD = AD_time_series_dict['u_ice']
-        v_ice_AD = AD_time_series_dict['v_ice']
-        ice_speed_AD = AD_time_series_dict['ice_speed']
-        u_geo_AD = AD_time_series_dict['u_geo']
-        v_geo_AD = AD_time_series_dict['v_geo']
-        geo_speed_AD = AD_time_series_dict['geo_speed']
-        w_a_AD = AD_time_series_dict['w_a']
-        w_A_AD = AD_time_series_dict['w_A']
-        w_Ek_nogeo_AD = AD_time_series_dict['w_Ek_nogeo']
-        w_Ek_geo_AD = AD_time_series_dict['w_Ek_geo']
-        w_ig_AD = AD_time_series_dict['w_ig']
-        w_i_AD = AD_time_series_dict['w_i']
-        w_i0_AD = AD_time_series_dict['w_i0']
+    geo_var_names = {'alpha': 'alpha', 'u_wind': 'wind_u', 'v_wind': 'wind_v', 'u_ice': 'ice_u', 'v_ice': 'ice_v',
+                     'u_geo': 'geo_u', 'v_geo': 'geo_v'}
+    govenor_var_names = ['w_a', 'w_A', 'w_Ek_geo', 'w_Ek_nogeo', 'w_i', 'w_i0', 'w_ig']
 
-    else:
-        alpha_AD = np.zeros(n_days)
-
-        u_wind_AD = np.zeros(n_days)
-        v_wind_AD = np.zeros(n_days)
-        wind_speed_AD = np.zeros(n_days)
-
-        u_ice_AD = np.zeros(n_days)
-        v_ice_AD = np.zeros(n_days)
-        ice_speed_AD = np.zeros(n_days)
-
-        u_geo_AD = np.zeros(n_days)
-        v_geo_AD = np.zeros(n_days)
-        geo_speed_AD = np.zeros(n_days)
-
-        w_a_AD = np.zeros(n_days)
-        w_A_AD = np.zeros(n_days)
-        w_Ek_nogeo_AD = np.zeros(n_days)
-        w_Ek_geo_AD = np.zeros(n_days)
-        w_ig_AD = np.zeros(n_days)
-        w_i_AD = np.zeros(n_days)
-        w_i0_AD = np.zeros(n_days)
+    if not pickle_found:
+        AD_var_names = list(geo_var_names.keys()) + ['wind_speed', 'ice_speed', 'geo_speed'] + govenor_var_names
+        AD_time_series_dict = {var_name: np.zeros(n_days) for var_name in AD_var_names}
 
         for d, date in enumerate(dates):
             constants.output_dir_path = nogeo_output_dir_path
@@ -4097,75 +4024,52 @@ def antarctic_divergence_time_series():
 
             constants.output_dir_path = geo_output_dir_path
 
-            try:
-                climo_filepath_geo = get_netCDF_filepath(field_type='daily', date=date)
-                _, _, _ = get_field_from_netcdf(climo_filepath_geo, 'Ekman_w')
-            except OSError as e:
-                logger.error('{}'.format(e))
+            climo_filepath_geo = get_netCDF_filepath(field_type='daily', date=date)
+            geo_dataset = get_fields_from_netcdf(climo_filepath_geo, list(geo_var_names.values()))
+            if geo_dataset is None:
                 logger.warning('{:s} not found. Proceeding without it...'.format(climo_filepath_geo))
                 n_days = n_days - 1  # Must account for lost day if no data available for that day.
                 continue
 
-            try:
-                govenor_filename = "ice_ocean_govenor_{:}.nc".format(date)
-                govenor_filepath = os.path.join(govenor_output_dir_path, govenor_filename)
-                _, _, _ = get_field_from_netcdf(govenor_filepath, 'alpha')
-            except OSError as e:
-                logger.error('{}'.format(e))
-                logger.warning('{:s} not found. Proceeding without it...'.format(climo_filepath_geo))
+            govenor_filename = "ice_ocean_govenor_{:}.nc".format(date)
+            govenor_filepath = os.path.join(govenor_output_dir_path, govenor_filename)
+            govenor_dataset = get_fields_from_netcdf(govenor_filepath, govenor_var_names)
+            if govenor_dataset is None:
+                logger.warning('{:s} not found. Proceeding without it...'.format(govenor_filepath))
                 n_days = n_days - 1  # Must account for lost day if no data available for that day.
                 continue
 
             logger.info('Averaging {:%b %d, %Y}...'.format(date))
 
-            alpha_field = get_field_from_netcdf(climo_filepath_geo, 'alpha')[2]
-
-            u_wind_field = get_field_from_netcdf(climo_filepath_geo, 'wind_u')[2]
-            v_wind_field = get_field_from_netcdf(climo_filepath_geo, 'wind_v')[2]
-            wind_speed_field = np.sqrt(u_wind_field*u_wind_field + v_wind_field*v_wind_field)
-
-            u_ice_field = get_field_from_netcdf(climo_filepath_geo, 'ice_u')[2]
-            v_ice_field = get_field_from_netcdf(climo_filepath_geo, 'ice_v')[2]
-            ice_speed_field = np.sqrt(u_ice_field*u_ice_field + v_ice_field*v_ice_field)
-
-            u_geo_field = get_field_from_netcdf(climo_filepath_geo, 'geo_u')[2]
-            v_geo_field = get_field_from_netcdf(climo_filepath_geo, 'geo_v')[2]
-            geo_speed_field = np.sqrt(u_geo_field*u_geo_field + v_geo_field*v_geo_field)
-
-            w_a_field = get_field_from_netcdf(govenor_filepath, 'w_a')[2]
-            w_A_field = get_field_from_netcdf(govenor_filepath, 'w_A')[2]
-            w_Ek_geo_field = get_field_from_netcdf(govenor_filepath, 'w_Ek_geo')[2]
-            w_Ek_nogeo_field = get_field_from_netcdf(govenor_filepath, 'w_Ek_nogeo')[2]
-            w_i_field = get_field_from_netcdf(govenor_filepath, 'w_i')[2]
-            w_i0_field = get_field_from_netcdf(govenor_filepath, 'w_i0')[2]
-            w_ig_field = get_field_from_netcdf(govenor_filepath, 'w_ig')[2]
-
-            import astropy.convolution
-            kernel = astropy.convolution.Box2DKernel(4)
-
-            c_south_of_AD = np.logical_and(contour_coordinates >= 0, contour_coordinates < 0.5)
-
-            alpha_AD[d] = np.nanmean(alpha_field[c_south_of_AD])
-
-            u_wind_AD[d] = np.nanmean(u_wind_field[c_south_of_AD])
-            v_wind_AD[d] = np.nanmean(v_wind_field[c_south_of_AD])
-            wind_speed_AD[d] = np.nanmean(wind_speed_field[c_south_of_AD])
-
-            u_ice_AD[d] = np.nanmean(u_ice_field[c_south_of_AD])
-            v_ice_AD[d] = np.nanmean(v_ice_field[c_south_of_AD])
-            ice_speed_AD[d] = np.nanmean(ice_speed_field[c_south_of_AD])
-
-            u_geo_AD[d] = np.nanmean(u_geo_field[c_south_of_AD])
-            v_geo_AD[d] = np.nanmean(v_geo_field[c_south_of_AD])
-            geo_speed_AD[d] = np.nanmean(geo_speed_field[c_south_of_AD])
-
-            w_a_AD[d] = np.nanmean(w_a_field[c_south_of_AD])
-            w_A_AD[d] = np.nanmean(w_A_field[c_south_of_AD])
-            w_Ek_geo_AD[d] = np.nanmean(w_Ek_geo_field[c_south_of_AD])
-            w_Ek_nogeo_AD[d] = np.nanmean(w_Ek_nogeo_field[c_south_of_AD])
-            w_i_AD[d] = np.nanmean(w_i_field[c_south_of_AD])
-            w_i0_AD[d] = np.nanmean(w_i0_field[c_south_of_AD])
-            w_ig_AD[d] = np.nanmean(w_ig_field[c_south_of_AD])
+            fields = govenor_dataset[2]
+            for var_name, nc_var_name in geo_var_names.items():
+                fields[var_name] = geo_dataset[2][nc_var_name]
+
+            fields['wind_speed'] = np.hypot(fields['u_wind'], fields['v_wind'])
+            fields['ice_speed'] = np.hypot(fields['u_ice'], fields['v_ice'])
+            fields['geo_speed'] = np.hypot(fields['u_geo'], fields['v_geo'])
+
+            # Area-weighted means over the region, all fields at once.
+            for var_name, AD_mean in regions.means(fields)['south_of_AD'].items():
+                AD_time_series_dict[var_name][d] = AD_mean
+
+    alpha_AD = AD_time_series_dict['alpha']
+    u_wind_AD = AD_time_series_dict['u_wind']
+    v_wind_AD = AD_time_series_dict['v_wind']
+    wind_speed_AD = AD_time_series_dict['wind_speed']
+    u_ice_AD = AD_time_series_dict['u_ice']
+    v_ice_AD = AD_time_series_dict['v_ice']
+    ice_speed_AD = AD_time_series_dict['ice_speed']
+    u_geo_AD = AD_time_series_dict['u_geo']
+    v_geo_AD = AD_time_series_dict['v_geo']
+    geo_speed_AD = AD_time_series_dict['geo_speed']
+    w_a_AD = AD_time_series_dict['w_a']
+    w_A_AD = AD_time_series_dict['w_A']
+    w_Ek_nogeo_AD = AD_time_series_dict['w_Ek_nogeo']
+    w_Ek_geo_AD = AD_time_series_dict['w_Ek_geo']
+    w_ig_AD = AD_time_series_dict['w_ig']
+    w_i_AD = AD_time_series_dict['w_i']
+    w_i0_AD = AD_time_series_dict['w_i0']
 
     with open(pickle_filepath, 'wb') as f:
         AD_time_series_dict = {
@@ -4555,21 +4459,18 @@ if __name__ == '__main__':
     # make_melt_rate_diagnostic_fig()
     # make_zonal_and_contour_averaged_plots()
 
-    # plot_meridional_salinity_profiles(time_span='A5B2', grid_size='04', field_type='an', lon=-135, split_depth=250)
-    # plot_meridional_salinity_profiles(time_span='A5B2', grid_size='04', field_type='an', lon=-30, split_depth=250)
-    # plot_meridional_salinity_profiles(time_span='A5B2', grid_size='04', field_type='an', lon=75, split_depth=250)
+    # plot_meridional_salinity_profiles(time_span='A5B2', grid_size='04', field_type='an', lons=[-135, -30, 75],
+    #                                     split_depth=250)
 
-    # plot_meridional_temperature_profiles(time_span='A5B2', grid_size='04', field_type='an', lon=-135, split_depth=500)
-    # plot_meridional_temperature_profiles(time_span='A5B2', grid_size='04', field_type='an', lon=-30, split_depth=500)
-    # plot_meridional_temperature_profiles(time_span='A5B2', grid_size='04', field_type='an', lon=75, split_depth=500)
+    # plot_meridional_temperature_profiles(time_span='A5B2', grid_size='04', field_type='an', lons=[-135, -30, 75],
+    #                                        split_depth=500)
 
     # look_at_neutral_density_contours(2005, 2012)
     # look_at_neutral_density_contours(2014, 2015)
     # look_at_neutral_density_contours(1992, 1993)
     #
-    # plot_meridional_gamma_profiles(time_span='A5B2', grid_size='04', field_type='an', lon=-135, split_depth=250)
-    # plot_meridional_gamma_profiles(time_span='A5B2', grid_size='04', field_type='an', lon=-30, split_depth=250)
-    # plot_meridional_gamma_profiles(time_span='A5B2', grid_size='04', field_type='an', lon=75, split_depth=250)
+    # plot_meridional_gamma_profiles(time_span='A5B2', grid_size='04', field_type='an', lons=[-135, -30, 75],
+    #                                  split_depth=250)
 
     # make_figure1()
     # make_tau_climo_fig()
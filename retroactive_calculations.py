@@ -14,7 +14,8 @@ logger = logging.getLogger(__name__)
 
 from SeaIceThicknessDataset import SeaIceThicknessDataset
 from constants import output_dir_path, data_dir_path, C_fw
-from utils import date_range, distance, log_netCDF_dataset_metadata, get_netCDF_filepath
+from Grid import get_grid
+from utils import date_range, log_netCDF_dataset_metadata, get_netCDF_filepath
 
 np.set_printoptions(precision=4)
 
@@ -101,9 +102,7 @@ def retroactively_compute_sea_ice_advection():
         div2_daily_field = np.zeros((len(lats), len(lons)))
 
         # Load h_ice field for the day (i.e. the correct seasonal field).
-        for i in range(len(lats)):
-            for j in range(len(lons)):
-                h_ice_daily_field[i][j] = h_ice_dataset.sea_ice_thickness(i, j, date)
+        h_ice_daily_field[:] = h_ice_dataset.sea_ice_thickness_field(date)
 
         # import astropy.convolution
         # kernel = astropy.convolution.Box2DKernel(10)
@@ -114,14 +113,15 @@ def retroactively_compute_sea_ice_advection():
 
         i_max = len(lats) - 1
         j_max = len(lons) - 1
+        grid = get_grid()
 
         for i in range(1, len(lats) - 1):
             # lat = lats[i]
             # progress_percent = 100 * i / (len(lats) - 2)
             # logger.info('({:}, ice_div) lat = {:.2f}/{:.2f} ({:.1f}%)'.format(date, lat, -40, progress_percent))
 
-            dx = distance(lats[i-1], lons[0], lats[i+1], lons[0])
-            dy = distance(lats[i], lons[0], lats[i], lons[2])
+            dx = grid.dx[i]
+            dy = grid.dy[i]
 
             for j in range(1, len(lons) - 1):
                 # Taking modulus of j-1 and j+1 to get the correct index in the special cases of
@@ -464,20 +464,19 @@ def retroactively_compute_melting_freezing_rate():
         salinity_interp_daily_field[:] = np.nan
 
         # Load h_ice field for the day (i.e. the correct seasonal field).
-        for i in range(len(lats)):
-            for j in range(len(lons)):
-                h_ice_daily_field[i][j] = h_ice_dataset.sea_ice_thickness(i, j, date)
+        h_ice_daily_field[:] = h_ice_dataset.sea_ice_thickness_field(date)
 
         i_max = len(lats) - 1
         j_max = len(lons) - 1
+        grid = get_grid()
 
         for i in range(1, len(lats) - 1):
             lat = lats[i]
             # progress_percent = 100 * i / (len(lats) - 2)
             # logger.info('({:}, ice_div) lat = {:.2f}/{:.2f} ({:.1f}%)'.format(date, lat, -40, progress_percent))
 
-            dx = distance(lats[i-1], lons[0], lats[i+1], lons[0])
-            dy = distance(lats[i], lons[0], lats[i], lons[2])
+            dx = grid.dx[i]
+            dy = grid.dy[i]
 
             for j in range(len(lons)):
                 lon = lons[j]
@@ -0,0 +1,121 @@
+"""
+Running means of daily fields over several window lengths at once (e.g. 7, 30 and 90 days), reading each daily file
+only once:
+
+    for date, means in rolling_means(read_daily_record(dates, ['tau_x', 'Ekman_w', 'alpha']), windows=[7, 30, 90]):
+        tau_x_30_day_mean = means[30]['tau_x']
+
+The last max(windows) days are kept in a ring buffer. Each step adds the new day to the running sums and day counts of
+every window and takes out the day that just left it, so a step costs O(1) reads and array operations whatever the
+window length. Like avg_method='partial_data_ok', the mean at each grid point is over the days that have data there and
+is NaN where no day in the window does. Missing days count towards the window length but add no data.
+
+To keep the rounding error from adding and taking out days from building up, the sums are recomputed from the buffer
+every max(windows) steps.
+"""
+
+import collections
+import datetime
+
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def read_daily_record(dates, var_names):
+    """
+    Read the given fields from the daily netCDF files.
+
+    :return: Generator of (date, fields) where fields is a dictionary of the full (lat, lon) fields, or None if the
+             daily file doesn't exist.
+    """
+    import os
+    import netCDF4
+    from utils import get_netCDF_filepath
+    from CompressedField import read_netCDF_field
+
+    for date in dates:
+        tau_filepath = get_netCDF_filepath(field_type='daily', date=date)
+
+        if not os.path.isfile(tau_filepath):
+            logger.warning('{:s} not found. Proceeding without it...'.format(tau_filepath))
+            yield date, None
+            continue
+
+        tau_dataset = netCDF4.Dataset(tau_filepath)
+        fields = {var_name: read_netCDF_field(tau_dataset, var_name) for var_name in var_names}
+        tau_dataset.close()
+
+        yield date, fields
+
+
+def rolling_means(daily_record, windows):
+    """
+    :param daily_record: Iterable of (date, fields) over consecutive days, e.g. from read_daily_record(...). fields is
+                         a dictionary of (lat, lon) fields, or None for a missing day.
+    :param windows: Window lengths in days.
+    :return: Generator of (date, means) for every day once the shortest window is full, where means[window][var_name]
+             is the mean over the window days ending on (and including) date. Windows that don't fit in the days read
+             so far are left out.
+    """
+    windows = sorted(set(windows))
+    max_window = windows[-1]
+
+    # One more slot than the longest window so the day that just left it is still there to be taken out.
+    buffer = collections.deque(maxlen=max_window + 1)
+
+    field_sum = {window: {} for window in windows}
+    field_days = {window: {} for window in windows}
+
+    previous_date = None
+    for n, (date, fields) in enumerate(daily_record):
+        if previous_date is not None and date != previous_date + datetime.timedelta(days=1):
+            logger.error('Rolling means need consecutive days but {} follows {}.'.format(date, previous_date))
+            raise ValueError('Rolling means need consecutive days but {} follows {}.'.format(date, previous_date))
+        previous_date = date
+
+        buffer.append(fields)
+
+        if (n + 1) % max_window == 0:
+            # Start the sums over from the buffer every so often.
+            for window in windows:
+                field_sum[window], field_days[window] = {}, {}
+                for day_fields in list(buffer)[-window:]:
+                    _add_day(field_sum[window], field_days[window], day_fields, sign=1)
+        else:
+            for window in windows:
+                _add_day(field_sum[window], field_days[window], fields, sign=1)
+                if len(buffer) > window:
+                    _add_day(field_sum[window], field_days[window], buffer[-window - 1], sign=-1)
+
+        means = {}
+        for window in windows:
+            if n + 1 < window:
+                continue
+
+            means[window] = {}
+            for var_name in field_sum[window].keys():
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    means[window][var_name] = field_sum[window][var_name] / field_days[window][var_name]
+
+        if means:
+            yield date, means
+
+
+def _add_day(field_sum, field_days, fields, sign):
+    if fields is None:
+        return
+
+    for var_name, field in fields.items():
+        if var_name not in field_sum:
+            field_sum[var_name] = np.zeros(field.shape)
+            field_days[var_name] = np.zeros(field.shape, dtype=np.int32)
+
+        valid = ~np.isnan(field)
+        field_sum[var_name] += sign * np.nan_to_num(field)
+        field_days[var_name] += sign * valid
+
+        # Drop the rounding error left where the window has no data anymore so the mean is NaN there again.
+        if sign < 0:
+            field_sum[var_name][field_days[var_name] == 0] = 0
@@ -0,0 +1,105 @@
+"""
+NaN-aware smoothing of (..., lat, lon) fields with separable kernels, used instead of calling
+astropy.convolution.convolve(field, kernel, boundary='wrap') on one field at a time.
+
+Like astropy's default nan_treatment='interpolate', NaN cells are left out of each weighted average and the weights of
+the remaining cells are renormalized, so a cell only comes back as NaN when its whole window is NaN. The box and
+Gaussian kernels used in the analysis scripts are separable, so the 2D convolution is done as one pass along latitude
+and one along longitude, each costing len(kernel) shifted additions per cell instead of len(kernel)**2.
+
+Every leading axis is smoothed independently, so a stack of variables (and/or days) is smoothed in one call:
+
+    alpha_field, tau_x_field = smooth([alpha_field, tau_x_field], box_kernel_1d(5))
+
+Longitude is periodic over the whole array, as with boundary='wrap'. Note that the first and last columns of the
+lat-lon grid in constants are the same longitude (-180 and +180).
+"""
+
+import numpy as np
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def box_kernel_1d(width):
+    """
+    Same weights as astropy.convolution.Box1DKernel(width), so that np.outer(k, k) is Box2DKernel(width). For an even
+    width the kernel has width+1 points with half weights at both ends.
+    """
+    if width % 2 == 1:
+        kernel = np.ones(width)
+    else:
+        kernel = np.ones(width + 1)
+        kernel[0] = kernel[-1] = 0.5
+    return kernel / kernel.sum()
+
+
+def gaussian_kernel_1d(stddev):
+    """ Same weights as astropy.convolution.Gaussian1DKernel(stddev), so that np.outer(k, k) is Gaussian2DKernel. """
+    half_width = int(np.ceil(8 * stddev)) // 2
+    x = np.arange(-half_width, half_width + 1)
+    kernel = np.exp(-0.5 * (x / stddev)**2)
+    return kernel / kernel.sum()
+
+
+def _convolve_axis(field, kernel, axis, boundary):
+    half_width = len(kernel) // 2
+    n = field.shape[axis]
+
+    result = np.zeros_like(field)
+    for k, weight in enumerate(kernel):
+        shift = k - half_width
+        idx = np.arange(n) + shift
+
+        if boundary == 'wrap':
+            neighbour = np.take(field, idx % n, axis=axis)
+        else:
+            # Cells past the edge contribute nothing (they are treated as NaN).
+            neighbour = np.take(field, np.clip(idx, 0, n-1), axis=axis)
+            outside = (idx < 0) | (idx >= n)
+            if np.any(outside):
+                shape = [1] * field.ndim
+                shape[axis] = n
+                neighbour = np.where(outside.reshape(shape), 0, neighbour)
+
+        result += weight * neighbour
+
+    return result
+
+
+def smooth(fields, kernel, lat_boundary='wrap'):
+    """
+    :param fields: Array of shape (..., n_lat, n_lon), or a list of 2D fields.
+    :param kernel: Symmetric 1D kernel with an odd number of weights, applied along both latitude and longitude, e.g.
+                   box_kernel_1d(5).
+    :param lat_boundary: 'wrap' to also wrap around in latitude like astropy's boundary='wrap', or 'nan' to treat the
+                         rows beyond the first and last latitudes as missing.
+    :return: Smoothed fields with the same shape as np.asarray(fields).
+    """
+    kernel = np.asarray(kernel, dtype=float)
+    if kernel.ndim != 1 or len(kernel) % 2 != 1:
+        logger.error('Smoothing kernel must be 1D with an odd number of weights, got shape {}.'.format(kernel.shape))
+        raise ValueError('Smoothing kernel must be 1D with an odd number of weights, got shape {}.'
+                         .format(kernel.shape))
+
+    if lat_boundary not in ['wrap', 'nan']:
+        logger.error('Invalid lat_boundary: {}. Choose from [\'wrap\', \'nan\'].'.format(lat_boundary))
+        raise ValueError('Invalid lat_boundary: {}. Choose from [\'wrap\', \'nan\'].'.format(lat_boundary))
+
+    fields = np.asarray(fields, dtype=float)
+    valid = ~np.isnan(fields)
+
+    # Smooth the field (with zeros in place of NaNs) and the weights of the valid cells, then renormalize.
+    weighted_sum = np.where(valid, fields, 0)
+    weight_sum = valid.astype(float)
+    for axis, boundary in [(-2, lat_boundary), (-1, 'wrap')]:
+        weighted_sum = _convolve_axis(weighted_sum, kernel, axis, boundary)
+        weight_sum = _convolve_axis(weight_sum, kernel, axis, boundary)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        smoothed = weighted_sum / weight_sum
+
+    # Windows with no valid cells. Their smoothed weight is exactly zero as only zeros were added up.
+    smoothed[weight_sum == 0] = np.nan
+
+    return smoothed
@@ -0,0 +1,60 @@
+"""
+Centered-difference stencils on whole (..., lat, lon) arrays, used by the derivative routines instead of looping over
+every grid cell. Longitude is periodic and, like the lat-lon grid in constants, the first and last columns are the same
+longitude (-180 and +180). Following the loops these replace, column j uses the neighbours (j-1) % j_max and
+(j+1) % j_max where j_max = n_lon - 1.
+
+Latitude is not periodic so the first and last rows have no neighbour on one side and come back as NaN.
+"""
+
+import numpy as np
+
+
+def zonal_neighbours(field):
+    """
+    :return: (field[..., j-1], field[..., j+1]) for every column j with periodic longitude.
+    """
+    field = np.asarray(field, dtype=float)
+
+    west = np.empty_like(field)
+    east = np.empty_like(field)
+
+    # Interior columns, and the last column before +180 whose eastern neighbour wraps around to j=0.
+    west[..., 1:-1] = field[..., :-2]
+    east[..., 1:-2] = field[..., 2:-1]
+    east[..., -2] = field[..., 0]
+
+    # -180 and +180 both sit between columns j_max-1 and 1.
+    west[..., 0] = field[..., -2]
+    west[..., -1] = field[..., -2]
+    east[..., 0] = field[..., 1]
+    east[..., -1] = field[..., 1]
+
+    return west, east
+
+
+def meridional_neighbours(field):
+    """
+    :return: (field[..., i-1, :], field[..., i+1, :]) for every row i, NaN on the first and last rows.
+    """
+    field = np.asarray(field, dtype=float)
+
+    south = np.full_like(field, np.nan)
+    north = np.full_like(field, np.nan)
+
+    south[..., 1:, :] = field[..., :-1, :]
+    north[..., :-1, :] = field[..., 1:, :]
+
+    return south, north
+
+
+def zonal_difference(field):
+    """ field[..., j+1] - field[..., j-1] with periodic longitude. """
+    west, east = zonal_neighbours(field)
+    return east - west
+
+
+def meridional_difference(field):
+    """ field[..., i+1, :] - field[..., i-1, :], NaN on the first and last rows. """
+    south, north = meridional_neighbours(field)
+    return north - south
@@ -0,0 +1,144 @@
+"""
+Per-cell kernel for the modified Richardson iteration in the sea ice zone, compiled with Numba when it's installed.
+
+Each cell iterates until it converges, exactly like SurfaceStressDataWriter.surface_stress(...), so cells that converge
+after one iteration don't pay for the slow ones as they do in the vectorized SurfaceStressDataWriter.
+surface_stress_compressed(...). Cells are spread over threads with prange.
+
+Numba is optional. Without it (or with surface_stress_solver = 'numpy' in constants) the writer uses the vectorized
+numpy solver instead, see get_surface_stress_solver().
+"""
+
+import numpy as np
+
+from constants import rho_air, C_air, rho_0, C_seawater, D_e
+
+import logging
+logger = logging.getLogger(__name__)
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+prange = numba.prange if numba is not None else range
+
+solvers = ['numba', 'numpy']
+
+# Status of each cell after the iteration.
+CONVERGED = 0
+TOO_MANY_ITERATIONS = 1
+LARGE_TAU = 2
+
+# Solver used by SurfaceStressDataWriter, see get_surface_stress_solver().
+_solver = None
+
+
+def set_surface_stress_solver(solver):
+    """
+    :param solver: 'numba' or 'numpy'. Falls back to 'numpy' (with a warning) if Numba isn't installed.
+    """
+    global _solver
+
+    if solver not in solvers:
+        logger.error('Invalid surface stress solver: {}. Choose from {}.'.format(solver, solvers))
+        raise ValueError('Invalid surface stress solver: {}. Choose from {}.'.format(solver, solvers))
+
+    if solver == 'numba' and numba is None:
+        logger.warning('Numba is not installed. Falling back to the numpy surface stress solver.')
+        solver = 'numpy'
+
+    logger.info('Using the {:s} surface stress solver.'.format(solver))
+    _solver = solver
+
+
+def get_surface_stress_solver():
+    """ Solver used for the sea ice zone cells. The first call picks it up from constants. """
+    if _solver is None:
+        from constants import surface_stress_solver
+        set_surface_stress_solver(surface_stress_solver)
+    return _solver
+
+
+def _surface_stress_cells(f, u_geo, u_wind, alpha, u_ice, R, tau, tau_air, tau_ice, status):
+    omega = 0.01  # Richardson relaxation parameter
+
+    for n in prange(alpha.shape[0]):
+        # Here we set the variables to arbitrary initial guesses before iteratively calculating tau and u_Ekman.
+        iter_count = 0
+        residual_x, residual_y = 1.0, 1.0
+        tau_x, tau_y = 0.0, 0.0
+        tau_air_x, tau_air_y = 0.0, 0.0
+        tau_ice_x, tau_ice_y = 0.0, 0.0
+        status[n] = CONVERGED
+
+        Ekman_factor = np.sqrt(2) / (f[n] * rho_0 * D_e)
+        wind_speed = np.sqrt(u_wind[n, 0]*u_wind[n, 0] + u_wind[n, 1]*u_wind[n, 1])
+
+        while np.sqrt(residual_x*residual_x + residual_y*residual_y) > 1e-5:
+            iter_count = iter_count + 1
+            if iter_count > 50:
+                status[n] = TOO_MANY_ITERATIONS
+                break
+
+            if np.sqrt(tau_x*tau_x + tau_y*tau_y) > 10:
+                status[n] = LARGE_TAU
+                break
+
+            tau_air_x = rho_air * C_air * wind_speed * u_wind[n, 0]
+            tau_air_y = rho_air * C_air * wind_speed * u_wind[n, 1]
+
+            u_Ekman_x = Ekman_factor * (R[0, 0]*tau_x + R[0, 1]*tau_y)
+            u_Ekman_y = Ekman_factor * (R[1, 0]*tau_x + R[1, 1]*tau_y)
+
+            u_rel_x = u_ice[n, 0] - (u_geo[n, 0] + u_Ekman_x)
+            u_rel_y = u_ice[n, 1] - (u_geo[n, 1] + u_Ekman_y)
+            u_rel_speed = np.sqrt(u_rel_x*u_rel_x + u_rel_y*u_rel_y)
+            tau_ice_x = rho_0 * C_seawater * u_rel_speed * u_rel_x
+            tau_ice_y = rho_0 * C_seawater * u_rel_speed * u_rel_y
+
+            tau_x = alpha[n] * tau_ice_x + (1 - alpha[n]) * tau_air_x
+            tau_y = alpha[n] * tau_ice_y + (1 - alpha[n]) * tau_air_y
+
+            residual_x = tau_x - (alpha[n] * tau_ice_x + (1 - alpha[n]) * tau_air_x)
+            residual_y = tau_y - (alpha[n] * tau_ice_y + (1 - alpha[n]) * tau_air_y)
+
+            tau_x = tau_x + omega * residual_x
+            tau_y = tau_y + omega * residual_y
+
+        tau[n, 0], tau[n, 1] = tau_x, tau_y
+        tau_air[n, 0], tau_air[n, 1] = tau_air_x, tau_air_y
+        tau_ice[n, 0], tau_ice[n, 1] = tau_ice_x, tau_ice_y
+
+
+if numba is not None:
+    _surface_stress_cells = numba.njit(parallel=True, cache=True)(_surface_stress_cells)
+
+
+def surface_stress(f, u_geo, u_wind, alpha, u_ice, R):
+    """
+    Same arguments and return values as SurfaceStressDataWriter.surface_stress_compressed(...), plus the rotation
+    matrix R used to get the Ekman velocity from the stress.
+    """
+    n = len(alpha)
+    tau = np.zeros((n, 2))
+    tau_air = np.zeros((n, 2))
+    tau_ice = np.zeros((n, 2))
+    status = np.zeros(n, dtype=np.int8)
+
+    _surface_stress_cells(np.ascontiguousarray(f, dtype=float), np.ascontiguousarray(u_geo, dtype=float),
+                          np.ascontiguousarray(u_wind, dtype=float), np.ascontiguousarray(alpha, dtype=float),
+                          np.ascontiguousarray(u_ice, dtype=float), np.ascontiguousarray(R, dtype=float),
+                          tau, tau_air, tau_ice, status)
+
+    if np.any(status == TOO_MANY_ITERATIONS):
+        logger.warning('iter_count exceeded 50 during calculation of tau and u_Ekman for {:d} cells.'
+                       .format(np.count_nonzero(status == TOO_MANY_ITERATIONS)))
+    if np.any(status == LARGE_TAU):
+        logger.warning('Large tau for {:d} cells.'.format(np.count_nonzero(status == LARGE_TAU)))
+
+    n_nan = np.count_nonzero(np.isnan(tau).any(axis=1))
+    if n_nan > 0:
+        logger.warning('NaN tau for {:d} cells.'.format(n_nan))
+
+    return tau, tau_air, tau_ice
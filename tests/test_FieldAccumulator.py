@@ -0,0 +1,370 @@
+import pytest
+
+import sys
+sys.path.append("..")
+
+import numpy as np
+
+from CompressedField import CompressedField
+from FieldAccumulator import FieldAccumulator
+
+
+def test_partial_data_ok_mean_ignores_missing_days():
+    days = np.random.rand(4, 3, 5)
+    days[0, 1, 2] = np.nan
+    days[:, 2, 4] = np.nan
+
+    accumulator = FieldAccumulator(avg_method='partial_data_ok')
+    for day in days:
+        accumulator.add({'tau_x': day})
+
+    mean = accumulator.mean_fields()['tau_x']
+
+    assert np.allclose(mean, np.nanmean(days, axis=0), equal_nan=True)
+
+
+def test_compressed_fields_give_the_same_mean():
+    days = np.random.rand(3, 4, 6)
+    days[days < 0.5] = np.nan
+
+    full_accumulator = FieldAccumulator()
+    compressed_accumulator = FieldAccumulator()
+    for day in days:
+        full_accumulator.add({'tau_SIZ_x': day})
+        compressed_accumulator.add({'tau_SIZ_x': CompressedField.from_field(day)})
+
+    assert np.array_equal(full_accumulator.mean_fields()['tau_SIZ_x'],
+                          compressed_accumulator.mean_fields()['tau_SIZ_x'], equal_nan=True)
+
+
+def test_invalid_avg_method():
+    with pytest.raises(ValueError):
+        FieldAccumulator(avg_method='median')
+
+
+def test_merged_partials_give_the_same_mean(tmpdir):
+    days = np.random.rand(6, 3, 5)
+    days[days < 0.2] = np.nan
+
+    accumulator = FieldAccumulator()
+    for day in days:
+        accumulator.add({'alpha': day})
+
+    partials = [FieldAccumulator(), FieldAccumulator()]
+    for n, day in enumerate(days):
+        partials[n // 3].add({'alpha': day})
+
+    partial_filepath = str(tmpdir.join('partial.npz'))
+    partials[0].save(partial_filepath)
+
+    merged = FieldAccumulator.load(partial_filepath)
+    merged.merge(partials[1])
+
+    assert merged.n_days == 6
+    assert np.allclose(merged.mean_fields()['alpha'], accumulator.mean_fields()['alpha'], equal_nan=True)
+
+
+def test_subtract_undoes_merge(tmpdir):
+    import datetime
+
+    days = np.random.rand(4, 3, 5)
+    days[days < 0.2] = np.nan
+    dates = [datetime.date(2015, 1, 1) + datetime.timedelta(days=n) for n in range(4)]
+
+    partials = [FieldAccumulator(), FieldAccumulator()]
+    for n, (date, day) in enumerate(zip(dates, days)):
+        partials[n // 2].add({'alpha': day}, date=date, mtime=float(n))
+
+    store = FieldAccumulator()
+    store.merge(partials[0])
+    store.merge(partials[1])
+
+    store_filepath = str(tmpdir.join('store.npz'))
+    store.save(store_filepath)
+    store = FieldAccumulator.load(store_filepath)
+    assert store.manifest == {date: float(n) for n, date in enumerate(dates)}
+
+    store.subtract(partials[1])
+
+    assert sorted(store.manifest.keys()) == dates[:2]
+    assert np.allclose(store.mean_fields()['alpha'], partials[0].mean_fields()['alpha'], equal_nan=True)
+
+    with pytest.raises(ValueError):
+        store.merge(partials[0])
+
+
+def test_std_matches_numpy_when_merged():
+    days = 1e3 + np.random.rand(9, 3, 5)
+    days[days < 1e3 + 0.2] = np.nan
+
+    accumulator = FieldAccumulator()
+    partials = [FieldAccumulator(), FieldAccumulator()]
+    for n, day in enumerate(days):
+        accumulator.add({'tau_x': CompressedField.from_field(day) if n % 2 else day})
+        partials[n % 2].add({'tau_x': day})
+
+    merged = FieldAccumulator()
+    for partial in partials:
+        merged.merge(partial)
+
+    with np.errstate(invalid='ignore'):
+        std = np.nanstd(days, axis=0)
+
+    assert np.allclose(accumulator.std_fields()['tau_x'], std, equal_nan=True)
+    assert np.allclose(merged.std_fields()['tau_x'], std, equal_nan=True)
+
+
+def test_load_only_some_fields(tmpdir):
+    accumulator = FieldAccumulator()
+    accumulator.add({'alpha': np.random.rand(3, 5), 'tau_x': np.random.rand(3, 5)})
+
+    partial_filepath = str(tmpdir.join('partial.npz'))
+    accumulator.save(partial_filepath)
+
+    loaded = FieldAccumulator.load(partial_filepath, var_names=['tau_x'])
+
+    assert list(loaded.mean_fields().keys()) == ['tau_x']
+    assert np.array_equal(loaded.mean_fields()['tau_x'], accumulator.mean_fields()['tau_x'])
+    assert sorted(FieldAccumulator.saved_var_names(partial_filepath)) == sorted(accumulator.field_sum.keys())
+
+
+def write_daily_files(dates, shape=(3, 5), var_names=('alpha', 'tau_x')):
+    """ Minimal daily netCDF files with the given fields under constants.output_dir_path. """
+    import os
+    import netCDF4
+    from utils import get_netCDF_filepath
+
+    days = {}
+    for date in dates:
+        tau_filepath = get_netCDF_filepath(field_type='daily', date=date)
+        os.makedirs(os.path.dirname(tau_filepath), exist_ok=True)
+
+        tau_dataset = netCDF4.Dataset(tau_filepath, 'w')
+        tau_dataset.title = 'Synthetic daily fields'
+        tau_dataset.createDimension('lat', shape[0])
+        tau_dataset.createDimension('lon', shape[1])
+
+        days[date] = {}
+        for var_name in var_names:
+            field = np.random.rand(*shape)
+            field[field < 0.2] = np.nan
+            tau_dataset.createVariable(var_name, float, ('lat', 'lon'))[:] = field
+            days[date][var_name] = field
+
+        tau_dataset.close()
+
+    return days
+
+
+def test_from_period_in_parallel_matches_sequential(tmpdir, monkeypatch):
+    import datetime
+    import joblib
+    import constants
+
+    monkeypatch.setattr(constants, 'output_dir_path', str(tmpdir) + '/')
+
+    # Three whole months, in three chunks.
+    dates = [datetime.date(2015, 1, 1) + datetime.timedelta(days=n) for n in range(31 + 28 + 31)]
+    days = write_daily_files(dates)
+
+    # The sequential run reads the daily files and saves the monthly partials, which the parallel run then loads in
+    # threads (so they see the output directory set above). The daily files can't be read in threads as HDF5 isn't
+    # thread safe.
+    sequential = FieldAccumulator.from_period(dates, ['alpha', 'tau_x'], n_jobs=1)
+
+    with joblib.parallel_backend('threading'):
+        parallel = FieldAccumulator.from_period(dates, ['alpha', 'tau_x'], n_jobs=3)
+        uneven = [FieldAccumulator.from_period(dates, ['alpha', 'tau_x'], n_jobs=2) for _ in range(2)]
+
+    assert parallel.n_days == sequential.n_days == len(dates)
+    assert parallel.manifest == sequential.manifest
+
+    for var_name in ['alpha', 'tau_x']:
+        stacked = np.stack([days[date][var_name] for date in dates])
+
+        # One month per chunk merged in chunk order adds the sums up in the same order as n_jobs=1.
+        assert np.array_equal(parallel.field_sum[var_name], sequential.field_sum[var_name])
+        assert np.array_equal(parallel.field_m2[var_name], sequential.field_m2[var_name])
+        assert np.allclose(parallel.mean_fields()[var_name], np.nanmean(stacked, axis=0), equal_nan=True)
+
+        # Runs with the same chunks give the same sums to the bit.
+        assert np.array_equal(uneven[0].field_sum[var_name], uneven[1].field_sum[var_name])
+        assert np.array_equal(uneven[0].field_m2[var_name], uneven[1].field_m2[var_name])
+        assert np.allclose(uneven[0].std_fields()[var_name], sequential.std_fields()[var_name], rtol=1e-12)
+
+
+def patch_monthly_partials(tmpdir, monkeypatch):
+    import constants
+    import utils
+
+    monkeypatch.setattr(constants, 'output_dir_path', str(tmpdir) + '/')
+    monkeypatch.setattr(utils, 'get_monthly_partial_filepath',
+                        lambda year, month: str(tmpdir.join('partials', '{:d}{:02d}_partial.npz'.format(year, month))))
+
+
+def test_days_added_as_processed_are_used_by_monthly_partial(tmpdir, monkeypatch):
+    import os
+    import datetime
+    import utils
+    from utils import get_netCDF_filepath
+
+    patch_monthly_partials(tmpdir, monkeypatch)
+
+    dates = [datetime.date(2015, 2, 1) + datetime.timedelta(days=n) for n in range(3)]
+    days = write_daily_files(dates)
+
+    mtimes = {date: os.path.getmtime(get_netCDF_filepath(field_type='daily', date=date)) for date in dates}
+    for date in dates:
+        FieldAccumulator.add_to_monthly_partial(date, days[date], mtime=mtimes[date])
+
+    # Everything should come from the days added above, not from the daily files.
+    def from_dates(*args, **kwargs):
+        raise AssertionError('Daily files were read again.')
+    monkeypatch.setattr(FieldAccumulator, 'from_dates', from_dates)
+
+    partial = FieldAccumulator.monthly_partial(2015, 2, ['alpha', 'tau_x'])
+
+    assert partial.manifest == mtimes
+    assert os.path.isfile(utils.get_monthly_partial_filepath(2015, 2))
+    assert not os.listdir(FieldAccumulator._daily_partial_dir(utils.get_monthly_partial_filepath(2015, 2)))
+
+    for var_name in ['alpha', 'tau_x']:
+        stacked = np.stack([days[date][var_name] for date in dates])
+        assert np.allclose(partial.mean_fields()[var_name], np.nanmean(stacked, axis=0), equal_nan=True)
+
+
+def test_reprocessed_day_starts_the_monthly_partial_over(tmpdir, monkeypatch):
+    import os
+    import datetime
+    from utils import get_netCDF_filepath
+
+    patch_monthly_partials(tmpdir, monkeypatch)
+
+    dates = [datetime.date(2015, 2, 1) + datetime.timedelta(days=n) for n in range(3)]
+    days = write_daily_files(dates)
+
+    for date in dates:
+        tau_filepath = get_netCDF_filepath(field_type='daily', date=date)
+        FieldAccumulator.add_to_monthly_partial(date, days[date], mtime=os.path.getmtime(tau_filepath))
+    FieldAccumulator.monthly_partial(2015, 2, ['alpha', 'tau_x'])
+
+    # Process the second day again, with a later modification time.
+    days.update(write_daily_files(dates[1:2]))
+    tau_filepath = get_netCDF_filepath(field_type='daily', date=dates[1])
+    mtime = os.path.getmtime(tau_filepath) + 10
+    os.utime(tau_filepath, (mtime, mtime))
+
+    FieldAccumulator.add_to_monthly_partial(dates[1], days[dates[1]], mtime=mtime)
+
+    partial = FieldAccumulator.monthly_partial(2015, 2, ['alpha', 'tau_x'])
+
+    assert partial.n_days == len(dates)
+    assert partial.manifest[dates[1]] == mtime
+
+    for var_name in ['alpha', 'tau_x']:
+        stacked = np.stack([days[date][var_name] for date in dates])
+        assert np.allclose(partial.mean_fields()[var_name], np.nanmean(stacked, axis=0), equal_nan=True)
+        assert np.allclose(partial.std_fields()[var_name], np.nanstd(stacked, axis=0), equal_nan=True)
+
+
+def test_reprocessed_day_keeps_the_other_pending_days(tmpdir, monkeypatch):
+    import os
+    import datetime
+    from utils import get_netCDF_filepath
+
+    patch_monthly_partials(tmpdir, monkeypatch)
+
+    dates = [datetime.date(2015, 2, 1) + datetime.timedelta(days=n) for n in range(3)]
+    days = write_daily_files(dates[1:])
+    mtimes = {date: os.path.getmtime(get_netCDF_filepath(field_type='daily', date=date)) for date in dates[1:]}
+
+    for date in dates[1:]:
+        FieldAccumulator.add_to_monthly_partial(date, days[date], mtime=mtimes[date])
+    FieldAccumulator.monthly_partial(2015, 2, ['alpha', 'tau_x'])
+
+    # A new day that's folded in before the reprocessed one.
+    days.update(write_daily_files(dates[:1]))
+    mtimes[dates[0]] = os.path.getmtime(get_netCDF_filepath(field_type='daily', date=dates[0]))
+    FieldAccumulator.add_to_monthly_partial(dates[0], days[dates[0]], mtime=mtimes[dates[0]])
+
+    days.update(write_daily_files(dates[2:]))
+    tau_filepath = get_netCDF_filepath(field_type='daily', date=dates[2])
+    mtimes[dates[2]] = os.path.getmtime(tau_filepath) + 10
+    os.utime(tau_filepath, (mtimes[dates[2]], mtimes[dates[2]]))
+    FieldAccumulator.add_to_monthly_partial(dates[2], days[dates[2]], mtime=mtimes[dates[2]])
+
+    # Only the day that was in the dropped partial should be read back in from its daily file.
+    read_dates = []
+    from_dates = FieldAccumulator.from_dates.__func__
+
+    def recording_from_dates(cls, dates, *args, **kwargs):
+        read_dates.extend(dates)
+        return from_dates(cls, dates, *args, **kwargs)
+    monkeypatch.setattr(FieldAccumulator, 'from_dates', classmethod(recording_from_dates))
+
+    partial = FieldAccumulator.monthly_partial(2015, 2, ['alpha', 'tau_x'])
+
+    assert read_dates == [dates[1]]
+    assert partial.manifest == mtimes
+
+    for var_name in ['alpha', 'tau_x']:
+        stacked = np.stack([days[date][var_name] for date in dates])
+        assert np.allclose(partial.mean_fields()[var_name], np.nanmean(stacked, axis=0), equal_nan=True)
+
+
+def test_monthly_partial_waits_for_the_lock(tmpdir, monkeypatch):
+    import os
+    import fcntl
+    import datetime
+    import threading
+    import utils
+    from utils import get_netCDF_filepath
+
+    patch_monthly_partials(tmpdir, monkeypatch)
+
+    date = datetime.date(2015, 2, 1)
+    days = write_daily_files([date])
+    FieldAccumulator.add_to_monthly_partial(date, days[date],
+                                            mtime=os.path.getmtime(get_netCDF_filepath(field_type='daily', date=date)))
+
+    partial_filepath = utils.get_monthly_partial_filepath(2015, 2)
+    partials = []
+
+    with open(partial_filepath + '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        thread = threading.Thread(target=lambda: partials.append(FieldAccumulator.monthly_partial(2015, 2, ['alpha'])))
+        thread.start()
+        thread.join(timeout=0.5)
+
+        assert thread.is_alive()
+        assert not os.path.isfile(partial_filepath)
+
+    thread.join()
+
+    assert partials[0].manifest.keys() == {date}
+    assert os.path.isfile(partial_filepath)
+
+
+def test_m2_only_kept_for_std_fields(tmpdir):
+    from SurfaceStressDataWriter import SurfaceStressDataWriter
+
+    days = np.random.rand(4, 3, 5)
+
+    accumulator = FieldAccumulator()
+    for day in days:
+        accumulator.add({'alpha': day, 'tau_SIZ_x': day})
+
+    assert 'alpha' in SurfaceStressDataWriter.std_var_names
+    assert set(accumulator.field_m2.keys()) == {'alpha'}
+
+    partial_filepath = str(tmpdir.join('partial.npz'))
+    accumulator.save(partial_filepath)
+    assert 'm2_tau_SIZ_x' not in np.load(partial_filepath).files
+
+    merged = FieldAccumulator.load(partial_filepath)
+    merged.merge(accumulator)
+
+    assert set(merged.std_fields().keys()) == {'alpha'}
+    assert np.allclose(merged.std_fields()['alpha'], np.std(np.concatenate([days, days]), axis=0))
+    assert np.allclose(merged.mean_fields()['tau_SIZ_x'], np.mean(days, axis=0))
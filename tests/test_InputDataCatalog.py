@@ -0,0 +1,51 @@
+import pytest
+
+import sys
+sys.path.append("..")
+
+import os
+import datetime
+
+from InputDataCatalog import InputDataCatalog
+
+
+def test_overlapping_sea_ice_concentration_files_follow_sensor_and_release(tmpdir, monkeypatch):
+    import constants
+
+    monkeypatch.setattr(constants, 'data_dir_path', str(tmpdir))
+    monkeypatch.setattr(InputDataCatalog, 'catalog_filepath', str(tmpdir.join('input_data_catalog.pickle')))
+
+    sic_dir = os.path.join(str(tmpdir), InputDataCatalog.products['sea_ice_concentration']['dir'])
+    os.makedirs(sic_dir)
+
+    filenames = ['seaice_conc_daily_sh_f11_19950915_v03r00.nc', 'seaice_conc_daily_sh_f13_19950915_v03r00.nc',
+                 'seaice_conc_daily_sh_f13_19951015_v03r00.nc', 'seaice_conc_daily_sh_f11_19951015_v03r00.nc',
+                 'seaice_conc_daily_sh_f17_20160301_v03r00.nc', 'seaice_conc_daily_sh_f17_20160301_v03r01.nc',
+                 'seaice_conc_daily_sh_f17_20150301_v03r01.nc', 'seaice_conc_daily_sh_f17_20150301_v03r00.nc']
+    for filename in filenames:
+        open(os.path.join(sic_dir, filename), 'w').close()
+
+    catalog = InputDataCatalog(rebuild=True)
+
+    def filename(date):
+        return os.path.basename(catalog.get_filepath('sea_ice_concentration', date))
+
+    assert filename(datetime.date(1995, 9, 15)) == 'seaice_conc_daily_sh_f11_19950915_v03r00.nc'
+    assert filename(datetime.date(1995, 10, 15)) == 'seaice_conc_daily_sh_f13_19951015_v03r00.nc'
+    assert filename(datetime.date(2016, 3, 1)) == 'seaice_conc_daily_sh_f17_20160301_v03r01.nc'
+    assert filename(datetime.date(2015, 3, 1)) == 'seaice_conc_daily_sh_f17_20150301_v03r00.nc'
+
+    # A catalog saved by an older version (that picked files differently) is scanned again when loaded.
+    import pickle
+    with open(InputDataCatalog.catalog_filepath, 'rb') as f:
+        saved_catalog = pickle.load(f)
+    saved_catalog['version'] = InputDataCatalog.catalog_version - 1
+    with open(InputDataCatalog.catalog_filepath, 'wb') as f:
+        pickle.dump(saved_catalog, f)
+
+    reloaded = InputDataCatalog()
+    assert reloaded.stale_products() == []
+    assert reloaded.catalog == catalog.catalog
+
+    with open(InputDataCatalog.catalog_filepath, 'rb') as f:
+        assert pickle.load(f)['version'] == InputDataCatalog.catalog_version
@@ -0,0 +1,88 @@
+import pytest
+
+import sys
+sys.path.append("..")
+
+import numpy as np
+
+from QuantileSketch import QuantileSketch
+
+
+def test_quantiles_close_to_exact():
+    np.random.seed(49)
+
+    days = np.random.gamma(2.0, size=(2000, 4, 6))
+    days[np.random.rand(*days.shape) < 0.2] = np.nan
+
+    sketch = QuantileSketch([0.05, 0.5, 0.95], (4, 6))
+    for day in days:
+        sketch.add(day)
+
+    for p, field in sketch.quantile_fields().items():
+        exact = np.nanquantile(days, p, axis=0)
+        assert np.allclose(field, exact, rtol=0.1, atol=0.05)
+
+    assert np.array_equal(sketch.day_counts(), np.sum(~np.isnan(days), axis=0))
+
+
+def test_exceedances_and_few_days_are_exact():
+    days = np.random.rand(3, 2, 5)
+    days[0, 1, 2] = np.nan
+    days[:, 0, 4] = np.nan
+
+    sketch = QuantileSketch([0.5], (2, 5), thresholds=[0.25, 0.75], lower_thresholds=[0.25])
+    for day in days:
+        sketch.add(day)
+
+    exceedances = sketch.exceedance_fields()
+    assert np.array_equal(exceedances[0.25], np.sum(days > 0.25, axis=0))
+    assert np.array_equal(exceedances[0.75], np.sum(days > 0.75, axis=0))
+
+    with np.errstate(invalid='ignore'):
+        assert np.array_equal(sketch.exceedance_fields(lower=True)[0.25], np.sum(days < 0.25, axis=0))
+
+    median = sketch.quantile_fields()[0.5]
+    assert np.isnan(median[0, 4])
+    with np.errstate(invalid='ignore'):
+        assert np.allclose(median, np.nanmedian(days, axis=0), equal_nan=True)
+
+
+def test_invalid_quantile():
+    with pytest.raises(ValueError):
+        QuantileSketch([50], (2, 2))
+
+
+def test_sketches_fed_by_mean_field_aggregator(tmpdir, monkeypatch):
+    import datetime
+    import constants
+    from MeanFieldAggregator import MeanFieldAggregator
+    from test_FieldAccumulator import write_daily_files
+
+    monkeypatch.setattr(constants, 'output_dir_path', str(tmpdir) + '/')
+
+    dates = [datetime.date(2015, 3, 30) + datetime.timedelta(days=n) for n in range(4)]
+    days = write_daily_files(dates, var_names=['tau_x', 'tau_y', 'Ekman_w'])
+
+    sketches = {'tau_magnitude': QuantileSketch([0.5], (3, 5), thresholds=[0.5]),
+                'Ekman_w': QuantileSketch([0.5], (3, 5), lower_thresholds=[0.5])}
+
+    aggregator = MeanFieldAggregator(plot=False)
+    aggregator.add_quantile_sketches(sketches, dates)
+    aggregator.run()
+
+    tau_magnitude = np.stack([np.hypot(days[date]['tau_x'], days[date]['tau_y']) for date in dates])
+    Ekman_w = np.stack([days[date]['Ekman_w'] for date in dates])
+
+    with np.errstate(invalid='ignore'):
+        assert np.allclose(sketches['tau_magnitude'].quantile_fields()[0.5], np.nanmedian(tau_magnitude, axis=0),
+                           equal_nan=True)
+        assert np.array_equal(sketches['tau_magnitude'].exceedance_fields()[0.5], np.sum(tau_magnitude > 0.5, axis=0))
+        assert np.array_equal(sketches['Ekman_w'].exceedance_fields(lower=True)[0.5], np.sum(Ekman_w < 0.5, axis=0))
+        assert np.array_equal(sketches['Ekman_w'].day_counts(), np.sum(~np.isnan(Ekman_w), axis=0))
+
+
+def test_sketch_of_unknown_field():
+    from MeanFieldAggregator import MeanFieldAggregator
+
+    with pytest.raises(ValueError):
+        MeanFieldAggregator(plot=False).add_quantile_sketches({'tau_norm': QuantileSketch([0.5], (2, 2))}, [])
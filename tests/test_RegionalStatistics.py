@@ -0,0 +1,50 @@
+import pytest
+
+import sys
+sys.path.append("..")
+
+import numpy as np
+
+from Grid import get_grid
+from RegionalStatistics import RegionalStatistics
+
+
+def test_box_mean_is_area_weighted():
+    grid = get_grid()
+
+    regions = RegionalStatistics()
+    regions.add_box('WGR', -68, -55, -60, 30)
+
+    field = np.random.rand(*grid.shape)
+    field[field < 0.2] = np.nan
+
+    box = (grid.lat_grid >= -68) & (grid.lat_grid <= -55) & (grid.lon_grid >= -60) & (grid.lon_grid <= 30)
+    valid = box & ~np.isnan(field)
+    expected = np.sum(field[valid] * grid.cell_area[valid]) / np.sum(grid.cell_area[valid])
+
+    means = regions.means({'alpha': field, 'Ekman_w': np.full(grid.shape, np.nan)})
+
+    assert np.isclose(means['WGR']['alpha'], expected)
+    assert np.isnan(means['WGR']['Ekman_w'])
+
+
+def test_sectors_cover_the_grid_once():
+    grid = get_grid()
+
+    regions = RegionalStatistics()
+    regions.add_sectors()
+
+    integrals = regions.integrals({'ones': np.ones(grid.shape)})
+    total_area = sum(integrals[name]['ones'] for name in RegionalStatistics.sectors)
+
+    # The sectors share their edge longitudes, and the +180 column duplicates the -180 one.
+    edge_area = len(RegionalStatistics.sectors) * np.sum(grid.cell_area_1d)
+    assert np.isclose(total_area, np.sum(grid.cell_area[:, :-1]) + edge_area)
+
+
+def test_duplicate_region_name():
+    regions = RegionalStatistics()
+    regions.add_box('Ross_Sea', -90, 90, 160, -130)
+
+    with pytest.raises(ValueError):
+        regions.add_box('Ross_Sea', -90, 90, 160, -130)
@@ -0,0 +1,40 @@
+import pytest
+
+import sys
+sys.path.append("..")
+
+import numpy as np
+
+import expressions
+from expressions import evaluate, set_expression_backend
+
+
+def test_numpy_backend_matches_numpy():
+    set_expression_backend('numpy')
+    u = np.random.rand(5, 9)
+    v = np.random.rand(5, 9)
+    f = np.random.rand(5, 1)
+
+    result = evaluate('1025 * 0.0055 * sqrt(u*u + v*v) * u / f', u=u, v=v, f=f)
+
+    assert np.array_equal(result, 1025 * 0.0055 * np.sqrt(u*u + v*v) * u / f)
+
+
+@pytest.mark.skipif(not expressions.numexpr_available(), reason='numexpr is not installed')
+def test_numexpr_backend_matches_numpy_backend():
+    x = np.random.rand(5, 9)
+    x[2, 3] = np.nan
+    y = np.random.rand(5, 9)
+    expression = 'where(x > 0.5, abs(x - y) / (x + y), -x / y)'
+
+    set_expression_backend('numpy')
+    numpy_result = evaluate(expression, x=x, y=y)
+    set_expression_backend('numexpr')
+    numexpr_result = evaluate(expression, x=x, y=y)
+
+    assert np.array_equal(numpy_result, numexpr_result, equal_nan=True)
+
+
+def test_invalid_backend():
+    with pytest.raises(ValueError):
+        set_expression_backend('fortran')
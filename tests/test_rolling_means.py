@@ -0,0 +1,47 @@
+import pytest
+
+import sys
+sys.path.append("..")
+
+import datetime
+import warnings
+
+import numpy as np
+
+from rolling_means import rolling_means
+
+
+def test_rolling_means_match_nanmean_over_each_window():
+    n_days = 17
+    days = np.random.rand(n_days, 3, 4)
+    days[days < 0.3] = np.nan
+    days[6] = np.nan  # Missing day.
+
+    dates = [datetime.date(2015, 1, 1) + datetime.timedelta(days=n) for n in range(n_days)]
+    daily_record = [(date, None if n == 6 else {'alpha': days[n]}) for n, date in enumerate(dates)]
+
+    outputs = list(rolling_means(daily_record, windows=[3, 5]))
+
+    assert [date for date, _ in outputs] == dates[2:]
+
+    for date, means in outputs:
+        n = dates.index(date)
+        for window in [3, 5]:
+            if n + 1 < window:
+                assert window not in means
+                continue
+
+            # Cells without data in the window are NaN, as is the mean.
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                expected = np.nanmean(days[n - window + 1:n + 1], axis=0)
+
+            assert np.allclose(means[window]['alpha'], expected, equal_nan=True)
+
+
+def test_rolling_means_need_consecutive_days():
+    field = {'alpha': np.zeros((2, 2))}
+    daily_record = [(datetime.date(2015, 1, 1), field), (datetime.date(2015, 1, 3), field)]
+
+    with pytest.raises(ValueError):
+        list(rolling_means(daily_record, windows=[2]))
@@ -0,0 +1,49 @@
+import pytest
+
+import sys
+sys.path.append("..")
+
+import numpy as np
+
+from smoothing import smooth, box_kernel_1d, gaussian_kernel_1d
+
+
+def brute_force_smooth(field, kernel_2d):
+    """ NaN-interpolating 2D convolution with wrap-around boundaries, one cell at a time. """
+    n_lat, n_lon = field.shape
+    h = kernel_2d.shape[0] // 2
+    smoothed = np.full(field.shape, np.nan)
+
+    for i in range(n_lat):
+        for j in range(n_lon):
+            weighted_sum, weight_sum = 0, 0
+            for di in range(-h, h+1):
+                for dj in range(-h, h+1):
+                    value = field[(i+di) % n_lat][(j+dj) % n_lon]
+                    if not np.isnan(value):
+                        weighted_sum += kernel_2d[di+h][dj+h] * value
+                        weight_sum += kernel_2d[di+h][dj+h]
+            if weight_sum > 0:
+                smoothed[i][j] = weighted_sum / weight_sum
+
+    return smoothed
+
+
+@pytest.mark.parametrize('kernel', [box_kernel_1d(3), box_kernel_1d(4), gaussian_kernel_1d(1)])
+def test_smooth_matches_2d_convolution(kernel):
+    field = np.random.rand(8, 12)
+    field[2:5, 3:9] = np.nan
+
+    expected = brute_force_smooth(field, np.outer(kernel, kernel))
+
+    assert np.allclose(smooth(field, kernel), expected, equal_nan=True)
+
+
+def test_smooth_stack_matches_individual_fields():
+    fields = np.random.rand(3, 8, 12)
+    fields[1, 4, 5] = np.nan
+
+    smoothed = smooth(fields, box_kernel_1d(3))
+
+    for n in range(3):
+        assert np.array_equal(smoothed[n], smooth(fields[n], box_kernel_1d(3)), equal_nan=True)
@@ -0,0 +1,28 @@
+import pytest
+
+import sys
+sys.path.append("..")
+
+import numpy as np
+
+from stencils import zonal_difference, meridional_difference
+
+
+def test_zonal_difference_matches_periodic_loop():
+    field = np.random.rand(5, 9)
+    j_max = field.shape[1] - 1
+
+    diff = zonal_difference(field)
+
+    for i in range(field.shape[0]):
+        for j in range(field.shape[1]):
+            assert diff[i][j] == field[i][(j+1) % j_max] - field[i][(j-1) % j_max]
+
+
+def test_meridional_difference_boundary_rows_are_nan():
+    field = np.random.rand(5, 9)
+
+    diff = meridional_difference(field)
+
+    assert np.all(np.isnan(diff[0])) and np.all(np.isnan(diff[-1]))
+    assert np.array_equal(diff[1:-1], field[2:] - field[:-2])
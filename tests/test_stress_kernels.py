@@ -0,0 +1,114 @@
+import pytest
+
+import sys
+sys.path.append("..")
+
+import numpy as np
+
+import stress_kernels
+
+
+def random_cells(n):
+    rng = np.random.RandomState(0)
+    f = -1.4e-4 * rng.uniform(0.6, 1, n)
+    u_geo = rng.normal(0, 0.05, (n, 2))
+    u_wind = rng.normal(0, 8, (n, 2))
+    alpha = rng.uniform(0.15, 1, n)
+    u_ice = rng.normal(0, 0.2, (n, 2))
+    return f, u_geo, u_wind, alpha, u_ice
+
+
+@pytest.mark.skipif(stress_kernels.numba is None, reason='Numba is not installed')
+def test_compiled_kernel_matches_python_kernel():
+    f, u_geo, u_wind, alpha, u_ice = random_cells(100)
+    R = np.array([[np.cos(-np.pi/4), -np.sin(-np.pi/4)], [np.sin(-np.pi/4), np.cos(-np.pi/4)]])
+
+    outputs = {}
+    for name, kernel in [('compiled', stress_kernels._surface_stress_cells),
+                         ('python', stress_kernels._surface_stress_cells.py_func)]:
+        tau, tau_air, tau_ice = np.zeros((100, 2)), np.zeros((100, 2)), np.zeros((100, 2))
+        status = np.zeros(100, dtype=np.int8)
+        kernel(f, u_geo, u_wind, alpha, u_ice, R, tau, tau_air, tau_ice, status)
+        outputs[name] = tau
+
+    assert np.allclose(outputs['compiled'], outputs['python'], rtol=1e-12, atol=0)
+
+
+def test_missing_data_gives_nan_tau():
+    f, u_geo, u_wind, alpha, u_ice = random_cells(10)
+    u_ice[3] = np.nan
+    R = np.eye(2)
+
+    tau, _, _ = stress_kernels.surface_stress(f, u_geo, u_wind, alpha, u_ice, R)
+
+    assert np.all(np.isnan(tau[3]))
+    assert not np.any(np.isnan(np.delete(tau, 3, axis=0)))
+
+
+def test_numba_and_numpy_solvers_agree():
+    import datetime
+    from SurfaceStressDataWriter import SurfaceStressDataWriter
+
+    writer = SurfaceStressDataWriter(field_type='monthly', date=datetime.date(2015, 1, 1))
+
+    f, u_geo, u_wind, alpha, u_ice = random_cells(200)
+
+    # Cells with missing inputs, infinite winds and winds strong enough to give |tau| > 10. Note that the residual
+    # vanishes after the first pass for finite inputs so no cell actually reaches the iteration limit, but all of these
+    # cells leave the loop early and both solvers have to leave them in the same state.
+    u_geo[5] = np.nan
+    u_wind[7, 1] = np.nan
+    u_ice[9] = np.nan
+    alpha[11] = np.nan
+    u_wind[13] = [np.inf, 0]
+    u_wind[15:20] = [80, -60]
+    alpha[15:20] = 0.2
+
+    tau_numba = stress_kernels.surface_stress(f, u_geo, u_wind, alpha, u_ice, writer.R_m45deg)
+    tau_numpy = writer.surface_stress_compressed(f, u_geo, u_wind, alpha, u_ice)
+
+    for numba_field, numpy_field in zip(tau_numba, tau_numpy):
+        assert np.allclose(numba_field, numpy_field, rtol=1e-12, atol=0, equal_nan=True)
+
+    assert np.all(np.isnan(tau_numba[0][[5, 7, 9, 11, 13]]))
+    assert np.all(np.linalg.norm(tau_numba[0][15:20], axis=1) > 10)
+
+    # And the scalar solver the vectorized ones replaced.
+    for n in [0, 1, 2, 15]:
+        tau, tau_air, tau_ice = writer.surface_stress(f[n], u_geo[n], u_wind[n], alpha[n], u_ice[n])
+        assert np.allclose(tau, tau_numba[0][n], rtol=1e-12, atol=0)
+        assert np.allclose(tau_ice, tau_numba[2][n], rtol=1e-12, atol=0)
+
+
+def test_open_water_cells():
+    import datetime
+    from SurfaceStressDataWriter import SurfaceStressDataWriter
+    from constants import rho_air, C_air, rho_0, D_e
+    from Grid import get_grid
+
+    writer = SurfaceStressDataWriter(field_type='monthly', date=datetime.date(2015, 1, 1))
+
+    rng = np.random.RandomState(1)
+    cells = np.sort(rng.choice(writer.u_wind_field.size, 50, replace=False))
+    writer.u_wind_field.flat[cells] = rng.normal(0, 8, 50)
+    writer.v_wind_field.flat[cells] = rng.normal(0, 8, 50)
+
+    writer.compute_open_water_surface_stress_fields(cells)
+
+    # The scalar calculation the vectorized one replaced.
+    for n in cells[:10]:
+        i, j = np.unravel_index(n, writer.u_wind_field.shape)
+        f = get_grid().f[i]
+        u_wind_vec = np.array([writer.u_wind_field[i][j], writer.v_wind_field[i][j]])
+        tau_air_vec = rho_air * C_air * np.linalg.norm(u_wind_vec) * u_wind_vec
+        u_Ekman_vec = (np.sqrt(2) / (f * rho_0 * D_e)) * np.matmul(writer.R_m45deg, tau_air_vec)
+
+        for field, value in [(writer.tau_air_x_field, tau_air_vec[0]), (writer.tau_y_field, tau_air_vec[1]),
+                             (writer.tau_nogeo_x_field, tau_air_vec[0]), (writer.u_Ekman_field, u_Ekman_vec[0]),
+                             (writer.v_Ekman_field, u_Ekman_vec[1]),
+                             (writer.U_Ekman_field, tau_air_vec[1] / (f * rho_0)),
+                             (writer.V_Ekman_field, -tau_air_vec[0] / (f * rho_0))]:
+            assert np.isclose(field[i][j], value, rtol=1e-12, atol=0)
+
+        assert writer.tau_ice_x_field[i][j] == 0 and writer.tau_ice_dot_u_ocean_field[i][j] == 0
+        assert np.isnan(writer.tau_SIZ_x_field[i][j]) and np.isnan(writer.tau_ig_y_field[i][j])
@@ -27,6 +27,19 @@ def distance(lat1, lon1, lat2, lon2):
     return R*c
 
 
+def nearest_index(grid, values):
+    # Vectorized equivalent of np.abs(grid - value).argmin() for every value in values, assuming grid is sorted in
+    # ascending order. Ties go to the lower index, just like argmin does.
+    grid = np.asarray(grid)
+    values = np.asarray(values)
+
+    idx_right = np.clip(np.searchsorted(grid, values), 1, len(grid) - 1)
+    idx_left = idx_right - 1
+
+    use_left = (values - grid[idx_left]) <= (grid[idx_right] - values)
+    return np.where(use_left, idx_left, idx_right)
+
+
 def log_netCDF_dataset_metadata(dataset):
     # Nicely format dimension names and sizes.
     dim_string = ""
@@ -70,6 +83,7 @@ def latlon_to_polar_stereographic_xy(lat, lon):
     #
     # SSM/I: Special Sensor Microwave Imager
     # Note: lat must be positive for the southern hemisphere! Or take absolute value like below.
+    # lat and lon can also be arrays of the same shape.
 
     sgn = -1  # Sign of the latitude (use +1 for northern hemisphere, -1 for southern)
     e = 0.081816153  # Eccentricity of the Hughes ellipsoid
@@ -84,7 +98,7 @@ def latlon_to_polar_stereographic_xy(lat, lon):
 
     t = np.tan(np.pi/4 - lat/2) / ((1 - e*np.sin(lat)) / (1 + e*np.sin(lat)))**(e/2)
 
-    if np.abs(90 - lat) < 1e-5:
+    if np.all(np.abs(90 - lat) < 1e-5):
         rho = 2*R_E*t / np.sqrt((1+e)**(1+e) * (1-e)**(1-e))
     else:
         sl = slat * np.pi/180
@@ -398,9 +412,38 @@ def get_netCDF_filepath(field_type, date=None, season_str=None, year_start=None,
     return filepath
 
 
+def get_monthly_partial_filepath(year, month):
+    """ File storing the sums and day counts of every field over one month, see FieldAccumulator.monthly_partial. """
+    from os import path
+    from constants import output_dir_path
+
+    filename = 'surface_stress_' + str(year) + str(month).zfill(2) + '_partial.npz'
+    return path.join(output_dir_path, 'surface_stress', 'monthly_partials', str(year), filename)
+
+
+def get_anomaly_filepath(date, climo_field_type, year_start, year_end):
+    """ Daily anomalies relative to a climo or monthly_climo climatology, see MeanFieldAggregator. """
+    from os import path
+    from constants import output_dir_path
+
+    climo_label = climo_field_type + '_' + str(year_start) + '-' + str(year_end)
+    filename = 'surface_stress_' + str(date.year) + str(date.month).zfill(2) + str(date.day).zfill(2) + '_anomaly.nc'
+    return path.join(output_dir_path, 'surface_stress', 'anomalies', climo_label, str(date.year), filename)
+
+
+def get_quantile_filepath(year_start, year_end):
+    """ Quantiles and threshold exceedance counts of the daily fields, see calculate_mean_fields.produce_quantiles. """
+    from os import path
+    from constants import output_dir_path
+
+    filename = 'surface_stress_' + str(year_start) + '-' + str(year_end) + '_quantiles.nc'
+    return path.join(output_dir_path, 'surface_stress', 'quantiles', filename)
+
+
 def get_field_from_netcdf(tau_filepath, var):
     import sys
     import netCDF4
+    from CompressedField import read_netCDF_field
 
     try:
         tau_dataset = netCDF4.Dataset(tau_filepath)
@@ -408,7 +451,7 @@ def get_field_from_netcdf(tau_filepath, var):
 
         lats = np.array(tau_dataset.variables['lat'])
         lons = np.array(tau_dataset.variables['lon'])
-        field = np.array(tau_dataset.variables[var])
+        field = read_netCDF_field(tau_dataset, var)
 
         return lons, lats, field
 
@@ -421,6 +464,34 @@ def get_field_from_netcdf(tau_filepath, var):
         # sys.exit('Dataset not found: {:s}'.format(tau_filepath))
 
 
+def get_fields_from_netcdf(tau_filepath, var_names):
+    """
+    Read only the fields in var_names from a netCDF file.
+
+    :return: lons, lats and a dictionary of the fields, or None if the file can't be read or is missing any of them.
+    """
+    import netCDF4
+    from CompressedField import read_netCDF_field
+
+    try:
+        tau_dataset = netCDF4.Dataset(tau_filepath)
+        log_netCDF_dataset_metadata(tau_dataset)
+
+        lats = np.array(tau_dataset.variables['lat'])
+        lons = np.array(tau_dataset.variables['lon'])
+        fields = {var_name: read_netCDF_field(tau_dataset, var_name) for var_name in var_names}
+
+        tau_dataset.close()
+
+        return lons, lats, fields
+
+    except Exception as e:
+        logger.error('{}'.format(e))
+        logger.error('Could not read {} from: {:s}'.format(list(var_names), tau_filepath))
+
+        return None
+
+
 def get_contour_from_netcdf(tau_filepath, var, contour_level):
     import netCDF4
     import matplotlib.pyplot as plt
@@ -594,6 +665,82 @@ def season_str_to_WOA_avg_period(season):
         logger.error('Input season ({}) not available from WOA.'.format(season))
 
 
+# WOA13 depth levels and depth-averaged fields already read by this process. Keys start with (time_span, avg_period,
+# grid_size, field_type) so all the writers for the same month share a single copy.
+WOA_depth_level_cache = {}
+WOA_depth_averaged_cache = {}
+
+
+def load_WOA_depth_level(dataset, field_var, WOA_parameters, level):
+    """
+    Read only one depth level of a WOA13 field (e.g. s_an or t_an) instead of the whole 4D variable. Levels are cached
+    in memory and as .npy files under output_dir_path so other processes on the same host can memory-map them instead
+    of reading the netCDF file again.
+
+    :return: The cached (n_lats, n_lons) array (not a copy, so don't modify it) with missing values (> 1e3) replaced by
+             NaN.
+    """
+    import os
+    from constants import output_dir_path
+
+    cache_key = WOA_parameters + (field_var, level)
+
+    if cache_key not in WOA_depth_level_cache:
+        cache_dir = os.path.join(output_dir_path, 'WOA13_depth_levels')
+        npy_filename = '_'.join(WOA_parameters) + '_' + field_var + '_level' + str(level) + '.npy'
+        npy_filepath = os.path.join(cache_dir, npy_filename)
+
+        if os.path.isfile(npy_filepath):
+            level_field = np.load(npy_filepath, mmap_mode='r')
+        else:
+            logger.info('Reading {:s} depth level {:d} from {:s}'.format(field_var, level, dataset.filepath()))
+            level_field = np.ma.filled(dataset.variables[field_var][0, level, :, :], np.nan)
+            level_field[level_field > 1e3] = np.nan
+
+            if not os.path.exists(cache_dir):
+                logger.info('Creating directory: {:s}'.format(cache_dir))
+                os.makedirs(cache_dir, exist_ok=True)
+
+            # Save to a temporary file first so other processes never see a partially written file.
+            tmp_filepath = npy_filepath[:-4] + '_' + str(os.getpid()) + '.tmp.npy'
+            np.save(tmp_filepath, level_field)
+            os.replace(tmp_filepath, npy_filepath)
+
+        WOA_depth_level_cache[cache_key] = level_field
+
+    return WOA_depth_level_cache[cache_key]
+
+
+def load_WOA_depth_levels(dataset, field_var, WOA_parameters, depth_levels):
+    """
+    Same as load_WOA_depth_level(...) for several depth levels.
+
+    :return: Array of shape (n_levels, n_lats, n_lons).
+    """
+    return np.stack([load_WOA_depth_level(dataset, field_var, WOA_parameters, level) for level in depth_levels])
+
+
+def load_WOA_depth_averaged_field(dataset, field_var, WOA_parameters, depth_levels):
+    """
+    Average a WOA13 field over the given depth levels on its native grid. Like the scalar lookups, a grid point is NaN
+    if the field is missing on any of the depth levels.
+
+    :return: Array of shape (n_lats, n_lons).
+    """
+    cache_key = WOA_parameters + (field_var, tuple(depth_levels))
+
+    if cache_key not in WOA_depth_averaged_cache:
+        level_fields = load_WOA_depth_levels(dataset, field_var, WOA_parameters, depth_levels)
+
+        field_avg = np.zeros(level_fields.shape[1:], dtype=level_fields.dtype)
+        for level_field in level_fields:
+            field_avg = field_avg + level_field/len(depth_levels)
+
+        WOA_depth_averaged_cache[cache_key] = field_avg
+
+    return WOA_depth_averaged_cache[cache_key]
+
+
 def get_WOA_parameters(field_type, date, season_str, year_start, year_end):
     if field_type == 'daily':
         time_span = date_to_WOA_time_span(date)
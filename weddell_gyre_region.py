@@ -18,8 +18,10 @@ import cartopy.crs as ccrs
 import cmocean.cm
 
 import constants
-from constants import Omega, rho_0, output_dir_path, figure_dir_path
-from utils import date_range, distance, log_netCDF_dataset_metadata, get_netCDF_filepath, get_field_from_netcdf
+from constants import rho_0, output_dir_path, figure_dir_path
+from Grid import get_grid
+from smoothing import smooth, box_kernel_1d
+from utils import date_range, log_netCDF_dataset_metadata, get_netCDF_filepath, get_field_from_netcdf
 
 # Configure logger first before importing any sub-module that depend on the logger being already configured.
 import logging.config
@@ -118,17 +120,14 @@ def retroactively_compute_ice_ocean_governor_variables(dates):
         w_Ek_nogeo_daily_field = np.array(current_tau_nogeo_dataset.variables['Ekman_w'])
         w_Ek_geo_daily_field = np.array(current_tau_geo_dataset.variables['Ekman_w'])
 
-        import astropy.convolution
-        kernel = astropy.convolution.Box2DKernel(5)
-        alpha_daily_field = astropy.convolution.convolve(alpha_daily_field, kernel, boundary='wrap')
-        tau_io_x_nogeo_daily_field = astropy.convolution.convolve(tau_io_x_nogeo_daily_field, kernel, boundary='wrap')
-        tau_io_y_nogeo_daily_field = astropy.convolution.convolve(tau_io_y_nogeo_daily_field, kernel, boundary='wrap')
-        tau_io_x_geo_daily_field = astropy.convolution.convolve(tau_io_x_geo_daily_field, kernel, boundary='wrap')
-        tau_io_y_geo_daily_field = astropy.convolution.convolve(tau_io_y_geo_daily_field, kernel, boundary='wrap')
-        tau_ao_x_daily_field = astropy.convolution.convolve(tau_ao_x_daily_field, kernel, boundary='wrap')
-        tau_ao_y_daily_field = astropy.convolution.convolve(tau_ao_y_daily_field, kernel, boundary='wrap')
-        w_Ek_nogeo_daily_field = astropy.convolution.convolve(w_Ek_nogeo_daily_field, kernel, boundary='wrap')
-        w_Ek_geo_daily_field = astropy.convolution.convolve(w_Ek_geo_daily_field, kernel, boundary='wrap')
+        # Smooth all the daily fields in one go with the same 5x5 box kernel.
+        smoothed_fields = smooth([alpha_daily_field, tau_io_x_nogeo_daily_field, tau_io_y_nogeo_daily_field,
+                                  tau_io_x_geo_daily_field, tau_io_y_geo_daily_field, tau_ao_x_daily_field,
+                                  tau_ao_y_daily_field, w_Ek_nogeo_daily_field, w_Ek_geo_daily_field], box_kernel_1d(5))
+
+        alpha_daily_field, tau_io_x_nogeo_daily_field, tau_io_y_nogeo_daily_field, tau_io_x_geo_daily_field, \
+            tau_io_y_geo_daily_field, tau_ao_x_daily_field, tau_ao_y_daily_field, w_Ek_nogeo_daily_field, \
+            w_Ek_geo_daily_field = smoothed_fields
 
         tau_ig_x_daily_field = np.zeros((len(lats), len(lons)))
         tau_ig_y_daily_field = np.zeros((len(lats), len(lons)))
@@ -147,10 +146,12 @@ def retroactively_compute_ice_ocean_governor_variables(dates):
         i_max = len(lats) - 1
         j_max = len(lons) - 1
 
-        for i, lat in enumerate(lats[1:-1]):
-            f = 2 * Omega * np.sin(np.deg2rad(lat))  # Coriolis parameter [s^-1]
-            dx = distance(lats[i-1], lons[0], lats[i+1], lons[0])
-            dy = distance(lats[i], lons[0], lats[i], lons[2])
+        grid = get_grid()
+
+        for i in range(1, len(lats) - 1):
+            f = grid.f[i]  # Coriolis parameter [s^-1]
+            dx = grid.dx[i]
+            dy = grid.dy[i]
 
             for j, lon in enumerate(lons):
                 # Taking modulus of j-1 and j+1 to get the correct index in the special cases of